@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_login import LoginManager
+from flask_migrate import Migrate
 from dotenv import load_dotenv
 import os
 
@@ -11,14 +12,30 @@ load_dotenv()
 # Initialize Flask extensions
 db = SQLAlchemy()
 login_manager = LoginManager()
+migrate = Migrate()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
     # Configure the Flask application
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///eco_mood.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Maximum number of background jobs of each kind queued or running at once across all workers
+    app.config['JOB_CONCURRENCY'] = {
+        'scrape': int(os.getenv('SCRAPE_JOB_CONCURRENCY', '2')),
+        'process': int(os.getenv('PROCESS_JOB_CONCURRENCY', '1'))
+    }
+    # Local caches live in the instance folder unless configured elsewhere
+    app.config['SCRAPER_CACHE_DIR'] = os.getenv('SCRAPER_CACHE_DIR', os.path.join(app.instance_path, 'page_cache'))
+    app.config['EMOTION_CACHE_PATH'] = os.getenv(
+        'EMOTION_CACHE_PATH', os.path.join(app.instance_path, 'inference_cache.sqlite3')
+    )
+    # Load the emotion model at startup instead of on the first /process call
+    app.config['EMOTION_PRELOAD'] = os.getenv('EMOTION_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+    # Overrides such as the test database must be applied before extensions bind
+    if config:
+        app.config.update(config)
 
     # Initialize CORS with credentials support
     CORS(app, 
@@ -26,14 +43,15 @@ def create_app():
          resources={r"/*": {
              "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-             "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept"],
-             "expose_headers": ["Content-Type", "Authorization"],
+             "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "If-None-Match"],
+             "expose_headers": ["Content-Type", "Authorization", "ETag"],
              "supports_credentials": True
          }}
     )
     
     # Initialize extensions
     db.init_app(app)
+    migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
@@ -50,10 +68,39 @@ def create_app():
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
 
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+
+    if app.config['EMOTION_PRELOAD']:
+        from app.services.sentiment import emotion_analyzer
+        emotion_analyzer.analyzer.load()
+
     # Create database tables
     with app.app_context():
         db.create_all()
         
+        # Tables create_all() just added to an older database start empty
+        from app.services.geo.membership import ensure_membership
+        try:
+            ensure_membership()
+        except Exception as e:
+            print(f"Error backfilling venue membership: {e}")
+        
+        # Score vector versions are read from counts kept by the writers
+        from app.services.sentiment.score_store import ensure_vector_state
+        try:
+            ensure_vector_state()
+        except Exception as e:
+            print(f"Error counting score vectors: {e}")
+        
+        # Jobs of workers that exited will never finish
+        from app.services.jobs import fail_orphaned
+        try:
+            fail_orphaned()
+        except Exception as e:
+            print(f"Error failing orphaned jobs: {e}")
+        
         # Load sample data if needed
         from app.services.data_loader import load_sample_data
         try:
@@ -1,14 +1,50 @@
-from flask import jsonify, request
+from flask import jsonify, request, make_response, url_for
 import traceback
+from datetime import datetime
 from app.api import bp
+from app.services import jobs, recommender, review_feed
+from app.services import itinerary as itinerary_planner
+from app.services.cache import cache_stats
 from app.services.scraper import tripadvisor, reddit
 from app.services.sentiment import emotion_analyzer
-from app.services.geo import heatmap_generator
+from app.services.geo import heatmap_generator, heatmap_tiles
 from app import db
 
+def _scrape_job(progress, city, category):
+    """Background job: scrape TripAdvisor and Reddit for a city."""
+    tripadvisor_data = tripadvisor.scrape(city, category)
+    progress.update(tripadvisor_reviews=len(tripadvisor_data))
+    
+    reddit_data = reddit.scrape(city)
+    progress.update(reddit_reviews=len(reddit_data))
+    
+    total = len(tripadvisor_data) + len(reddit_data)
+    return {'review_count': total, 'message': f'Scraped {total} reviews'}
+
+def _process_job(progress):
+    """Background job: run sentiment analysis over unprocessed reviews."""
+    def report(processed_count, last_review_id, **cache_counts):
+        progress.update(processed_count=processed_count, last_review_id=last_review_id, **cache_counts)
+    
+    processed_count = emotion_analyzer.analyze_reviews(progress=report)
+    return {
+        'processed_count': processed_count,
+        'inference_cache': emotion_analyzer.analyzer.cache_stats()
+    }
+
+def _job_rejected(error):
+    return jsonify({'error': str(error), 'active_jobs': error.active_ids}), 429
+
+def _job_accepted(job):
+    return jsonify({
+        'status': job.status,
+        'job_id': job.id,
+        'status_url': url_for('api.get_job', job_id=job.id)
+    }), 202
+
 @bp.route('/scrape', methods=['POST'])
 def scrape():
-    """Trigger scraping for a city and category."""
+    """Queue scraping for a city and category."""
     data = request.get_json()
     city = data.get('city')
     category = data.get('category')
@@ -17,38 +53,88 @@ def scrape():
         return jsonify({'error': 'Missing city or category'}), 400
     
     try:
-        # Trigger both scrapers asynchronously
-        tripadvisor_data = tripadvisor.scrape(city, category)
-        reddit_data = reddit.scrape(city)
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Scraped {len(tripadvisor_data) + len(reddit_data)} reviews'
-        })
+        job = jobs.submit('scrape', _scrape_job, city=city, category=category)
+        return _job_accepted(job)
+    except jobs.JobLimitReached as e:
+        return _job_rejected(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/process', methods=['POST'])
 def process():
-    """Process raw reviews with sentiment analysis."""
+    """Queue sentiment analysis of raw reviews."""
+    try:
+        job = jobs.submit('process', _process_job)
+        return _job_accepted(job)
+    except jobs.JobLimitReached as e:
+        return _job_rejected(e)
+    except Exception as e:
+        print(f"Error queueing review processing: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the status, progress and timings of a background job."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+def _heatmap_response(body, etag):
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    response.set_etag(etag)
+    # Let clients keep the body but always revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@bp.route('/heatmap/all', methods=['GET'])
+def get_heatmap_all():
+    """Return every emotion's hotspots as one score vector per neighborhood."""
+    try:
+        return _heatmap_response(*heatmap_generator.render_all())
+    except Exception as e:
+        print(f"Error generating heatmap: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/heatmap/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_heatmap_tile(z, x, y):
+    """Return the binned venue weights of one Web Mercator map tile for an emotion."""
+    emotion = request.args.get('emotion', 'joy')
     try:
-        results = emotion_analyzer.analyze_reviews()
-        return jsonify({
-            'status': 'success',
-            'processed_count': results
-        })
+        return _heatmap_response(*heatmap_tiles.render_tile(emotion, z, x, y))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
-        print(f"Error processing reviews: {str(e)}")
+        print(f"Error generating heatmap tile: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/heatmap', methods=['GET'])
 def get_heatmap():
-    """Return GeoJSON of emotional hotspots."""
+    """
+    Return GeoJSON of emotional hotspots.
+
+    With emotions=joy,calm,... the listed emotions are returned together as
+    one score vector per neighborhood, as from /heatmap/all.
+    """
+    emotions = request.args.get('emotions')
+    if emotions is not None:
+        emotions = list(dict.fromkeys(emotion.strip() for emotion in emotions.split(',') if emotion.strip()))
+        if not emotions:
+            return jsonify({'error': 'Empty emotions list'}), 400
+        try:
+            return _heatmap_response(*heatmap_generator.render_all(emotions))
+        except Exception as e:
+            print(f"Error generating heatmap: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': str(e)}), 500
+    
     emotion = request.args.get('emotion', 'joy')
     try:
-        geojson = heatmap_generator.generate(emotion)
-        return jsonify(geojson)
+        return _heatmap_response(*heatmap_generator.render(emotion))
     except Exception as e:
         print(f"Error generating heatmap: {str(e)}")
         traceback.print_exc()
@@ -103,66 +189,138 @@ def get_heatmap():
         }
         return jsonify(demo_data)
 
+@bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Return hit/miss counters for the server-side response caches."""
+    return jsonify(cache_stats())
+
+def _int_arg(name):
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else None
+
+def _date_arg(name):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
 @bp.route('/reviews', methods=['GET'])
 def get_reviews():
-    """Return reviews for a specific location."""
+    """
+    Return a page of reviews for a neighborhood or venue, newest first.
+
+    The place is given by location (a neighborhood or venue name),
+    neighborhood_id or venue_id. Pass the returned next_cursor as cursor
+    for the next page; emotion/min_score and since/until filter the reviews.
+    """
     location = request.args.get('location')
-    if not location:
+    try:
+        neighborhood_id = _int_arg('neighborhood_id')
+        venue_id = _int_arg('venue_id')
+        cursor = _int_arg('cursor')
+        limit = _int_arg('limit') or review_feed.DEFAULT_PAGE_SIZE
+        min_score = float(request.args.get('min_score', 0.5))
+        since = _date_arg('since')
+        until = _date_arg('until')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {str(e)}'}), 400
+    
+    if location:
+        found = review_feed.find_location(location)
+        if found is None:
+            return jsonify({'error': f'Unknown location: {location}'}), 404
+        kind, location_id = found
+        neighborhood_id, venue_id = (location_id, None) if kind == 'neighborhood' else (None, location_id)
+    if (neighborhood_id is None) == (venue_id is None):
         return jsonify({'error': 'Missing location parameter'}), 400
     
     try:
-        # Demo reviews
-        demo_reviews = [
-            {
-                "id": 1,
-                "text": "I absolutely loved this area! The atmosphere was incredible and everyone was so friendly.",
-                "date": "2024-03-15",
-                "emotion_scores": [
-                    {"emotion": "joy", "score": 0.92},
-                    {"emotion": "excitement", "score": 0.88}
-                ]
-            },
-            {
-                "id": 2,
-                "text": "Great place to visit, though it gets crowded on weekends. Still worth it for the amazing sights!",
-                "date": "2024-04-02",
-                "emotion_scores": [
-                    {"emotion": "joy", "score": 0.75},
-                    {"emotion": "excitement", "score": 0.82}
-                ]
-            },
-            {
-                "id": 3,
-                "text": "A peaceful oasis in the city. Highly recommend visiting in the morning.",
-                "date": "2024-04-10",
-                "emotion_scores": [
-                    {"emotion": "calm", "score": 0.95},
-                    {"emotion": "joy", "score": 0.68}
-                ]
-            }
-        ]
-        
-        return jsonify({"reviews": demo_reviews})
+        page = review_feed.find_reviews(
+            neighborhood_id=neighborhood_id,
+            venue_id=venue_id,
+            cursor=cursor,
+            limit=limit,
+            emotion=request.args.get('emotion'),
+            min_score=min_score,
+            since=since,
+            until=until
+        )
+        return jsonify(page)
     except Exception as e:
         print(f"Error fetching reviews: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def _emotion_mix(value):
+    """Parse an emotion mix given as {"calm": 0.6, "joy": 0.4} or "calm:0.6,joy:0.4"."""
+    if isinstance(value, str):
+        value = dict(part.split(':', 1) for part in value.split(',') if part)
+    if not isinstance(value, dict) or not value:
+        raise ValueError('Missing emotion mix')
+    return {emotion.strip(): float(weight) for emotion, weight in value.items()}
+
+@bp.route('/recommendations', methods=['GET'])
+def get_recommendations():
+    """
+    Return the venues near a start point that best match an emotion mix.
+
+    emotions is a mix such as calm:0.6,joy:0.4; lat/lng is the start point,
+    radius_km bounds the search and k the number of venues.
+    """
+    try:
+        emotions = _emotion_mix(request.args.get('emotions', ''))
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius_km = float(request.args.get('radius_km', recommender.DEFAULT_RADIUS_KM))
+        k = int(request.args.get('k', recommender.DEFAULT_TOP_K))
+        if radius_km <= 0:
+            raise ValueError('radius_km must be positive')
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid parameter: {str(e)}'}), 400
+    
+    try:
+        venues = recommender.recommend(emotions, lat, lng, radius_km=radius_km, k=k)
+        return jsonify({'venues': venues})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error recommending venues: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/itinerary', methods=['POST'])
 def create_itinerary():
-    """Create an itinerary from selected hotspots."""
+    """
+    Create an itinerary from selected hotspots.
+
+    The hotspots are ordered into a short walking route, starting from the
+    optional start point, with leg distances and an estimated duration.
+    Instead of hotspots, recommend ({"emotions": {...}, "radius_km", "k"})
+    picks the venues that best match an emotion mix around start.
+    """
     data = request.get_json()
     hotspots = data.get('hotspots', [])
+    recommend = data.get('recommend')
     
-    if not hotspots:
+    if not hotspots and not recommend:
         return jsonify({'error': 'No hotspots provided'}), 400
+    if not hotspots and not isinstance(recommend, dict):
+        return jsonify({'error': 'Invalid recommend options'}), 400
+    if len(hotspots) > itinerary_planner.MAX_STOPS:
+        return jsonify({'error': f'At most {itinerary_planner.MAX_STOPS} hotspots per itinerary'}), 400
     
     try:
-        itinerary = {  # TODO: Implement itinerary generation
-            'spots': hotspots,
-            'route': [],
-            'estimated_time': '0 hours'
-        }
+        if hotspots:
+            itinerary = itinerary_planner.plan_itinerary(hotspots, start=data.get('start'))
+        else:
+            itinerary = itinerary_planner.recommend_itinerary(
+                _emotion_mix(recommend.get('emotions')),
+                data.get('start'),
+                radius_km=float(recommend.get('radius_km', recommender.DEFAULT_RADIUS_KM)),
+                k=int(recommend.get('k', recommender.DEFAULT_TOP_K))
+            )
         return jsonify(itinerary)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        print(f"Error planning itinerary: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,17 @@
+import click
+from app.models.models import EmotionalHotspot
+from app.services.geo.heatmap_generator import rebuild_venue_sums, refresh_hotspots
+from app.services.geo.membership import rebuild_membership
+from app.services.sentiment.score_store import sync_vector_state
+
+@click.command('rebuild-hotspots')
+def rebuild_hotspots_command():
+    """Recompute venue membership, venue score sums, score vector counts and every emotional hotspot from the stored scores."""
+    pairs = rebuild_membership()
+    rebuild_venue_sums()
+    sync_vector_state()
+    refresh_hotspots()
+    click.echo(f'Rebuilt {pairs} memberships and {EmotionalHotspot.query.count()} hotspots')
+
+def register_commands(app):
+    app.cli.add_command(rebuild_hotspots_command)
@@ -1,8 +1,18 @@
+import json
 from datetime import datetime
+import numpy as np
 from app import db
 
+# On-disk layout of EmotionVector.scores
+SCORE_DTYPE = np.dtype('<f4')
+
 class Venue(db.Model):
     """Represents a location or venue."""
+    # Scrapers look venues up by name and address before creating them
+    __table_args__ = (
+        db.Index('ix_venue_name_address', 'name', 'address'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     address = db.Column(db.String(500))
@@ -15,23 +25,75 @@ class Venue(db.Model):
 
 class Review(db.Model):
     """Represents a raw review from TripAdvisor or Reddit."""
+    # A scraped review is stored once per venue and source; the unique index
+    # also serves venue joins, as SQLite indexes carry the row id
+    __table_args__ = (
+        db.Index('ix_review_venue_source_fingerprint', 'venue_id', 'source', 'fingerprint', unique=True),
+        db.Index('ix_review_fingerprint', 'fingerprint'),
+        # Keeps a venue's reviews in id order, so review pages need no sort
+        db.Index('ix_review_venue_id', 'venue_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
     source = db.Column(db.String(50), nullable=False)  # 'tripadvisor' or 'reddit'
     text = db.Column(db.Text, nullable=False)
+    fingerprint = db.Column(db.String(40))  # hash of the normalized text, see scraper/dedup.py
     reviewer_location = db.Column(db.String(200))
     review_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class EmotionScore(db.Model):
-    """Represents the emotional analysis of a review."""
+class EmotionLabelSet(db.Model):
+    """Label dictionary giving the emotion at each position of an EmotionVector."""
     id = db.Column(db.Integer, primary_key=True)
-    review_id = db.Column(db.Integer, db.ForeignKey('review.id'), nullable=False)
-    emotion = db.Column(db.String(50), nullable=False)  # joy, excitement, calm, etc.
-    score = db.Column(db.Float, nullable=False)
+    labels = db.Column(db.Text, nullable=False, unique=True)  # JSON list of labels, in vector order
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def label_list(self):
+        return json.loads(self.labels)
+
+class EmotionVector(db.Model):
+    """
+    Represents the emotional analysis of a review.
+
+    All of a review's scores are kept in one row as a little-endian float32
+    blob, ordered by the labels of its label set.
+    """
+    review_id = db.Column(db.Integer, db.ForeignKey('review.id'), primary_key=True)
+    label_set_id = db.Column(db.Integer, db.ForeignKey('emotion_label_set.id'), nullable=False)
+    scores = db.Column(db.LargeBinary, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    review = db.relationship('Review', backref='emotion_scores', lazy=True)
+    review = db.relationship('Review', backref=db.backref('emotion_vector', uselist=False), lazy=True)
+    label_set = db.relationship('EmotionLabelSet', lazy='joined')
+
+    @staticmethod
+    def pack(scores):
+        """Encode a sequence of scores as the stored float32 blob."""
+        return np.asarray(scores, dtype=SCORE_DTYPE).tobytes()
+
+    @staticmethod
+    def unpack(blob):
+        """Decode a stored blob into a float32 array."""
+        return np.frombuffer(blob, dtype=SCORE_DTYPE)
+
+    def as_dict(self):
+        """Return the scores keyed by emotion label."""
+        return dict(zip(self.label_set.label_list, self.unpack(self.scores).tolist()))
+
+class VenueEmotion(db.Model):
+    """
+    Running sums of a venue's emotion scores.
+
+    Updated whenever score vectors are stored, so neighborhood hotspots can
+    be rebuilt with a grouped SUM instead of decoding every vector again.
+    review_count counts the vectors whose label set includes the emotion.
+    """
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), primary_key=True)
+    emotion = db.Column(db.String(50), primary_key=True)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
 
 class Neighborhood(db.Model):
     """Represents a city neighborhood or area."""
@@ -41,13 +103,74 @@ class Neighborhood(db.Model):
     boundary = db.Column(db.Text)  # GeoJSON polygon of the neighborhood boundary
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class NeighborhoodVenue(db.Model):
+    """Precomputed membership of venues near a neighborhood."""
+    neighborhood_id = db.Column(db.Integer, db.ForeignKey('neighborhood.id'), primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), primary_key=True, index=True)
+
 class EmotionalHotspot(db.Model):
-    """Represents an aggregated emotional hotspot."""
+    """
+    Represents an aggregated emotional hotspot.
+
+    Rows are maintained incrementally from running sums as emotion scores
+    arrive, so readers never need to recompute them.
+    """
+    __table_args__ = (
+        db.Index('ix_emotional_hotspot_neighborhood_emotion', 'neighborhood_id', 'emotion', unique=True),
+        # Covers the per-emotion heatmap read without touching the table
+        db.Index('ix_emotional_hotspot_emotion_covering', 'emotion', 'neighborhood_id', 'review_count', 'average_score'),
+        db.Index('ix_emotional_hotspot_last_updated', 'last_updated'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     neighborhood_id = db.Column(db.Integer, db.ForeignKey('neighborhood.id'), nullable=False)
     emotion = db.Column(db.String(50), nullable=False)
     average_score = db.Column(db.Float, nullable=False)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
     review_count = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     
-    neighborhood = db.relationship('Neighborhood', backref='hotspots', lazy=True) 
\ No newline at end of file
+    neighborhood = db.relationship('Neighborhood', backref='hotspots', lazy=True) 
+
+class Job(db.Model):
+    """Represents a background scrape or processing job."""
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # 'scrape' or 'process'
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    params = db.Column(db.JSON)
+    progress = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # refreshed by the worker holding a queued or running job
+
+    def to_dict(self):
+        def isoformat(value):
+            return value.isoformat() if value else None
+
+        duration = None
+        if self.started_at:
+            duration = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress or {},
+            'result': self.result,
+            'error': self.error,
+            'created_at': isoformat(self.created_at),
+            'started_at': isoformat(self.started_at),
+            'finished_at': isoformat(self.finished_at),
+            'duration_seconds': duration
+        }
+
+class DataState(db.Model):
+    """
+    A named integer stored with the data it describes, such as a flag
+    recording that a one-time backfill has run.
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
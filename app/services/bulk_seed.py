@@ -0,0 +1,218 @@
+import gc
+from contextlib import contextmanager
+import numpy as np
+from sqlalchemy import func, select
+from app import db
+from app.models.models import SCORE_DTYPE, Venue, Review, Neighborhood, NeighborhoodVenue, EmotionVector, VenueEmotion
+from app.services.geo import heatmap_generator
+from app.services.geo.distance import within_radius_mask
+from app.services.geo.heatmap_generator import ID_CHUNK_SIZE
+from app.services.geo.membership import NEARBY_RADIUS_KM, neighborhood_coordinates
+from app.services.geo.spatial_index import index_venues
+from app.services.sentiment.score_store import record_vectors, vector_mappings
+
+# Rows per executemany batch
+BATCH_SIZE = 10000
+
+@contextmanager
+def _gc_paused():
+    # Seed rows are dicts and tuples without reference cycles, but creating
+    # millions of them keeps triggering collections that walk all of them
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _first_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _column_default(column):
+    default = column.default
+    return default.arg(None) if default.is_callable else default.arg
+
+def _insert(connection, model, rows):
+    """
+    Insert column dicts with executemany straight on the driver.
+
+    The statement is compiled once and each column's bind processing runs
+    over its values in one pass, instead of SQLAlchemy building and
+    processing parameters row by row. Python-side column defaults are
+    evaluated once for all rows.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    compiled = table.insert().compile(dialect=connection.dialect, column_keys=list(rows[0]))
+    keys = list(compiled.positiontup if compiled.positional else compiled.params)
+
+    columns = []
+    for key in keys:
+        column = table.c[key]
+        processor = column.type.dialect_impl(connection.dialect).bind_processor(connection.dialect)
+        if key in rows[0]:
+            values = [row[key] for row in rows]
+            columns.append([processor(value) for value in values] if processor else values)
+        else:
+            value = _column_default(column)
+            columns.append([processor(value) if processor else value] * len(rows))
+
+    params = list(zip(*columns))
+    if not compiled.positional:
+        params = [dict(zip(keys, values)) for values in params]
+    for start in range(0, len(params), BATCH_SIZE):
+        connection.exec_driver_sql(compiled.string, params[start:start + BATCH_SIZE])
+
+def _assign_ids(connection, model, rows):
+    first_id = _first_id(connection, model)
+    for offset, row in enumerate(rows):
+        row['id'] = first_id + offset
+    return np.arange(first_id, first_id + len(rows))
+
+def _neighborhood_points(rows):
+    points = [(row['id'], neighborhood_coordinates(row['boundary'])) for row in rows]
+    return [(row_id, coordinates) for row_id, coordinates in points if coordinates]
+
+def _membership_mask(neighborhoods, lats, lngs):
+    """(len(neighborhoods), len(lats)) mask of venues near each (id, (lat, lng)) neighborhood."""
+    if not neighborhoods or len(lats) == 0:
+        return np.zeros((len(neighborhoods), len(lats)), dtype=bool)
+    return within_radius_mask(
+        [lat for _, (lat, _) in neighborhoods], [lng for _, (_, lng) in neighborhoods],
+        lats, lngs, NEARBY_RADIUS_KM
+    )
+
+def _existing_venue_aggregates(connection, neighborhoods, venues, mask):
+    """
+    Aggregate rows adding the stored sums of existing (id, lat, lng) venues
+    to the neighborhoods mask places them in.
+    """
+    near = np.flatnonzero(mask.any(axis=0))
+    venue_rows = {venues[j][0]: row for row, j in enumerate(near.tolist())}
+    venue_ids = list(venue_rows)
+    stored = []
+    for start in range(0, len(venue_ids), ID_CHUNK_SIZE):
+        stored.extend(connection.execute(
+            select(VenueEmotion.venue_id, VenueEmotion.emotion, VenueEmotion.score_sum, VenueEmotion.review_count)
+            .where(VenueEmotion.venue_id.in_(venue_ids[start:start + ID_CHUNK_SIZE]))
+        ))
+    if not stored:
+        return []
+
+    # Label sets of different models may differ, so counts are kept per emotion
+    emotions = sorted({emotion for _, emotion, _, _ in stored})
+    columns = {emotion: k for k, emotion in enumerate(emotions)}
+    sums = np.zeros((len(near), len(emotions)))
+    counts = np.zeros((len(near), len(emotions)), dtype=np.int64)
+    for venue_id, emotion, score_sum, review_count in stored:
+        sums[venue_rows[venue_id], columns[emotion]] = score_sum
+        counts[venue_rows[venue_id], columns[emotion]] = review_count
+
+    near_mask = mask[:, near]
+    neighborhood_sums = near_mask.astype(np.float64) @ sums
+    neighborhood_counts = near_mask.astype(np.int64) @ counts
+    return [
+        (neighborhoods[i][0], emotions[k], float(neighborhood_sums[i, k]), int(neighborhood_counts[i, k]))
+        for i, k in zip(*neighborhood_counts.nonzero())
+    ]
+
+@_gc_paused()
+def seed(neighborhoods, venues, reviews, review_venues, labels=(), scores=None):
+    """
+    Bulk insert a city in a single transaction.
+
+    neighborhoods, venues and reviews are lists of column dicts without ids;
+    ids are assigned in place and reviews get the venue_id of their entry in
+    review_venues, an index into venues. scores, if given, is a
+    (scored, len(labels)) array for the first scored reviews.
+
+    Neighborhood coordinates are parsed once and membership of the new rows
+    is computed in memory. The venue and hotspot sums of the new scores are
+    built in one NumPy pass, so nothing is read back from the tables just
+    written; new neighborhoods add the stored sums of the existing venues
+    near them instead of rebuilding every hotspot.
+    Returns the number of emotion vectors stored.
+    """
+    connection = db.session.connection()
+    existing_venues = connection.execute(select(Venue.id, Venue.latitude, Venue.longitude)).all()
+    existing_neighborhoods = _neighborhood_points(
+        connection.execute(select(Neighborhood.id, Neighborhood.boundary)).mappings().all()
+    )
+
+    _assign_ids(connection, Neighborhood, neighborhoods)
+    venue_ids = _assign_ids(connection, Venue, venues)
+    # Number reviews grouped by venue, so the venue indexes on review grow
+    # at their end instead of at random pages
+    review_venues = np.asarray(review_venues, dtype=np.int64)
+    order = np.argsort(review_venues, kind='stable')
+    sorted_reviews = [reviews[i] for i in order.tolist()]
+    review_ids = np.empty(len(reviews), dtype=np.int64)
+    review_ids[order] = _assign_ids(connection, Review, sorted_reviews)
+    for row, venue_id in zip(reviews, venue_ids[review_venues].tolist()):
+        row['venue_id'] = venue_id
+
+    _insert(connection, Neighborhood, neighborhoods)
+    _insert(connection, Venue, venues)
+    _insert(connection, Review, sorted_reviews)
+
+    # Membership: every neighborhood against the new venues, plus the new
+    # neighborhoods against venues that were already there
+    new_neighborhoods = _neighborhood_points(neighborhoods)
+    all_neighborhoods = existing_neighborhoods + new_neighborhoods
+    venue_lats = np.array([row['latitude'] for row in venues], dtype=np.float64)
+    venue_lngs = np.array([row['longitude'] for row in venues], dtype=np.float64)
+    new_mask = _membership_mask(all_neighborhoods, venue_lats, venue_lngs)
+    old_mask = _membership_mask(
+        new_neighborhoods,
+        np.array([lat for _, lat, _ in existing_venues]), np.array([lng for _, _, lng in existing_venues])
+    )
+    pairs = [
+        {'neighborhood_id': all_neighborhoods[i][0], 'venue_id': int(venue_ids[j])}
+        for i, j in zip(*new_mask.nonzero())
+    ] + [
+        {'neighborhood_id': new_neighborhoods[i][0], 'venue_id': existing_venues[j][0]}
+        for i, j in zip(*old_mask.nonzero())
+    ]
+    _insert(connection, NeighborhoodVenue, pairs)
+    index_venues(connection, [(row['id'], row['latitude'], row['longitude']) for row in venues])
+
+    scored = 0 if scores is None else len(scores)
+    if scored:
+        # Sum the stored float32 values so the hotspots match a later rebuild
+        scores = np.asarray(scores, dtype=SCORE_DTYPE).astype(np.float64)
+        by_id = np.argsort(review_ids[:scored])
+        scored_ids = review_ids[by_id].tolist()
+        _insert(connection, EmotionVector, vector_mappings(scored_ids, list(labels), scores[by_id]))
+        record_vectors(connection, scored_ids)
+
+        # Sum scores per venue, then per neighborhood through the membership mask
+        scored_venues = review_venues[:scored]
+        venue_counts = np.bincount(scored_venues, minlength=len(venues))
+        venue_sums = np.column_stack([
+            np.bincount(scored_venues, weights=scores[:, k], minlength=len(venues))
+            for k in range(len(labels))
+        ])
+        _insert(connection, VenueEmotion, [
+            {'venue_id': int(venue_ids[j]), 'emotion': label,
+             'score_sum': float(venue_sums[j, k]), 'review_count': int(venue_counts[j])}
+            for j in np.flatnonzero(venue_counts)
+            for k, label in enumerate(labels)
+        ])
+        neighborhood_counts = new_mask.astype(np.int64) @ venue_counts
+        neighborhood_sums = new_mask.astype(np.float64) @ venue_sums
+        heatmap_generator.apply_aggregates([
+            (all_neighborhoods[i][0], label, float(neighborhood_sums[i, k]), int(neighborhood_counts[i]))
+            for i in np.flatnonzero(neighborhood_counts)
+            for k, label in enumerate(labels)
+        ])
+
+    # Scores stored earlier count towards the new neighborhoods around their venues
+    if old_mask.any():
+        heatmap_generator.apply_aggregates(
+            _existing_venue_aggregates(connection, new_neighborhoods, existing_venues, old_mask)
+        )
+
+    db.session.commit()
+    return scored
@@ -0,0 +1,44 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Radius of Earth in kilometers
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate the great circle distance between two points 
+    on the earth (specified in decimal degrees)
+    """
+    # Convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+def haversine_matrix(lats1, lons1, lats2, lons2):
+    """
+    Vectorized haversine distance between every pair of points.
+
+    Takes two sets of coordinates in decimal degrees and returns an
+    array of shape (len(lats1), len(lats2)) with distances in kilometers.
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lon1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lon2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    # Rounding can push a a hair above 1 for antipodal points
+    c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return c * EARTH_RADIUS_KM
+
+def within_radius_mask(lats1, lons1, lats2, lons2, radius_km):
+    """Boolean matrix marking which pairs of points are within radius_km."""
+    return haversine_matrix(lats1, lons1, lats2, lons2) <= radius_km
+
+def distance_matrix(lats, lons):
+    """Square matrix of distances in kilometers between all given points."""
+    return haversine_matrix(lats, lons, lats, lons)
@@ -1,107 +1,327 @@
+import hashlib
 import json
-import math
-from sqlalchemy import func
+import os
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
 from app import db
-from app.models.models import Venue, Review, EmotionScore, Neighborhood, EmotionalHotspot
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """
-    Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees)
-    """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Radius of Earth in kilometers
-    return c * r
+from app.models.models import Review, EmotionLabelSet, EmotionVector, VenueEmotion, Neighborhood, NeighborhoodVenue, EmotionalHotspot
+from app.services.geo.distance import haversine_distance
+from app.services.cache import LRUCache
+from app.services.geo.membership import pop_stale_neighborhoods
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+ID_CHUNK_SIZE = 500
+
+# Score vectors decoded and summed per NumPy call while aggregating
+VECTOR_CHUNK_SIZE = 5000
+
+def _sum_vectors(pending, totals):
+    """Add groups of packed score vectors into the running per-group (sums, count) totals."""
+    for key, blobs in pending.items():
+        vectors = EmotionVector.unpack(b''.join(blobs)).reshape(len(blobs), -1)
+        sums, count = totals.get(key, (0.0, 0))
+        totals[key] = (sums + vectors.sum(axis=0, dtype=np.float64), count + len(blobs))
 
 class HeatmapGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, cache_size=64):
+        # Rendered responses keyed by (emotion, data version). Writers never
+        # clear it: uncommitted hotspots are invisible to other requests, and
+        # committing them changes the version
+        self.cache = LRUCache('heatmap', maxsize=cache_size)
 
-    def _calculate_neighborhood_scores(self, emotion):
-        """Calculate average emotion scores for each neighborhood."""
-        try:
-            # Get all neighborhoods
-            neighborhoods = Neighborhood.query.all()
-            
-            # For each neighborhood, calculate average emotion score
-            results = []
-            
-            for neighborhood in neighborhoods:
-                # Extract neighborhood coordinates from GeoJSON
-                try:
-                    boundary = json.loads(neighborhood.boundary)
-                    neighborhood_lat = boundary["coordinates"][1]
-                    neighborhood_lng = boundary["coordinates"][0]
-                except (json.JSONDecodeError, KeyError, IndexError):
-                    # Skip neighborhoods with invalid boundaries
-                    continue
-                
-                # Find nearby venues using distance calculation
-                nearby_venues = []
-                for venue in Venue.query.all():
-                    distance = haversine_distance(
-                        neighborhood_lat, neighborhood_lng,
-                        venue.latitude, venue.longitude
-                    )
-                    
-                    # Consider venues within 2km as "nearby"
-                    if distance <= 2.0:
-                        nearby_venues.append(venue.id)
-                
-                if not nearby_venues:
-                    continue
-                
-                # Get emotion scores for reviews of nearby venues
-                emotion_scores = db.session.query(
-                    EmotionScore.score
-                ).join(
-                    Review, Review.id == EmotionScore.review_id
-                ).filter(
-                    EmotionScore.emotion == emotion,
-                    Review.venue_id.in_(nearby_venues)
-                ).all()
-                
-                # Calculate average score
-                scores = [score[0] for score in emotion_scores]
-                if scores:
-                    avg_score = sum(scores) / len(scores)
-                    results.append((neighborhood, avg_score, len(scores)))
-            
-            return results
+    def _venue_sums(self, review_ids=None):
+        """
+        Sum score vectors per venue and emotion.
+
+        SQL cannot see inside the blobs, so they are decoded and summed per
+        venue and label set with NumPy. Returns {(venue_id, emotion):
+        (score_sum, review_count)} for the given reviews, or for every
+        stored vector.
+        """
+        query = db.session.query(
+            Review.venue_id,
+            EmotionVector.label_set_id,
+            EmotionVector.scores
+        ).join(
+            EmotionVector, EmotionVector.review_id == Review.id
+        )
+        if review_ids is not None:
+            query = query.filter(EmotionVector.review_id.in_(review_ids))
         
-        except Exception as e:
-            print(f"Error calculating neighborhood scores: {str(e)}")
-            return []
+        # (venue_id, label_set_id) -> (score sums, vector count)
+        totals = {}
+        pending = defaultdict(list)
+        for i, (venue_id, label_set_id, blob) in enumerate(query.yield_per(VECTOR_CHUNK_SIZE), 1):
+            pending[(venue_id, label_set_id)].append(blob)
+            if i % VECTOR_CHUNK_SIZE == 0:
+                _sum_vectors(pending, totals)
+                pending.clear()
+        _sum_vectors(pending, totals)
+        
+        label_sets = {
+            label_set.id: label_set.label_list
+            for label_set in EmotionLabelSet.query.filter(
+                EmotionLabelSet.id.in_([label_set_id for _, label_set_id in totals])
+            )
+        }
+        
+        # Label sets of different models may share emotions
+        sums = {}
+        for (venue_id, label_set_id), (score_sums, count) in totals.items():
+            for emotion, score_sum in zip(label_sets[label_set_id], score_sums.tolist()):
+                previous_sum, previous_count = sums.get((venue_id, emotion), (0.0, 0))
+                sums[(venue_id, emotion)] = (previous_sum + score_sum, previous_count + count)
+        return sums
 
-    def _update_hotspots(self, emotion, neighborhood_scores):
-        """Update or create emotional hotspots in the database."""
-        for neighborhood, avg_score, review_count in neighborhood_scores:
-            hotspot = EmotionalHotspot.query.filter_by(
-                neighborhood_id=neighborhood.id,
-                emotion=emotion
-            ).first()
-            
-            if hotspot:
-                hotspot.average_score = avg_score
-                hotspot.review_count = review_count
-            else:
+    def _store_venue_sums(self, sums):
+        """Add {(venue_id, emotion): (score_sum, review_count)} to the running VenueEmotion sums."""
+        venue_ids = {venue_id for venue_id, _ in sums}
+        existing = {
+            (row.venue_id, row.emotion): row
+            for row in VenueEmotion.query.filter(VenueEmotion.venue_id.in_(venue_ids))
+        }
+        for (venue_id, emotion), (score_sum, review_count) in sums.items():
+            row = existing.get((venue_id, emotion))
+            if row is None:
+                row = VenueEmotion(venue_id=venue_id, emotion=emotion, score_sum=0.0, review_count=0)
+                db.session.add(row)
+            row.score_sum += score_sum
+            row.review_count += review_count
+
+    def _neighborhood_sums(self, venue_sums):
+        """Spread per-venue sums over the neighborhoods each venue belongs to, as aggregate rows."""
+        by_venue = defaultdict(list)
+        for (venue_id, emotion), totals in venue_sums.items():
+            by_venue[venue_id].append((emotion, totals))
+        
+        rows = {}
+        memberships = db.session.query(
+            NeighborhoodVenue.neighborhood_id, NeighborhoodVenue.venue_id
+        ).filter(NeighborhoodVenue.venue_id.in_(list(by_venue)))
+        for neighborhood_id, venue_id in memberships:
+            for emotion, (score_sum, review_count) in by_venue[venue_id]:
+                previous_sum, previous_count = rows.get((neighborhood_id, emotion), (0.0, 0))
+                rows[(neighborhood_id, emotion)] = (previous_sum + score_sum, previous_count + review_count)
+        
+        return [
+            (neighborhood_id, emotion, score_sum, review_count)
+            for (neighborhood_id, emotion), (score_sum, review_count) in rows.items()
+        ]
+
+    def _aggregate_scores(self, neighborhood_ids=None, session=None):
+        """
+        Sum emotion scores per neighborhood from the per-venue running sums.
+
+        One grouped query, so only a row per neighborhood and emotion leaves
+        the database. Returns rows of (neighborhood_id, emotion, score_sum,
+        review_count), optionally restricted to the given neighborhoods.
+        """
+        session = session if session is not None else db.session
+        query = session.query(
+            NeighborhoodVenue.neighborhood_id,
+            VenueEmotion.emotion,
+            func.sum(VenueEmotion.score_sum),
+            func.sum(VenueEmotion.review_count)
+        ).join(
+            VenueEmotion, VenueEmotion.venue_id == NeighborhoodVenue.venue_id
+        )
+        if neighborhood_ids is not None:
+            query = query.filter(NeighborhoodVenue.neighborhood_id.in_(neighborhood_ids))
+        
+        return [
+            tuple(row) for row in query.group_by(NeighborhoodVenue.neighborhood_id, VenueEmotion.emotion)
+        ]
+
+    def _store_hotspots(self, rows, replace=False, neighborhood_ids=None, session=None):
+        """
+        Write aggregate rows into EmotionalHotspot, adding to the running sums
+        unless replacing the hotspots of neighborhood_ids (default: all).
+        """
+        session = session if session is not None else db.session
+        if replace:
+            query = session.query(EmotionalHotspot)
+            if neighborhood_ids is not None:
+                query = query.filter(EmotionalHotspot.neighborhood_id.in_(neighborhood_ids))
+            hotspots = query.all()
+        else:
+            neighborhood_ids = {row[0] for row in rows}
+            if not neighborhood_ids:
+                return
+            hotspots = session.query(EmotionalHotspot).filter(
+                EmotionalHotspot.neighborhood_id.in_(neighborhood_ids)
+            ).all()
+        existing = {(hotspot.neighborhood_id, hotspot.emotion): hotspot for hotspot in hotspots}
+        
+        now = datetime.utcnow()
+        for neighborhood_id, emotion, score_sum, review_count in rows:
+            hotspot = existing.pop((neighborhood_id, emotion), None)
+            if hotspot is None:
                 hotspot = EmotionalHotspot(
-                    neighborhood_id=neighborhood.id,
+                    neighborhood_id=neighborhood_id,
                     emotion=emotion,
-                    average_score=avg_score,
-                    review_count=review_count
+                    score_sum=0.0,
+                    review_count=0
                 )
-                db.session.add(hotspot)
+                session.add(hotspot)
+            elif replace:
+                hotspot.score_sum = 0.0
+                hotspot.review_count = 0
+            
+            hotspot.score_sum += score_sum
+            hotspot.review_count += review_count
+            hotspot.average_score = hotspot.score_sum / hotspot.review_count
+            hotspot.last_updated = now
         
+        # Anything left over no longer has scores behind it
+        if replace:
+            for hotspot in existing.values():
+                session.delete(hotspot)
+
+    def apply_new_scores(self, review_ids):
+        """
+        Fold the emotion scores of newly analyzed reviews into the venue sums
+        and the hotspots.
+
+        Must be called in the same transaction that inserted the scores; the
+        caller is responsible for committing.
+        """
+        review_ids = list(review_ids)
+        for i in range(0, len(review_ids), ID_CHUNK_SIZE):
+            venue_sums = self._venue_sums(review_ids[i:i + ID_CHUNK_SIZE])
+            self._store_venue_sums(venue_sums)
+            self._store_hotspots(self._neighborhood_sums(venue_sums))
+
+    def apply_aggregates(self, rows):
+        """
+        Add precomputed (neighborhood_id, emotion, score_sum, review_count)
+        rows to the hotspots.
+
+        For bulk loaders that summed their scores in memory; the caller is
+        responsible for committing.
+        """
+        self._store_hotspots(rows)
+
+    def rebuild_venue_sums(self):
+        """
+        Recompute every venue's running sums by decoding all stored vectors.
+
+        A repair tool, as it reads every vector; the caller is responsible
+        for committing.
+        """
+        VenueEmotion.query.delete()
+        db.session.add_all(
+            VenueEmotion(venue_id=venue_id, emotion=emotion, score_sum=score_sum, review_count=review_count)
+            for (venue_id, emotion), (score_sum, review_count) in self._venue_sums().items()
+        )
+
+    def refresh_hotspots(self):
+        """
+        Rebuild every hotspot from the venue sums.
+
+        Only needed after membership was rebuilt outside the ORM; new scores
+        and venue or neighborhood changes are applied incrementally.
+        """
+        self._store_hotspots(self._aggregate_scores(), replace=True)
         db.session.commit()
 
+    def refresh_neighborhoods(self, neighborhood_ids, session=None):
+        """
+        Rebuild the hotspots of the given neighborhoods, e.g. after their
+        venues changed, in session (default: db.session); the caller is
+        responsible for committing.
+        """
+        neighborhood_ids = list(neighborhood_ids)
+        for i in range(0, len(neighborhood_ids), ID_CHUNK_SIZE):
+            chunk = neighborhood_ids[i:i + ID_CHUNK_SIZE]
+            self._store_hotspots(
+                self._aggregate_scores(neighborhood_ids=chunk, session=session),
+                replace=True, neighborhood_ids=chunk, session=session
+            )
+
+    def data_version(self):
+        """Return a token that changes whenever the materialized hotspots change."""
+        last_updated, count = db.session.query(
+            func.max(EmotionalHotspot.last_updated),
+            func.count(EmotionalHotspot.id)
+        ).one()
+        return f"{last_updated.isoformat() if last_updated else ''}:{count}"
+
+    def _load_hotspots(self, emotion):
+        """Read the materialized hotspots for an emotion."""
+        rows = db.session.query(
+            Neighborhood,
+            EmotionalHotspot.average_score,
+            EmotionalHotspot.review_count
+        ).join(
+            EmotionalHotspot, EmotionalHotspot.neighborhood_id == Neighborhood.id
+        ).filter(
+            EmotionalHotspot.emotion == emotion,
+            EmotionalHotspot.review_count > 0
+        ).order_by(
+            # Same order as Neighborhood.id, but lets SQLite read it straight off the covering index
+            EmotionalHotspot.neighborhood_id
+        ).all()
+        
+        return [tuple(row) for row in rows]
+
+    def _load_all_hotspots(self, emotions=None):
+        """Read the materialized hotspots of several emotions, or all of them, in one query."""
+        query = db.session.query(
+            Neighborhood.id,
+            Neighborhood.name,
+            Neighborhood.boundary,
+            EmotionalHotspot.emotion,
+            EmotionalHotspot.average_score,
+            EmotionalHotspot.review_count
+        ).join(
+            EmotionalHotspot, EmotionalHotspot.neighborhood_id == Neighborhood.id
+        ).filter(
+            EmotionalHotspot.review_count > 0
+        )
+        if emotions is not None:
+            query = query.filter(EmotionalHotspot.emotion.in_(emotions))
+        
+        return query.order_by(EmotionalHotspot.neighborhood_id).all()
+
+    def generate_all(self, emotions=None):
+        """
+        Generate the heatmap of several emotions, or all of them, in one pass.
+
+        Instead of one GeoJSON feature per neighborhood and emotion, each
+        neighborhood appears once with a vector of average scores that
+        follows the top-level emotions list; emotions without scores in a
+        neighborhood are null.
+        """
+        rows = self._load_all_hotspots(emotions)
+        if emotions is None:
+            emotions = sorted({row.emotion for row in rows})
+        columns = {emotion: k for k, emotion in enumerate(emotions)}
+        
+        neighborhoods = {}
+        for neighborhood_id, name, boundary, emotion, average_score, review_count in rows:
+            entry = neighborhoods.get(neighborhood_id)
+            if entry is None:
+                try:
+                    geometry = json.loads(boundary)
+                except (TypeError, json.JSONDecodeError):
+                    continue
+                entry = neighborhoods[neighborhood_id] = {
+                    'neighborhood': name,
+                    'geometry': geometry,
+                    'review_count': 0,
+                    'scores': [None] * len(emotions)
+                }
+            entry['scores'][columns[emotion]] = float(average_score)
+            entry['review_count'] = max(entry['review_count'], review_count)
+        
+        return {
+            'emotions': list(emotions),
+            'neighborhoods': list(neighborhoods.values())
+        }
+
     def _create_geojson(self, emotion, neighborhood_scores):
         """Create GeoJSON representation of emotional hotspots."""
         features = []
@@ -139,24 +359,56 @@ class HeatmapGenerator:
         
         return geojson
 
-    def generate(self, emotion):
-        """Generate emotional heatmap for specified emotion."""
+    def _generate(self, emotion):
+        """Return (payload, is_real) for an emotion; demo data is not real."""
         try:
-            # Calculate scores for each neighborhood
-            neighborhood_scores = self._calculate_neighborhood_scores(emotion)
+            # Read precomputed scores for each neighborhood
+            neighborhood_scores = self._load_hotspots(emotion)
             
             # If no scores (likely due to no data), return fallback data
             if not neighborhood_scores:
-                return self._generate_fallback_data(emotion)
-            
-            # Update hotspots in database
-            self._update_hotspots(emotion, neighborhood_scores)
+                return self._generate_fallback_data(emotion), False
             
             # Generate GeoJSON
-            return self._create_geojson(emotion, neighborhood_scores)
+            return self._create_geojson(emotion, neighborhood_scores), True
         except Exception as e:
             print(f"Error generating heatmap: {str(e)}")
-            return self._generate_fallback_data(emotion)
+            return self._generate_fallback_data(emotion), False
+
+    def generate(self, emotion):
+        """Generate emotional heatmap for specified emotion."""
+        return self._generate(emotion)[0]
+    
+    def _render_cached(self, key, build):
+        """
+        Return (json_bytes, etag) for key, building the payload on a cache miss.
+
+        build returns (payload, cacheable); demo fallbacks are not cached, so
+        an error or an empty database is not remembered.
+        """
+        key = (key, self.data_version())
+        entry = self.cache.get(key)
+        if entry is None:
+            payload, cacheable = build()
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+            entry = (body, hashlib.sha1(body).hexdigest())
+            if cacheable:
+                self.cache.put(key, entry)
+        return entry
+
+    def render(self, emotion):
+        """
+        Return the heatmap for an emotion as (json_bytes, etag).
+
+        Responses are cached until the hotspot data version changes; the ETag
+        is a hash of the body so identical payloads always share it.
+        """
+        return self._render_cached(emotion, lambda: self._generate(emotion))
+
+    def render_all(self, emotions=None):
+        """Return generate_all for several emotions, or all of them, as cached (json_bytes, etag)."""
+        key = ('*',) if emotions is None else tuple(emotions)
+        return self._render_cached(key, lambda: (self.generate_all(emotions), True))
     
     def _generate_fallback_data(self, emotion):
         """Generate fallback data when no real data is available."""
@@ -192,9 +444,47 @@ class HeatmapGenerator:
             "features": features
         }
 
+# Rebuild the hotspots of neighborhoods whose venues changed, in the
+# committing session's own transaction
+@event.listens_for(Session, 'before_commit')
+def _refresh_stale_neighborhoods(session):
+    # Flush first so the membership events of pending changes have run
+    session.flush()
+    neighborhood_ids = pop_stale_neighborhoods(session)
+    if neighborhood_ids:
+        generator.refresh_neighborhoods(neighborhood_ids, session=session)
+
 # Create generator instance
-generator = HeatmapGenerator()
+generator = HeatmapGenerator(cache_size=int(os.getenv('HEATMAP_CACHE_SIZE', '64')))
 
 def generate(emotion):
     """Wrapper function to generate heatmap."""
-    return generator.generate(emotion) 
\ No newline at end of file
+    return generator.generate(emotion)
+
+def render(emotion):
+    """Wrapper function to get the cached heatmap body and ETag."""
+    return generator.render(emotion)
+
+def render_all(emotions=None):
+    """Wrapper function to get the cached multi-emotion heatmap body and ETag."""
+    return generator.render_all(emotions)
+
+def apply_new_scores(review_ids):
+    """Wrapper function to fold new emotion scores into the hotspots."""
+    generator.apply_new_scores(review_ids)
+
+def apply_aggregates(rows):
+    """Wrapper function to add precomputed score sums to the hotspots."""
+    generator.apply_aggregates(rows)
+
+def rebuild_venue_sums():
+    """Wrapper function to recompute every venue's score sums from the stored vectors."""
+    generator.rebuild_venue_sums()
+
+def refresh_hotspots():
+    """Wrapper function to rebuild all hotspots."""
+    generator.refresh_hotspots()
+
+def refresh_neighborhoods(neighborhood_ids):
+    """Wrapper function to rebuild the hotspots of some neighborhoods."""
+    generator.refresh_neighborhoods(neighborhood_ids) 
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import math
+import os
+import numpy as np
+from app.services.cache import LRUCache
+from app.services.recommender import recommender
+
+# Bins per tile side, so a tile never holds more than GRID_SIZE ** 2 cells
+GRID_SIZE = 64
+
+MAX_ZOOM = 18
+
+# Web Mercator stops at the latitude where the map becomes square
+MAX_LATITUDE = 85.05112878
+
+def mercator(lats, lngs):
+    """Project coordinates to Web Mercator x, y in [0, 1), y growing southwards."""
+    lats = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lats) + 1.0 / np.cos(lats)) / math.pi) / 2.0
+    # Keep points on the far edges inside the last tile
+    return np.clip(x, 0.0, np.nextafter(1.0, 0.0)), np.clip(y, 0.0, np.nextafter(1.0, 0.0))
+
+class ZoomGrid:
+    """
+    Venue weights binned into GRID_SIZE x GRID_SIZE cells per tile at one zoom.
+
+    Occupied cells are stored sorted by tile, so a tile is a contiguous
+    slice found with a binary search.
+    """
+
+    def __init__(self, tile_keys, cells, weights, counts):
+        self.tile_keys = tile_keys
+        self.cells = cells
+        self.weights = weights
+        self.counts = counts
+
+    @classmethod
+    def build(cls, x, y, weights, counts, zoom):
+        tiles = 1 << zoom
+        columns = np.minimum((x * tiles * GRID_SIZE).astype(np.int64), tiles * GRID_SIZE - 1)
+        rows = np.minimum((y * tiles * GRID_SIZE).astype(np.int64), tiles * GRID_SIZE - 1)
+        tile_keys = (rows // GRID_SIZE) * tiles + columns // GRID_SIZE
+        cells = (rows % GRID_SIZE) * GRID_SIZE + columns % GRID_SIZE
+
+        # Sum the venues sharing a cell, ordered by tile then cell
+        keys, inverse = np.unique(tile_keys * GRID_SIZE * GRID_SIZE + cells, return_inverse=True)
+        return cls(
+            keys // (GRID_SIZE * GRID_SIZE),
+            keys % (GRID_SIZE * GRID_SIZE),
+            np.bincount(inverse, weights=weights, minlength=len(keys)),
+            np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64)
+        )
+
+    def tile(self, zoom, x, y):
+        """Return the (cells, weights, counts) of one tile."""
+        key = y * (1 << zoom) + x
+        start, end = np.searchsorted(self.tile_keys, [key, key + 1])
+        return self.cells[start:end], self.weights[start:end], self.counts[start:end]
+
+class HeatmapTiler:
+    def __init__(self, grid_cache_size=32, tile_cache_size=1024):
+        # Binned grids keyed by (vector version, emotion, zoom)
+        self.grids = LRUCache('heatmap_grids', maxsize=grid_cache_size)
+        # Rendered tiles keyed by (vector version, emotion, zoom, x, y)
+        self.tiles = LRUCache('heatmap_tiles', maxsize=tile_cache_size)
+
+    def clear(self):
+        """Forget every grid and tile, e.g. when the database they were built from is replaced."""
+        self.grids.clear()
+        self.tiles.clear()
+
+    def _grid(self, version, emotion, zoom):
+        key = (version, emotion, zoom)
+        grid = self.grids.get(key)
+        if grid is None:
+            matrix = recommender.venue_emotions(version)
+            if emotion in matrix.labels:
+                # A venue weighs the sum of its reviews' scores for the emotion
+                weights = matrix.sums[:, matrix.labels.index(emotion)]
+                scored = weights > 0
+            else:
+                weights = np.zeros(len(matrix.venue_ids))
+                scored = np.zeros(len(matrix.venue_ids), dtype=bool)
+            x, y = mercator(matrix.lats[scored], matrix.lngs[scored])
+            grid = ZoomGrid.build(x, y, weights[scored], matrix.counts[scored], zoom)
+            self.grids.put(key, grid)
+        return grid
+
+    def generate(self, emotion, zoom, x, y, version=None):
+        """
+        Return the weight grid of one map tile.
+
+        Cells are numbered row * grid + column from the tile's top-left
+        corner and only occupied cells are listed. weights holds the summed
+        emotion scores of the venues in each cell and review_counts their
+        reviews, so weight / review_count is the cell's average score.
+        """
+        if version is None:
+            version = recommender.vector_version()
+        cells, weights, counts = self._grid(version, emotion, zoom).tile(zoom, x, y)
+        return {
+            'z': zoom,
+            'x': x,
+            'y': y,
+            'emotion': emotion,
+            'grid': GRID_SIZE,
+            'cells': cells.tolist(),
+            'weights': [round(weight, 4) for weight in weights.tolist()],
+            'review_counts': counts.tolist(),
+            'max_weight': round(float(weights.max()), 4) if len(weights) else 0.0
+        }
+
+    def render(self, emotion, zoom, x, y):
+        """
+        Return a tile as cached (json_bytes, etag).
+
+        Raises ValueError for tiles outside the map.
+        """
+        if not 0 <= zoom <= MAX_ZOOM or not (0 <= x < 1 << zoom and 0 <= y < 1 << zoom):
+            raise ValueError(f'No tile {zoom}/{x}/{y}')
+        # Two primary key reads, so a cached tile never touches the vectors
+        version = recommender.vector_version()
+        key = (version, emotion, zoom, x, y)
+        entry = self.tiles.get(key)
+        if entry is None:
+            body = json.dumps(self.generate(emotion, zoom, x, y, version), separators=(',', ':')).encode('utf-8')
+            entry = (body, hashlib.sha1(body).hexdigest())
+            self.tiles.put(key, entry)
+        return entry
+
+# Create tiler instance
+tiler = HeatmapTiler(tile_cache_size=int(os.getenv('HEATMAP_TILE_CACHE_SIZE', '1024')))
+
+def render_tile(emotion, zoom, x, y):
+    """Wrapper function to get a cached heatmap tile body and ETag."""
+    return tiler.render(emotion, zoom, x, y)
@@ -0,0 +1,150 @@
+import json
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models.models import Venue, Neighborhood, NeighborhoodVenue, EmotionalHotspot, DataState
+from app.services.geo.distance import within_radius_mask
+from app.services.geo.spatial_index import query_venues
+
+# Venues within this distance of a neighborhood count towards its scores
+NEARBY_RADIUS_KM = 2.0
+
+# Session.info key of the neighborhoods whose venues changed in the session
+STALE_KEY = 'stale_neighborhoods'
+
+# DataState flag set once membership has been backfilled
+BACKFILLED_KEY = 'membership_backfilled'
+
+def neighborhood_coordinates(boundary):
+    """Return (lat, lng) from a neighborhood's GeoJSON boundary, or None if invalid."""
+    try:
+        coordinates = json.loads(boundary)["coordinates"]
+        return float(coordinates[1]), float(coordinates[0])
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+def _mark_stale(session, neighborhood_ids):
+    session.info.setdefault(STALE_KEY, set()).update(neighborhood_ids)
+
+def pop_stale_neighborhoods(session):
+    """Return and forget the ids of neighborhoods whose venues changed in the session."""
+    return session.info.pop(STALE_KEY, set())
+
+def _venues_near(connection, session, lat, lng):
+    return query_venues(lat, lng, NEARBY_RADIUS_KM, connection, session)
+
+def _neighborhoods_near(connection, venues):
+    """Return (neighborhood_id, venue_id) pairs for the given (id, lat, lng) venues."""
+    neighborhoods = []
+    for neighborhood_id, boundary in connection.execute(select(Neighborhood.id, Neighborhood.boundary)):
+        coordinates = neighborhood_coordinates(boundary)
+        if coordinates:
+            neighborhoods.append((neighborhood_id, coordinates))
+    if not neighborhoods or not venues:
+        return []
+
+    mask = within_radius_mask(
+        [lat for _, (lat, _) in neighborhoods], [lng for _, (_, lng) in neighborhoods],
+        [lat for _, lat, _ in venues], [lng for _, _, lng in venues],
+        NEARBY_RADIUS_KM
+    )
+    return [
+        (neighborhoods[i][0], venues[j][0])
+        for i, j in zip(*mask.nonzero())
+    ]
+
+def _insert_pairs(connection, pairs):
+    if pairs:
+        connection.execute(
+            insert(NeighborhoodVenue),
+            [{'neighborhood_id': n_id, 'venue_id': v_id} for n_id, v_id in pairs]
+        )
+
+def assign_venues(connection, venues):
+    """Add membership rows for newly inserted (id, lat, lng) venues and return the pairs."""
+    pairs = _neighborhoods_near(connection, venues)
+    _insert_pairs(connection, pairs)
+    return pairs
+
+def _neighborhoods_of(connection, venue_id):
+    return connection.execute(
+        select(NeighborhoodVenue.neighborhood_id).where(NeighborhoodVenue.venue_id == venue_id)
+    ).scalars().all()
+
+def _moved(target, *columns):
+    state = inspect(target)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+def _recompute_membership():
+    db.session.execute(delete(NeighborhoodVenue))
+    connection = db.session.connection()
+    pairs = []
+    for neighborhood_id, boundary in db.session.query(Neighborhood.id, Neighborhood.boundary):
+        coordinates = neighborhood_coordinates(boundary)
+        if coordinates:
+            pairs.extend(
+                (neighborhood_id, venue_id) for venue_id in _venues_near(connection, db.session, *coordinates)
+            )
+    _insert_pairs(connection, pairs)
+    return len(pairs)
+
+def rebuild_membership():
+    """Recompute the whole venue/neighborhood membership table."""
+    pairs = _recompute_membership()
+    db.session.commit()
+    return pairs
+
+def ensure_membership():
+    """
+    Backfill the membership table once for databases created before it
+    existed, recording that it ran so later starts skip the check even when
+    no venue lies near any neighborhood. Run at startup, after create_all().
+    """
+    if db.session.get(DataState, BACKFILLED_KEY) is not None:
+        return
+    if db.session.query(NeighborhoodVenue.venue_id).first() is None:
+        _recompute_membership()
+    db.session.add(DataState(name=BACKFILLED_KEY, value=1))
+    db.session.commit()
+
+# Keep membership current as venues and neighborhoods are written through
+# the ORM, and remember whose hotspots need rebuilding before the commit
+@event.listens_for(Venue, 'after_insert')
+def _assign_inserted_venue(mapper, connection, target):
+    # A new venue has no scores yet, so no hotspot changes
+    assign_venues(connection, [(target.id, target.latitude, target.longitude)])
+
+@event.listens_for(Venue, 'after_update')
+def _reassign_updated_venue(mapper, connection, target):
+    if not _moved(target, 'latitude', 'longitude'):
+        return
+    stale = _neighborhoods_of(connection, target.id)
+    connection.execute(delete(NeighborhoodVenue).where(NeighborhoodVenue.venue_id == target.id))
+    pairs = assign_venues(connection, [(target.id, target.latitude, target.longitude)])
+    _mark_stale(object_session(target), stale + [neighborhood_id for neighborhood_id, _ in pairs])
+
+@event.listens_for(Venue, 'before_delete')
+def _unassign_venue(mapper, connection, target):
+    _mark_stale(object_session(target), _neighborhoods_of(connection, target.id))
+    connection.execute(delete(NeighborhoodVenue).where(NeighborhoodVenue.venue_id == target.id))
+
+@event.listens_for(Neighborhood, 'after_insert')
+@event.listens_for(Neighborhood, 'after_update')
+def _assign_neighborhood(mapper, connection, target):
+    if not _moved(target, 'boundary'):
+        return
+    connection.execute(delete(NeighborhoodVenue).where(NeighborhoodVenue.neighborhood_id == target.id))
+    coordinates = neighborhood_coordinates(target.boundary)
+    if coordinates:
+        venue_ids = _venues_near(connection, object_session(target), *coordinates)
+        _insert_pairs(connection, [(target.id, venue_id) for venue_id in venue_ids])
+    _mark_stale(object_session(target), [target.id])
+
+@event.listens_for(Neighborhood, 'before_delete')
+def _unassign_neighborhood(mapper, connection, target):
+    connection.execute(delete(NeighborhoodVenue).where(NeighborhoodVenue.neighborhood_id == target.id))
+    connection.execute(delete(EmotionalHotspot).where(EmotionalHotspot.neighborhood_id == target.id))
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_neighborhoods(session):
+    session.info.pop(STALE_KEY, None)
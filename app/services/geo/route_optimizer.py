@@ -0,0 +1,156 @@
+import time
+import numpy as np
+from app.services.geo.distance import distance_matrix
+
+# Cap on improving routes, under the 50 ms interactive target for 50
+# stops; the number of starts, not the clock, normally ends the search, so
+# results do not depend on load
+TIME_BUDGET_SECONDS = 0.04
+
+# Most nearest-neighbor starts tried
+MAX_STARTS = 8
+
+# Fewer starts for longer routes, as each costs more: at most this many
+# stops' worth of starts, e.g. 4 starts for 50 stops
+START_STOPS_BUDGET = 200
+
+# Stop once this many starts in a row have not shortened the best route
+STALL_STARTS = 2
+
+# Longest run of consecutive stops Or-opt moves as one block
+OR_OPT_MAX_SEGMENT = 3
+
+# Ignore improvements below this many kilometers, so rounding cannot cycle
+MIN_GAIN_KM = 1e-9
+
+def _padded_matrix(distances):
+    """
+    Add a dummy node at zero distance from every stop.
+
+    Routes are stored as [dummy, stop, ..., stop, dummy], so a move that
+    touches either end of the open path is scored like any other.
+    """
+    n = len(distances)
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = distances
+    return padded
+
+def _nearest_neighbor(distances, prefix):
+    """Extend the prefix route by always walking to the closest unvisited stop."""
+    n = len(distances)
+    route = list(prefix)
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[route] = False
+    for _ in range(n - len(route)):
+        row = np.where(unvisited, distances[route[-1]], np.inf)
+        nearest = int(row.argmin())
+        route.append(nearest)
+        unvisited[nearest] = False
+    return route
+
+def _two_opt(route, padded, first_movable, deadline):
+    """
+    Apply the best 2-opt move for each segment start, reversing route[i:j + 1].
+
+    Every end position j is scored at once with NumPy. Returns whether the
+    route was shortened.
+    """
+    improved = False
+    last = len(route) - 2
+    for i in range(first_movable, last):
+        if time.perf_counter() >= deadline:
+            break
+        nodes = np.asarray(route)
+        a, b = nodes[i - 1], nodes[i]
+        c, d = nodes[i + 1:last + 1], nodes[i + 2:last + 2]
+        gains = padded[a, b] + padded[c, d] - padded[a, c] - padded[b, d]
+        best = int(gains.argmax())
+        if gains[best] > MIN_GAIN_KM:
+            j = i + 1 + best
+            route[i:j + 1] = route[i:j + 1][::-1]
+            improved = True
+    return improved
+
+def _or_opt(route, padded, first_movable, deadline):
+    """
+    Move runs of up to OR_OPT_MAX_SEGMENT stops to their best other gap,
+    reversed if that is shorter. Returns whether the route was shortened.
+    """
+    improved = False
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        i = first_movable
+        while i + length <= len(route) - 1 and time.perf_counter() < deadline:
+            segment = route[i:i + length]
+            prev, nxt = route[i - 1], route[i + length]
+            removal_gain = padded[prev, segment[0]] + padded[segment[-1], nxt] - padded[prev, nxt]
+
+            rest = route[:i] + route[i + length:]
+            # Gaps (rest[k], rest[k + 1]), never in front of a fixed start
+            u = np.asarray(rest[first_movable - 1:-1])
+            v = np.asarray(rest[first_movable:])
+            forward = padded[u, segment[0]] + padded[segment[-1], v] - padded[u, v]
+            backward = padded[u, segment[-1]] + padded[segment[0], v] - padded[u, v]
+            costs = np.minimum(forward, backward)
+            best = int(costs.argmin())
+            if removal_gain - costs[best] > MIN_GAIN_KM:
+                k = first_movable - 1 + best
+                if backward[best] < forward[best]:
+                    segment = segment[::-1]
+                route[:] = rest[:k + 1] + segment + rest[k + 1:]
+                improved = True
+            else:
+                i += 1
+    return improved
+
+def path_length(route, distances):
+    """Length in kilometers of the open path visiting route in order."""
+    return float(distances[route[:-1], route[1:]].sum()) if len(route) > 1 else 0.0
+
+def optimize_route(lats, lngs, fixed_start=False, time_budget=TIME_BUDGET_SECONDS):
+    """
+    Order stops to shorten an open walking path through all of them.
+
+    Builds the pairwise distance matrix, then improves nearest-neighbor
+    routes with 2-opt and Or-opt moves until neither helps. Starting stops
+    are tried in a fixed order, up to MAX_STARTS and fewer for long
+    routes, until STALL_STARTS in a row bring no gain, so the same stops
+    give the same route; time_budget seconds only cap the search. With
+    fixed_start the first stop stays first; otherwise the route may start
+    anywhere. Returns the stop indices in visiting order and the (n, n)
+    distance matrix in kilometers.
+    """
+    n = len(lats)
+    distances = distance_matrix(lats, lngs)
+    if n <= 2:
+        return list(range(n)), distances
+
+    deadline = time.perf_counter() + time_budget
+    max_starts = min(MAX_STARTS, max(1, START_STOPS_BUDGET // n))
+    if fixed_start:
+        # Vary the second stop, nearest first
+        starts = [[0, second] for second in np.argsort(distances[0])[1:max_starts + 1].tolist()]
+    else:
+        # Stops far from the rest tend to be ends of a short path
+        starts = [[first] for first in np.argsort(-distances.sum(axis=1))[:max_starts].tolist()]
+
+    padded = _padded_matrix(distances)
+    first_movable = 2 if fixed_start else 1
+    best_route, best_length = None, np.inf
+    stalled = 0
+    for prefix in starts:
+        # The first start always runs, so there is a route to return
+        if best_route is not None and (stalled >= STALL_STARTS or time.perf_counter() >= deadline):
+            break
+        route = [n] + _nearest_neighbor(distances, prefix) + [n]
+        while time.perf_counter() < deadline:
+            improved = _two_opt(route, padded, first_movable, deadline)
+            improved = _or_opt(route, padded, first_movable, deadline) or improved
+            if not improved:
+                break
+        length = path_length(route[1:-1], distances)
+        if length < best_length - MIN_GAIN_KM:
+            best_route, best_length = route[1:-1], length
+            stalled = 0
+        else:
+            stalled += 1
+    return best_route, distances
@@ -0,0 +1,254 @@
+import math
+import threading
+import weakref
+import numpy as np
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models.models import Venue
+from app.services.geo.distance import EARTH_RADIUS_KM, within_radius_mask
+
+class SpatialIndex:
+    """
+    Grid index over (latitude, longitude) points.
+
+    Points are bucketed into fixed-size cells so a radius query only has to
+    look at the cells overlapping the query's bounding box. Candidates are
+    then checked with the haversine distance in a single NumPy call, so
+    results match a full scan with the same distance rule.
+    """
+
+    def __init__(self, cell_size_deg=0.02):
+        self.cell_size_lat = cell_size_deg
+        # Use a longitude cell size that divides 360 evenly so cell indices
+        # wrap cleanly across the antimeridian
+        self.lng_cells = int(math.ceil(360 / cell_size_deg))
+        self.cell_size_lng = 360 / self.lng_cells
+        self.cells = {}
+        self.points = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _lat_cell(self, lat):
+        return int(math.floor((lat + 90) / self.cell_size_lat))
+
+    def _lng_cell(self, lng):
+        return int(math.floor((lng + 180) / self.cell_size_lng)) % self.lng_cells
+
+    def add(self, item_id, lat, lng):
+        """Insert a point, replacing any previous position for the same id."""
+        with self._lock:
+            self._discard(item_id)
+            cell = (self._lat_cell(lat), self._lng_cell(lng))
+            self.cells.setdefault(cell, set()).add(item_id)
+            self.points[item_id] = (lat, lng, cell)
+
+    def remove(self, item_id):
+        """Remove a point from the index if present."""
+        with self._lock:
+            self._discard(item_id)
+
+    def _discard(self, item_id):
+        previous = self.points.pop(item_id, None)
+        if previous is None:
+            return
+        bucket = self.cells.get(previous[2])
+        if bucket is not None:
+            bucket.discard(item_id)
+            if not bucket:
+                del self.cells[previous[2]]
+
+    def _cell_ranges(self, lat, lng, radius_km):
+        """Return the latitude and longitude cell indices that may hold matches."""
+        angular_radius = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular_radius)
+        lat_range = range(self._lat_cell(max(lat - dlat, -90.0)),
+                          self._lat_cell(min(lat + dlat, 90.0)) + 1)
+
+        # Widest longitude offset of a spherical cap that does not contain a pole
+        full_width = lat - dlat <= -90 or lat + dlat >= 90
+        if not full_width:
+            ratio = math.sin(angular_radius) / math.cos(math.radians(lat))
+            full_width = ratio >= 1
+        if full_width:
+            return lat_range, range(self.lng_cells)
+
+        # Pad slightly so rounding never drops a boundary cell
+        dlng = math.degrees(math.asin(ratio)) + 1e-9
+        first = int(math.floor((lng - dlng + 180) / self.cell_size_lng))
+        last = int(math.floor((lng + dlng + 180) / self.cell_size_lng))
+        if last - first + 1 >= self.lng_cells:
+            return lat_range, range(self.lng_cells)
+        return lat_range, {i % self.lng_cells for i in range(first, last + 1)}
+
+    def query_radius(self, lat, lng, radius_km):
+        """Return the ids of all points within radius_km of (lat, lng), sorted."""
+        lat_range, lng_cells = self._cell_ranges(lat, lng, radius_km)
+        with self._lock:
+            candidates = []
+            if len(lat_range) * len(lng_cells) <= len(self.cells):
+                for lat_cell in lat_range:
+                    for lng_cell in lng_cells:
+                        bucket = self.cells.get((lat_cell, lng_cell))
+                        if bucket:
+                            candidates.extend(bucket)
+            else:
+                # Large radius: walking the occupied cells is cheaper
+                for (lat_cell, lng_cell), bucket in self.cells.items():
+                    if lat_cell in lat_range and lng_cell in lng_cells:
+                        candidates.extend(bucket)
+            if not candidates:
+                return []
+            coords = np.array([self.points[item_id][:2] for item_id in candidates])
+
+        # Confirm all candidates against the exact radius in one vectorized call
+        mask = within_radius_mask([lat], [lng], coords[:, 0], coords[:, 1], radius_km)[0]
+        return sorted(np.asarray(candidates)[mask].tolist())
+
+# One venue index per database engine, built lazily on first use. It only
+# ever holds committed venues, and remembers the highest venue id it has seen
+_venue_indexes = weakref.WeakKeyDictionary()
+_venue_indexes_lock = threading.Lock()
+
+# Session.info key of the venue changes waiting for the session to commit
+PENDING_KEY = 'venue_index_changes'
+
+def _pending(session, engine):
+    """Return the session's uncommitted (venue_id, old, new) changes for engine, in order."""
+    return [change[1:] for change in session.info.get(PENDING_KEY, ()) if change[0] is engine]
+
+def _record(session, engine, venue_id, old, new):
+    """Queue a venue change; old and new are (lat, lng), or None for an insert or delete."""
+    session.info.setdefault(PENDING_KEY, []).append((engine, venue_id, old, new))
+
+def _advance(max_id, inserted):
+    """
+    Return the highest venue id after inserting ids on top of max_id.
+
+    Returns None when the ids do not directly follow max_id, which means
+    another process added venues the index has not seen.
+    """
+    ids = sorted(venue_id for venue_id in inserted if venue_id > max_id)
+    if ids != list(range(max_id + 1, max_id + 1 + len(ids))):
+        return None
+    return ids[-1] if ids else max_id
+
+def _build(executor, pending):
+    """
+    Build an index of the committed venues.
+
+    executor may be inside a transaction with uncommitted changes; those
+    are undone in the built index so it matches what is committed.
+    """
+    index = SpatialIndex()
+    for venue_id, lat, lng in executor.execute(select(Venue.id, Venue.latitude, Venue.longitude)):
+        index.add(venue_id, lat, lng)
+    for venue_id, old, new in reversed(pending):
+        if old is None:
+            index.remove(venue_id)
+        else:
+            index.add(venue_id, *old)
+    index.max_id = max(index.points, default=0)
+    return index
+
+def get_venue_index(connection=None, session=None):
+    """
+    Return the committed venue index for the current database.
+
+    The index is rebuilt when venues were added by another process, which
+    a lookup of the highest venue id detects. Pass the connection and
+    session of a flush so the check runs in the same transaction; that
+    session's own uncommitted venues are expected and not a sign of a
+    stale index. Use query_venues to include them in results.
+    """
+    executor = connection if connection is not None else db.session
+    engine = connection.engine if connection is not None else db.engine
+    pending = _pending(session, engine) if session is not None else []
+    max_id = executor.execute(select(func.max(Venue.id))).scalar() or 0
+
+    index = _venue_indexes.get(engine)
+    if index is None or index.max_id is None or _advance(index.max_id, [
+        venue_id for venue_id, old, _ in pending if old is None
+    ]) != max_id:
+        with _venue_indexes_lock:
+            index = _build(executor, pending)
+            _venue_indexes[engine] = index
+    return index
+
+def query_venues(lat, lng, radius_km, connection=None, session=None):
+    """
+    Return the ids of venues within radius_km of (lat, lng), sorted.
+
+    Committed venues come from the index; venues the given session has
+    inserted, moved or deleted but not yet committed are applied on top.
+    """
+    engine = connection.engine if connection is not None else db.engine
+    ids = get_venue_index(connection, session).query_radius(lat, lng, radius_km)
+    pending = _pending(session, engine) if session is not None else []
+    if not pending:
+        return ids
+
+    ids = set(ids)
+    moved = {}
+    for venue_id, _, new in pending:
+        ids.discard(venue_id)
+        moved[venue_id] = new
+    moved = [(venue_id, point) for venue_id, point in moved.items() if point is not None]
+    if moved:
+        mask = within_radius_mask(
+            [lat], [lng], [point[0] for _, point in moved], [point[1] for _, point in moved], radius_km
+        )[0]
+        ids.update(venue_id for (venue_id, _), inside in zip(moved, mask) if inside)
+    return sorted(ids)
+
+def reset_venue_index():
+    """Drop the cached index for the current database so it is rebuilt on next use."""
+    with _venue_indexes_lock:
+        _venue_indexes.pop(db.engine, None)
+
+def index_venues(connection, venues):
+    """Queue (id, lat, lng) venues inserted outside the ORM unit of work for indexing on commit."""
+    for venue_id, lat, lng in venues:
+        _record(db.session, connection.engine, venue_id, None, (lat, lng))
+
+# Queue venue changes written through the ORM until their transaction ends
+@event.listens_for(Venue, 'after_insert')
+def _index_venue(mapper, connection, target):
+    _record(object_session(target), connection.engine, target.id, None, (target.latitude, target.longitude))
+
+@event.listens_for(Venue, 'after_update')
+def _reindex_venue(mapper, connection, target):
+    state = inspect(target)
+    lat = state.attrs.latitude.history
+    lng = state.attrs.longitude.history
+    old = (
+        lat.deleted[0] if lat.deleted else target.latitude,
+        lng.deleted[0] if lng.deleted else target.longitude
+    )
+    _record(object_session(target), connection.engine, target.id, old, (target.latitude, target.longitude))
+
+@event.listens_for(Venue, 'after_delete')
+def _unindex_venue(mapper, connection, target):
+    _record(object_session(target), connection.engine, target.id, (target.latitude, target.longitude), None)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_venue_changes(session):
+    changes = session.info.pop(PENDING_KEY, [])
+    for engine in {change[0] for change in changes}:
+        index = _venue_indexes.get(engine)
+        if index is None:
+            continue
+        pending = [change[1:] for change in changes if change[0] is engine]
+        for venue_id, _, new in pending:
+            if new is None:
+                index.remove(venue_id)
+            else:
+                index.add(venue_id, *new)
+        if index.max_id is not None:
+            index.max_id = _advance(index.max_id, [venue_id for venue_id, old, _ in pending if old is None])
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_venue_changes(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,133 @@
+from sqlalchemy import select
+from app import db
+from app.models.models import Venue, Neighborhood
+from app.services.geo.membership import neighborhood_coordinates
+from app.services.geo.route_optimizer import optimize_route
+from app.services.recommender import DEFAULT_RADIUS_KM, DEFAULT_TOP_K, recommend
+
+# Straight-line walking pace between stops, and time spent at each stop
+WALKING_SPEED_KMH = 4.5
+VISIT_MINUTES = 45
+
+# Most hotspots one itinerary may order, so a request cannot keep the
+# route optimizer busy on an unbounded list
+MAX_STOPS = 50
+
+def _given_coordinates(hotspot):
+    """Return (lat, lng) sent with a hotspot, as location.lat/lng or lat/lng, or None."""
+    location = hotspot.get('location') or hotspot
+    try:
+        return float(location['lat']), float(location['lng'])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+def _coordinates_by_name(names):
+    """Return {name: (lat, lng)} for neighborhood or venue names, preferring neighborhoods."""
+    if not names:
+        return {}
+    found = {}
+    for name, venue_lat, venue_lng in db.session.execute(
+        select(Venue.name, Venue.latitude, Venue.longitude).where(Venue.name.in_(names))
+    ):
+        found.setdefault(name, (venue_lat, venue_lng))
+    for name, boundary in db.session.execute(
+        select(Neighborhood.name, Neighborhood.boundary).where(Neighborhood.name.in_(names))
+    ):
+        coordinates = neighborhood_coordinates(boundary)
+        if coordinates:
+            found[name] = coordinates
+    return found
+
+def resolve_stops(hotspots):
+    """
+    Return (lat, lng) for each hotspot.
+
+    Coordinates sent by the client are used as they are; otherwise the
+    hotspot's name is looked up as a neighborhood or a venue. Raises
+    ValueError naming the hotspots that could not be placed.
+    """
+    points = [_given_coordinates(hotspot) for hotspot in hotspots]
+    by_name = _coordinates_by_name(list({
+        hotspot.get('name') for hotspot, point in zip(hotspots, points) if point is None and hotspot.get('name')
+    }))
+    unresolved = []
+    for i, (hotspot, point) in enumerate(zip(hotspots, points)):
+        if point is None:
+            points[i] = by_name.get(hotspot.get('name'))
+            if points[i] is None:
+                unresolved.append(hotspot.get('name') or f'hotspot {i + 1}')
+    if unresolved:
+        raise ValueError(f"Unknown hotspot location: {', '.join(unresolved)}")
+    return points
+
+def _minutes(distance_km):
+    return distance_km / WALKING_SPEED_KMH * 60
+
+def plan_itinerary(hotspots, start=None, visit_minutes=VISIT_MINUTES):
+    """
+    Order hotspots into a short walking route.
+
+    start, if given as {'lat', 'lng'}, is where the walk begins; otherwise
+    the route may begin at any hotspot. Returns the hotspots in visiting
+    order, the legs between consecutive points with their distance and
+    walking time, and the totals including visit_minutes at every stop.
+    """
+    points = resolve_stops(hotspots)
+    stops = [dict(hotspot, location={'lat': lat, 'lng': lng}) for hotspot, (lat, lng) in zip(hotspots, points)]
+    if start is not None:
+        start_point = _given_coordinates(start)
+        if start_point is None:
+            raise ValueError('Invalid start location')
+        stops.insert(0, {'name': start.get('name', 'Start'), 'location': {'lat': start_point[0], 'lng': start_point[1]}})
+        points.insert(0, start_point)
+
+    order, distances = optimize_route(
+        [lat for lat, _ in points], [lng for _, lng in points], fixed_start=start is not None
+    )
+
+    route = []
+    total_km = 0.0
+    for previous, current in zip(order, order[1:]):
+        distance_km = float(distances[previous, current])
+        total_km += distance_km
+        route.append({
+            'from': stops[previous].get('name'),
+            'to': stops[current].get('name'),
+            'distance_km': round(distance_km, 3),
+            'travel_minutes': round(_minutes(distance_km), 1)
+        })
+
+    visits = order[1:] if start is not None else order
+    spots = [dict(stops[index], order=position + 1) for position, index in enumerate(visits)]
+    travel_minutes = _minutes(total_km)
+    total_minutes = travel_minutes + visit_minutes * len(spots)
+    return {
+        'spots': spots,
+        'route': route,
+        'total_distance_km': round(total_km, 3),
+        'travel_minutes': round(travel_minutes, 1),
+        'estimated_minutes': round(total_minutes, 1),
+        'estimated_time': f'{total_minutes / 60:.1f} hours'
+    }
+
+def recommend_itinerary(emotions, start, radius_km=DEFAULT_RADIUS_KM, k=DEFAULT_TOP_K, visit_minutes=VISIT_MINUTES):
+    """
+    Plan a walk from start through the k venues that best match an emotion mix.
+
+    The recommended venues become the hotspots of plan_itinerary, so the
+    route begins at start. Raises ValueError for a missing start point.
+    """
+    start_point = _given_coordinates(start or {})
+    if start_point is None:
+        raise ValueError('Recommendations need a start location')
+    hotspots = recommend(emotions, *start_point, radius_km=radius_km, k=k)
+    if not hotspots:
+        return {
+            'spots': [],
+            'route': [],
+            'total_distance_km': 0.0,
+            'travel_minutes': 0.0,
+            'estimated_minutes': 0.0,
+            'estimated_time': '0.0 hours'
+        }
+    return plan_itinerary(hotspots, start=start, visit_minutes=visit_minutes)
@@ -0,0 +1,191 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.sql.functions import count
+from app import db
+from app.models.models import Job
+
+# Statuses of jobs that still hold one of their kind's slots
+ACTIVE_STATUSES = ('queued', 'running')
+
+# How often a worker marks its queued and running jobs as alive
+HEARTBEAT_SECONDS = 10
+
+# Active jobs without a heartbeat for this long belong to a worker that died
+STALE_SECONDS = 60
+
+class JobLimitReached(Exception):
+    """Raised when a kind of job already runs at its concurrency limit."""
+
+    def __init__(self, kind, active_ids):
+        super().__init__(f'Too many {kind} jobs running: {", ".join(active_ids)}')
+        self.kind = kind
+        self.active_ids = active_ids
+
+class JobProgress:
+    """Handle passed to a running job for reporting its counters."""
+
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.job_id = job_id
+        self.counters = {}
+
+    def update(self, **counters):
+        self.counters.update(counters)
+        self.runner._update(self.job_id, progress=dict(self.counters))
+
+class JobRunner:
+    """
+    Runs long tasks in background threads and records their state in the
+    Job table, so any worker process can report on them.
+
+    The JOB_CONCURRENCY config mapping limits how many jobs of each kind
+    may be queued or running across all workers; submit checks it against
+    the Job table. Every worker refreshes the heartbeat of the jobs it
+    holds, so jobs left behind by a worker that exited are marked failed
+    instead of holding their slot forever.
+    """
+
+    def __init__(self):
+        self._executors = {}
+        # Ids of the jobs this worker holds, with the app each runs in
+        self._active = {}
+        self._heartbeat = None
+        self._lock = threading.Lock()
+
+    def _executor(self, kind):
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self._limit(kind), thread_name_prefix=f'{kind}-job')
+                self._executors[kind] = executor
+            return executor
+
+    def _limit(self, kind):
+        return current_app.config.get('JOB_CONCURRENCY', {}).get(kind, 1)
+
+    def submit(self, kind, func, **params):
+        """
+        Queue func(progress, **params) and return its Job row.
+
+        Raises JobLimitReached if the kind is already at its limit.
+        """
+        self.fail_orphaned()
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        active = select(count()).select_from(Job).where(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES))
+
+        # Count and insert in one statement, so two workers cannot both take the last slot
+        values = {
+            'id': job_id, 'kind': kind, 'status': 'queued', 'params': params,
+            'progress': {}, 'created_at': now, 'heartbeat_at': now
+        }
+        inserted = db.session.execute(
+            insert(Job).from_select(
+                list(values),
+                select(*[literal(value, Job.__table__.c[name].type) for name, value in values.items()])
+                .where(active.scalar_subquery() < self._limit(kind))
+            )
+        ).rowcount
+        db.session.commit()
+        if not inserted:
+            active_ids = db.session.execute(
+                select(Job.id).where(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES))
+            ).scalars().all()
+            raise JobLimitReached(kind, active_ids)
+
+        job = db.session.get(Job, job_id)
+        app = current_app._get_current_object()
+        with self._lock:
+            self._active[job_id] = app
+        self._start_heartbeat()
+        self._executor(kind).submit(self._run, app, job_id, func, params)
+        return job
+
+    def _run(self, app, job_id, func, params):
+        with app.app_context():
+            self._update(job_id, status='running', started_at=datetime.utcnow())
+            try:
+                result = func(JobProgress(self, job_id), **params)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Job {job_id} failed: {str(e)}")
+                traceback.print_exc()
+                self._update(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+            else:
+                self._update(job_id, status='succeeded', result=result, finished_at=datetime.utcnow())
+            finally:
+                with self._lock:
+                    self._active.pop(job_id, None)
+                db.session.remove()
+
+    def _update(self, job_id, **values):
+        # Use a separate transaction so reporting never commits a job's unfinished work
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(Job).where(Job.id == job_id).values(heartbeat_at=datetime.utcnow(), **values)
+            )
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                active = list(self._active.items())
+            for app in {app for _, app in active}:
+                job_ids = [job_id for job_id, job_app in active if job_app is app]
+                try:
+                    with app.app_context(), db.engine.begin() as connection:
+                        connection.execute(
+                            update(Job).where(Job.id.in_(job_ids)).values(heartbeat_at=datetime.utcnow())
+                        )
+                except Exception as e:
+                    print(f"Job heartbeat failed: {str(e)}")
+
+    def fail_orphaned(self):
+        """Mark queued or running jobs whose worker stopped sending heartbeats as failed."""
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            return connection.execute(
+                update(Job).where(
+                    Job.status.in_(ACTIVE_STATUSES),
+                    Job.heartbeat_at.is_(None) | (Job.heartbeat_at < now - timedelta(seconds=STALE_SECONDS))
+                ).values(status='failed', error='Worker stopped before the job finished', finished_at=now)
+            ).rowcount
+
+    def _is_stale(self, job):
+        return job.status in ACTIVE_STATUSES and (
+            job.heartbeat_at is None or job.heartbeat_at < datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+        )
+
+    def get(self, job_id):
+        job = db.session.get(Job, job_id)
+        if job is not None and self._is_stale(job):
+            self.fail_orphaned()
+            db.session.refresh(job)
+        return job
+
+# Create runner instance
+runner = JobRunner()
+
+def submit(kind, func, **params):
+    """Wrapper function to queue a background job."""
+    return runner.submit(kind, func, **params)
+
+def get(job_id):
+    """Wrapper function to look up a job."""
+    return runner.get(job_id)
+
+def fail_orphaned():
+    """Wrapper function to fail the jobs of workers that exited."""
+    return runner.fail_orphaned()
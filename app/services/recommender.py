@@ -0,0 +1,279 @@
+import functools
+import json
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models.models import Venue, Review, EmotionLabelSet, EmotionVector
+from app.services.cache import LRUCache
+from app.services.geo.distance import haversine_matrix
+from app.services.geo.heatmap_generator import ID_CHUNK_SIZE, VECTOR_CHUNK_SIZE
+from app.services.geo.spatial_index import get_venue_index
+from app.services.sentiment.score_store import vector_state
+
+# Share of a venue's score that comes from being close to the start point
+PROXIMITY_WEIGHT = 0.3
+
+DEFAULT_RADIUS_KM = 2.0
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 50
+
+def _group_sums(venue_ids, vectors, counts):
+    """Sum the rows of vectors and counts sharing a venue id; returns (venue_ids, sums, counts) sorted by id."""
+    grouped, inverse = np.unique(venue_ids, return_inverse=True)
+    sums = np.column_stack([
+        np.bincount(inverse, weights=vectors[:, k], minlength=len(grouped))
+        for k in range(vectors.shape[1])
+    ])
+    return grouped, sums, np.bincount(inverse, weights=counts, minlength=len(grouped)).astype(np.int64)
+
+def _vector_totals(after_review_id, last_review_id):
+    """
+    Sum the stored score vectors of reviews after_review_id < id <=
+    last_review_id per venue, streamed in chunks.
+
+    Each chunk is decoded and grouped per label set with NumPy, instead of
+    per venue in Python. Returns {label_set_id: (venue_ids, score sums,
+    vector counts)} and the number of vectors read.
+    """
+    query = select(
+        Review.venue_id,
+        EmotionVector.label_set_id,
+        EmotionVector.scores
+    ).join(
+        EmotionVector, EmotionVector.review_id == Review.id
+    ).where(
+        EmotionVector.review_id > after_review_id,
+        EmotionVector.review_id <= last_review_id
+    ).execution_options(yield_per=VECTOR_CHUNK_SIZE)
+
+    parts = defaultdict(list)
+    read = 0
+    for chunk in db.session.connection().execute(query).partitions():
+        read += len(chunk)
+        venue_ids, label_set_ids, blobs = zip(*chunk)
+        venue_ids = np.array(venue_ids, dtype=np.int64)
+        label_set_ids = np.array(label_set_ids, dtype=np.int64)
+        for label_set_id in np.unique(label_set_ids).tolist():
+            picked = np.flatnonzero(label_set_ids == label_set_id)
+            vectors = EmotionVector.unpack(b''.join(blobs[i] for i in picked.tolist())).reshape(len(picked), -1)
+            parts[label_set_id].append(_group_sums(venue_ids[picked], vectors.astype(np.float64), np.ones(len(picked))))
+
+    totals = {
+        label_set_id: _group_sums(*(np.concatenate(arrays) for arrays in zip(*groups)))
+        for label_set_id, groups in parts.items()
+    }
+    return totals, read
+
+def _coordinates(venue_ids):
+    """Return {venue_id: (lat, lng)} for the given venue ids."""
+    coordinates = {}
+    for i in range(0, len(venue_ids), ID_CHUNK_SIZE):
+        coordinates.update(
+            (venue_id, (lat, lng))
+            for venue_id, lat, lng in db.session.execute(
+                select(Venue.id, Venue.latitude, Venue.longitude)
+                .where(Venue.id.in_(venue_ids[i:i + ID_CHUNK_SIZE]))
+            )
+        )
+    return coordinates
+
+class VenueEmotions:
+    """
+    Mean emotion vector of every scored venue, as one matrix.
+
+    Rows follow venue_ids, which is sorted so candidate ids from the spatial
+    index map to rows with a binary search. Columns follow labels, the union
+    of every label set's emotions. version is the (last review id, vector
+    count) of the scores summed, as returned by
+    Recommender.vector_version().
+    """
+
+    def __init__(self, version, venue_ids, labels, sums, label_counts, counts, lats, lngs):
+        self.version = version
+        self.venue_ids = venue_ids
+        self.labels = labels
+        self.sums = sums
+        self.label_counts = label_counts
+        # Label sets of different models may share emotions; each label's
+        # mean is over the vectors that scored it
+        self.means = np.divide(sums, label_counts, out=np.zeros_like(sums), where=label_counts > 0).astype(np.float32)
+        self.counts = counts
+        self.lats = lats
+        self.lngs = lngs
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            (0, 0), np.zeros(0, dtype=np.int64), [], np.zeros((0, 0)), np.zeros((0, 0)),
+            np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        )
+
+    def updated(self, version):
+        """
+        Return the matrix at a later version.
+
+        Only the vectors of reviews after this matrix's last one are read
+        and added to its sums. If they do not account for every vector of
+        the version, e.g. after deletions or when older reviews were scored
+        late, all vectors are summed again.
+        """
+        if version == self.version:
+            return self
+        totals, read = _vector_totals(self.version[0], version[0])
+        if self.version[1] + read == version[1]:
+            return self._added(version, totals)
+        return VenueEmotions.empty()._added(version, _vector_totals(0, version[0])[0])
+
+    def _added(self, version, totals):
+        """Return a copy with the {label_set_id: (venue_ids, score sums, vector counts)} totals added."""
+        label_sets = {
+            label_set_id: json.loads(labels)
+            for label_set_id, labels in db.session.execute(
+                select(EmotionLabelSet.id, EmotionLabelSet.labels)
+            )
+        }
+        labels = sorted(set(self.labels).union(*(label_sets[label_set_id] for label_set_id in totals)))
+        columns = {label: k for k, label in enumerate(labels)}
+        venue_ids = functools.reduce(np.union1d, [set_venue_ids for set_venue_ids, _, _ in totals.values()], self.venue_ids)
+
+        # Copy the existing rows into their places among the new venues
+        old_rows = np.searchsorted(venue_ids, self.venue_ids)
+        old_cells = np.ix_(old_rows, np.array([columns[label] for label in self.labels], dtype=np.int64))
+        sums = np.zeros((len(venue_ids), len(labels)))
+        label_counts = np.zeros((len(venue_ids), len(labels)))
+        counts = np.zeros(len(venue_ids), dtype=np.int64)
+        lats = np.zeros(len(venue_ids))
+        lngs = np.zeros(len(venue_ids))
+        sums[old_cells] = self.sums
+        label_counts[old_cells] = self.label_counts
+        counts[old_rows] = self.counts
+        lats[old_rows] = self.lats
+        lngs[old_rows] = self.lngs
+
+        new_venue_ids = np.setdiff1d(venue_ids, self.venue_ids).tolist()
+        coordinates = _coordinates(new_venue_ids)
+        new_rows = np.searchsorted(venue_ids, new_venue_ids)
+        lats[new_rows] = [coordinates[venue_id][0] for venue_id in new_venue_ids]
+        lngs[new_rows] = [coordinates[venue_id][1] for venue_id in new_venue_ids]
+
+        for label_set_id, (set_venue_ids, set_sums, set_counts) in totals.items():
+            rows = np.searchsorted(venue_ids, set_venue_ids)
+            cells = np.ix_(rows, np.array([columns[label] for label in label_sets[label_set_id]], dtype=np.int64))
+            sums[cells] += set_sums
+            label_counts[cells] += set_counts[:, None]
+            counts[rows] += set_counts
+        return VenueEmotions(version, venue_ids, labels, sums, label_counts, counts, lats, lngs)
+
+    def rows_for(self, venue_ids):
+        """Return the matrix rows of the given venue ids, skipping unscored venues."""
+        venue_ids = np.asarray(venue_ids, dtype=np.int64)
+        if not len(self.venue_ids) or not len(venue_ids):
+            return np.zeros(0, dtype=np.int64)
+        rows = np.searchsorted(self.venue_ids, venue_ids)
+        rows = np.minimum(rows, len(self.venue_ids) - 1)
+        return rows[self.venue_ids[rows] == venue_ids]
+
+class Recommender:
+    def __init__(self, proximity_weight=PROXIMITY_WEIGHT):
+        self.proximity_weight = proximity_weight
+        # Venue emotion matrices keyed by vector_version()
+        self.cache = LRUCache('venue_emotions', maxsize=2)
+        # Newest matrix built, which later versions add their vectors to
+        self.latest = VenueEmotions.empty()
+
+    def vector_version(self):
+        """
+        Return (last scored review id, vector count), a token that changes
+        whenever score vectors are stored.
+
+        Read from the counts the writers keep, so asking costs two primary
+        key lookups however many vectors there are.
+        """
+        return vector_state()
+
+    def clear(self):
+        """Forget every matrix, e.g. when the database they were built from is replaced."""
+        self.cache.clear()
+        self.latest = VenueEmotions.empty()
+
+    def venue_emotions(self, version=None):
+        """Return the venue emotion matrix, adding scores stored since the last one was built."""
+        if version is None:
+            version = self.vector_version()
+        matrix = self.cache.get(version)
+        if matrix is None:
+            matrix = self.latest.updated(version)
+            self.latest = matrix
+            self.cache.put(version, matrix)
+        return matrix
+
+    def _target(self, matrix, emotions):
+        """Unit vector over the matrix labels for an {emotion: weight} mix."""
+        target = np.zeros(len(matrix.labels))
+        for emotion, weight in emotions.items():
+            if weight < 0:
+                raise ValueError(f'Negative weight for {emotion}')
+            if emotion in matrix.labels:
+                target[matrix.labels.index(emotion)] = weight
+        norm = np.linalg.norm(target)
+        if norm == 0:
+            raise ValueError(f"No scored emotion among: {', '.join(emotions)}")
+        return target / norm
+
+    def recommend(self, emotions, lat, lng, radius_km=DEFAULT_RADIUS_KM, k=DEFAULT_TOP_K):
+        """
+        Return the top k venues within radius_km of (lat, lng) for an emotion mix.
+
+        emotions maps emotion labels to weights, e.g. {'calm': 0.6, 'joy': 0.4}.
+        Venues within the radius come from the spatial index, then each is
+        scored in one NumPy pass as the cosine similarity of its mean
+        emotion vector to the mix, blended with a proximity term that falls
+        from 1 at the start point to 0 at the radius. Raises ValueError if
+        no weighted emotion has been scored.
+        """
+        matrix = self.venue_emotions()
+        target = self._target(matrix, emotions)
+        k = max(1, min(k, MAX_TOP_K))
+
+        rows = matrix.rows_for(get_venue_index().query_radius(lat, lng, radius_km))
+        if not len(rows):
+            return []
+
+        means = matrix.means[rows].astype(np.float64)
+        norms = np.linalg.norm(means, axis=1)
+        similarity = np.divide(means @ target, norms, out=np.zeros(len(rows)), where=norms > 0)
+        distances = haversine_matrix([lat], [lng], matrix.lats[rows], matrix.lngs[rows])[0]
+        proximity = 1.0 - np.minimum(distances / radius_km, 1.0) if radius_km > 0 else np.ones(len(rows))
+        scores = (1 - self.proximity_weight) * similarity + self.proximity_weight * proximity
+
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.lexsort((matrix.venue_ids[rows[top]], -scores[top]))]
+
+        venue_ids = matrix.venue_ids[rows[top]].tolist()
+        venues = {venue.id: venue for venue in Venue.query.filter(Venue.id.in_(venue_ids))}
+        return [
+            {
+                'venue_id': venue_id,
+                'name': venues[venue_id].name,
+                'category': venues[venue_id].category,
+                'location': {'lat': venues[venue_id].latitude, 'lng': venues[venue_id].longitude},
+                'score': float(scores[i]),
+                'similarity': float(similarity[i]),
+                'distance_km': float(distances[i]),
+                'review_count': int(matrix.counts[rows[i]]),
+                'emotion_scores': dict(zip(matrix.labels, matrix.means[rows[i]].tolist()))
+            }
+            for venue_id, i in zip(venue_ids, top.tolist())
+            if venue_id in venues
+        ]
+
+# Create a singleton instance
+recommender = Recommender()
+
+def recommend(emotions, lat, lng, radius_km=DEFAULT_RADIUS_KM, k=DEFAULT_TOP_K):
+    """Recommend venues for an emotion mix near a start point."""
+    return recommender.recommend(emotions, lat, lng, radius_km=radius_km, k=k)
@@ -0,0 +1,188 @@
+import json
+from sqlalchemy import exists, func, select
+from app import db
+from app.models.models import Review, Venue, Neighborhood, NeighborhoodVenue, EmotionVector, EmotionLabelSet, EmotionalHotspot
+from app.services.geo.distance import haversine_matrix
+from app.services.geo.membership import NEARBY_RADIUS_KM, neighborhood_coordinates
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Rows read per query while an emotion filter discards reviews, and the
+# most rows one request may read before handing back a cursor, so sparse
+# matches cost more pages rather than slower ones
+FILTER_CHUNK_SIZE = 200
+MAX_SCANNED_REVIEWS = 2000
+
+def _parse_point(location):
+    """Return (lat, lng) for a "lat,lng" location, or None."""
+    try:
+        lat, lng = (float(part) for part in location.split(','))
+    except ValueError:
+        return None
+    return lat, lng
+
+def _nearest_neighborhood(lat, lng):
+    """Return the id of the neighborhood centered within NEARBY_RADIUS_KM of a point, or None."""
+    neighborhoods = [
+        (neighborhood_id, coordinates)
+        for neighborhood_id, boundary in db.session.execute(select(Neighborhood.id, Neighborhood.boundary))
+        for coordinates in [neighborhood_coordinates(boundary)]
+        if coordinates
+    ]
+    if not neighborhoods:
+        return None
+    distances = haversine_matrix(
+        [lat], [lng],
+        [n_lat for _, (n_lat, _) in neighborhoods], [n_lng for _, (_, n_lng) in neighborhoods]
+    )[0]
+    nearest = int(distances.argmin())
+    return neighborhoods[nearest][0] if distances[nearest] <= NEARBY_RADIUS_KM else None
+
+def find_location(location):
+    """
+    Return ('neighborhood', id) or ('venue', id) for a location, or None.
+
+    location is a neighborhood or venue name, or "lat,lng" as sent by the
+    map, which resolves to the neighborhood centered nearest to the point.
+    """
+    point = _parse_point(location)
+    if point is not None:
+        neighborhood_id = _nearest_neighborhood(*point)
+        return ('neighborhood', neighborhood_id) if neighborhood_id is not None else None
+
+    neighborhood_id = db.session.scalar(select(Neighborhood.id).where(Neighborhood.name == location).limit(1))
+    if neighborhood_id is not None:
+        return 'neighborhood', neighborhood_id
+    venue_id = db.session.scalar(select(Venue.id).where(Venue.name == location).limit(1))
+    if venue_id is not None:
+        return 'venue', venue_id
+    return None
+
+def _is_dense(neighborhood_id, chunk):
+    """
+    Whether walking the review id index beats sorting the neighborhood's reviews.
+
+    A walk down review.id reads about chunk * total / matching rows per
+    page, while the membership join sorts all matching rows; the hotspot
+    counts give the matching row count without touching the reviews.
+    """
+    matching = db.session.scalar(
+        select(func.max(EmotionalHotspot.review_count)).where(EmotionalHotspot.neighborhood_id == neighborhood_id)
+    ) or 0
+    total = db.session.scalar(select(func.max(Review.id))) or 0
+    return matching * matching > chunk * total
+
+def _base_query(neighborhood_id, venue_id, since, until, dense):
+    query = db.session.query(
+        Review.id,
+        Review.venue_id,
+        Review.source,
+        Review.text,
+        Review.review_date,
+        Venue.name
+    ).join(
+        Venue, Venue.id == Review.venue_id
+    )
+    if venue_id is not None:
+        query = query.filter(Review.venue_id == venue_id)
+    elif dense:
+        # Correlated membership check: SQLite walks the primary key backwards
+        # and stops after one page, whatever the neighborhood's size
+        query = query.filter(exists().where(
+            NeighborhoodVenue.neighborhood_id == neighborhood_id,
+            NeighborhoodVenue.venue_id == Review.venue_id
+        ))
+    else:
+        query = query.filter(Review.venue_id.in_(
+            select(NeighborhoodVenue.venue_id).where(NeighborhoodVenue.neighborhood_id == neighborhood_id)
+        ))
+    if since is not None:
+        query = query.filter(Review.review_date >= since)
+    if until is not None:
+        query = query.filter(Review.review_date < until)
+    return query.order_by(Review.id.desc())
+
+def _load_scores(review_ids):
+    """Return {review_id: {emotion: score}} for a page of reviews in one query."""
+    if not review_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            EmotionVector.review_id,
+            EmotionVector.scores,
+            EmotionVector.label_set_id,
+            EmotionLabelSet.labels
+        ).join(
+            EmotionLabelSet, EmotionLabelSet.id == EmotionVector.label_set_id
+        ).where(
+            EmotionVector.review_id.in_(review_ids)
+        )
+    )
+    label_lists = {}
+    scores = {}
+    for review_id, blob, label_set_id, labels in rows:
+        if label_set_id not in label_lists:
+            label_lists[label_set_id] = json.loads(labels)
+        scores[review_id] = dict(zip(label_lists[label_set_id], EmotionVector.unpack(blob).tolist()))
+    return scores
+
+def _review_dict(row, scores):
+    review_id, venue_id, source, text, review_date, venue_name = row
+    return {
+        'id': review_id,
+        'text': text,
+        'date': review_date.date().isoformat() if review_date else None,
+        'source': source,
+        'venue': {'id': venue_id, 'name': venue_name},
+        'emotion_scores': [
+            {'emotion': emotion, 'score': score}
+            for emotion, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        ]
+    }
+
+def find_reviews(neighborhood_id=None, venue_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE,
+                 emotion=None, min_score=0.5, since=None, until=None):
+    """
+    Return one page of reviews for a neighborhood or venue, newest first.
+
+    Pages are keyed by review id: pass the returned next_cursor back as
+    cursor to continue, so a deep page costs the same as the first one.
+    Scores for the whole page are loaded in one batched query. With an
+    emotion filter, reviews scoring below min_score for it are skipped; a
+    page may then hold fewer than limit reviews while next_cursor is still
+    set, as at most MAX_SCANNED_REVIEWS rows are read per call.
+    Returns {'reviews': [...], 'next_cursor': id or None}.
+    """
+    if (neighborhood_id is None) == (venue_id is None):
+        raise ValueError('Pass exactly one of neighborhood_id or venue_id')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # One extra row tells whether another page exists
+    chunk = limit + 1 if emotion is None else max(limit + 1, FILTER_CHUNK_SIZE)
+
+    dense = False
+    if neighborhood_id is not None:
+        dense = _is_dense(neighborhood_id, chunk)
+    query = _base_query(neighborhood_id, venue_id, since, until, dense)
+
+    reviews = []
+    scanned = 0
+    while True:
+        page_query = query if cursor is None else query.filter(Review.id < cursor)
+        rows = page_query.limit(chunk).all()
+        scores = _load_scores([row[0] for row in rows])
+
+        for row in rows:
+            if len(reviews) == limit:
+                return {'reviews': reviews, 'next_cursor': reviews[-1]['id']}
+            cursor = row[0]
+            review_scores = scores.get(row[0], {})
+            if emotion is not None and review_scores.get(emotion, 0.0) < min_score:
+                continue
+            reviews.append(_review_dict(row, review_scores))
+
+        scanned += len(rows)
+        if len(rows) < chunk:
+            return {'reviews': reviews, 'next_cursor': None}
+        if scanned >= MAX_SCANNED_REVIEWS:
+            return {'reviews': reviews, 'next_cursor': cursor}
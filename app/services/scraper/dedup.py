@@ -0,0 +1,131 @@
+import hashlib
+import re
+import unicodedata
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models.models import Review
+
+# Fingerprints looked up per query, to stay under SQL parameter limits
+FINGERPRINT_CHUNK_SIZE = 500
+
+# MinHash signature length; more permutations give steadier similarity estimates
+MINHASH_PERMUTATIONS = 64
+
+# Words per shingle when comparing texts for near-duplicates
+SHINGLE_SIZE = 3
+
+# Most recent stored reviews of a venue and source a new review is compared
+# with for near-duplicates; bounds the work for catch-all venues
+NEAR_DUPLICATE_WINDOW = 200
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text):
+    """Case-fold text and drop punctuation and extra whitespace so trivial edits compare equal."""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+def fingerprint(text):
+    """Return the SHA-1 hex digest of the normalized text."""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the texts' shingle sets, which catches reposts with small
+    edits that exact fingerprints miss.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, shingle_size=SHINGLE_SIZE, seed=1):
+        rng = np.random.default_rng(seed)
+        # Keep a * hash + b below 2**63 so the arithmetic never overflows uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def _shingles(self, text):
+        words = normalize_text(text).split()
+        if len(words) <= self.shingle_size:
+            return {' '.join(words)}
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+             for s in self._shingles(text)],
+            dtype=np.uint64
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % self._PRIME
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(signature, signatures):
+        """Estimated Jaccard similarity of one signature against each row of signatures."""
+        return (signatures == signature).mean(axis=1)
+
+def _existing_fingerprints(keys):
+    """Return which (venue_id, source, fingerprint) keys are already stored."""
+    fingerprints = sorted({key[2] for key in keys})
+    existing = set()
+    for start in range(0, len(fingerprints), FINGERPRINT_CHUNK_SIZE):
+        chunk = fingerprints[start:start + FINGERPRINT_CHUNK_SIZE]
+        existing.update(
+            tuple(row) for row in db.session.execute(
+                select(Review.venue_id, Review.source, Review.fingerprint)
+                .where(Review.fingerprint.in_(chunk))
+            )
+        )
+    return existing & set(keys)
+
+def _drop_near_duplicates(reviews, threshold):
+    """Drop reviews whose text closely matches a recent review of the same venue and source."""
+    hasher = MinHasher()
+    groups = {}
+    for review in reviews:
+        groups.setdefault((review.venue_id, review.source), []).append(review)
+
+    kept = set()
+    for (venue_id, source), group in groups.items():
+        stored_texts = db.session.scalars(
+            select(Review.text)
+            .where(Review.venue_id == venue_id, Review.source == source)
+            .order_by(Review.id.desc())
+            .limit(NEAR_DUPLICATE_WINDOW)
+        ).all()
+        signatures = [hasher.signature(text) for text in stored_texts]
+        for review in group:
+            signature = hasher.signature(review.text)
+            if signatures and hasher.similarity(signature, np.array(signatures)).max() >= threshold:
+                continue
+            signatures.append(signature)
+            kept.add(id(review))
+    return [review for review in reviews if id(review) in kept]
+
+def filter_new_reviews(reviews, near_duplicate_threshold=None):
+    """
+    Set fingerprints on unsaved reviews and return only those not already stored.
+
+    Exact duplicates within the batch and against the database are found
+    with one fingerprint lookup per chunk. With a near_duplicate_threshold,
+    reviews whose estimated shingle similarity to one of the last
+    NEAR_DUPLICATE_WINDOW reviews of the same venue and source reaches it
+    are dropped as well.
+    """
+    unique = {}
+    for review in reviews:
+        review.fingerprint = fingerprint(review.text)
+        unique.setdefault((review.venue_id, review.source, review.fingerprint), review)
+
+    existing = _existing_fingerprints(list(unique))
+    new_reviews = [review for key, review in unique.items() if key not in existing]
+
+    if near_duplicate_threshold and new_reviews:
+        new_reviews = _drop_near_duplicates(new_reviews, near_duplicate_threshold)
+    return new_reviews
@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import partial
+import requests
+from flask import current_app
+
+# Seconds a cached page is served without asking the server again
+CACHE_TTL = int(os.getenv('SCRAPER_CACHE_TTL', str(6 * 60 * 60)))
+
+def _content_hash(body):
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+def nothing_to_save():
+    """Save callable for fetches that leave the cache as it is."""
+
+class PageCache:
+    """
+    On-disk cache of fetched pages.
+
+    Each entry is stored under the SHA-256 of its key (normally the URL) as
+    a gzip-compressed body plus a JSON metadata file holding the content
+    hash and the validators the server sent. Entries younger than the TTL
+    are served directly; older ones are revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged page costs a 304 instead of a full
+    download. Callers are told whether the content changed since the last
+    fetch, so they can skip re-parsing pages they have already processed.
+
+    A newly downloaded page is only written once the caller has saved what
+    it parsed from it: fetch hands back a save callable to run after the
+    database commit, so a scrape that fails midway parses the page again
+    next time instead of treating it as done.
+    """
+
+    def __init__(self, directory=None, ttl=CACHE_TTL):
+        self._directory = directory
+        self.ttl = ttl
+        self.counts = {'fresh': 0, 'revalidated': 0, 'fetched': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        """Cache directory, by default the app's SCRAPER_CACHE_DIR, read on first use."""
+        if self._directory is None:
+            self._directory = current_app.config['SCRAPER_CACHE_DIR']
+        return self._directory
+
+    def _paths(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return base + '.json', base + '.gz'
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def load(self, key):
+        """Return (metadata, body) for a cached key, or (None, None) if absent or unreadable."""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rt', encoding='utf-8') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def is_fresh(self, meta):
+        return meta is not None and time.time() - meta['fetched_at'] < self.ttl
+
+    def is_changed(self, meta, body):
+        """Return True if body differs from the cached copy described by meta."""
+        return meta is None or meta.get('content_hash') != _content_hash(body)
+
+    def store(self, key, body, **validators):
+        """Cache body under key and return True if its content differs from the previous copy."""
+        meta_path, body_path = self._paths(key)
+        previous, _ = self.load(key)
+        content_hash = _content_hash(body)
+        changed = previous is None or previous.get('content_hash') != content_hash
+
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        if changed:
+            self._write(body_path, gzip.compress(body.encode('utf-8')))
+        meta = {'key': key, 'content_hash': content_hash, 'fetched_at': time.time()}
+        meta.update({name: value for name, value in validators.items() if value})
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+        return changed
+
+    def touch(self, key, meta):
+        """Mark a revalidated entry as fresh again."""
+        meta_path, _ = self._paths(key)
+        meta = dict(meta, fetched_at=time.time())
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def _write(self, path, data):
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def fetch(self, session, url, timeout=None, wait=None):
+        """
+        Return (html, changed, save) for url, using the cache where possible.
+
+        html is None if the page could not be fetched. Call save() once the
+        page's content has been committed to record it in the cache. wait,
+        e.g. a rate limiter's, is called with the url only when a request
+        is actually sent.
+        """
+        meta, body = self.load(url)
+        if body is not None and self.is_fresh(meta):
+            self._count('fresh')
+            return body, False, nothing_to_save
+        if wait is not None:
+            wait(url)
+
+        headers = {}
+        if body is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {str(e)}")
+            self._count('errors')
+            return None, False, nothing_to_save
+
+        if response.status_code == 304 and body is not None:
+            # The cached copy was only written after its content was saved
+            self.touch(url, meta)
+            self._count('revalidated')
+            return body, False, nothing_to_save
+        if response.status_code != 200:
+            self._count('errors')
+            return None, False, nothing_to_save
+
+        self._count('fetched')
+        html = response.text
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        return html, self.is_changed(meta, html), partial(self.store, url, html, **validators)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
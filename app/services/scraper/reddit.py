@@ -1,9 +1,17 @@
+import json
 import os
 import praw
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from sqlalchemy import insert, select
 from app import db
 from app.models.models import Venue, Review
+from app.services.geo.membership import assign_venues
+from app.services.geo.spatial_index import index_venues
+from app.services.scraper.dedup import filter_new_reviews
+from app.services.scraper.page_cache import PageCache, nothing_to_save
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,6 +22,12 @@ REDDIT_CLIENT_ID = os.getenv('REDDIT_CLIENT_ID', '')
 REDDIT_CLIENT_SECRET = os.getenv('REDDIT_CLIENT_SECRET', '')
 REDDIT_USER_AGENT = os.getenv('REDDIT_USER_AGENT', 'eco-mood-travel:v0.1 (by /u/your_username)')
 
+# Posts this similar to a stored review of the same venue are treated as reposts
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('REDDIT_NEAR_DUPLICATE_THRESHOLD', '0.8'))
+
+# Search results from earlier runs, so repeated scrapes only add new posts
+search_cache = PageCache()
+
 def init_reddit_client():
     """Initialize the Reddit API client with credentials."""
     if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
@@ -44,6 +58,64 @@ def extract_location_from_text(text, city):
     
     return locations[0]
 
+def _search_subreddit(reddit, sub_name, city, limit):
+    """
+    Return the (title, selftext, created_utc) of text posts in one subreddit
+    matching the city that earlier runs have not returned yet, and a save
+    callable that records them as seen once their reviews are committed.
+    """
+    # Search posts containing the city name
+    search_query = f"{city} experience OR visit OR review"
+    cache_key = f"reddit:{sub_name}?q={search_query}&limit={limit}"
+
+    cached_meta, cached_body = search_cache.load(cache_key)
+    if search_cache.is_fresh(cached_meta):
+        # Searched recently; its posts were saved by that run
+        return [], nothing_to_save
+    seen = {tuple(post) for post in json.loads(cached_body)} if cached_body else set()
+
+    try:
+        subreddit = reddit.subreddit(sub_name.replace("r/", ""))
+        posts = [
+            (post.title, post.selftext, post.created_utc)
+            for post in subreddit.search(search_query, limit=limit)
+            # Skip if post doesn't have text content
+            if post.selftext
+        ]
+    except Exception as e:
+        print(f"Error scraping {sub_name}: {str(e)}")
+        return [], nothing_to_save
+
+    body = json.dumps(posts)
+    save = partial(search_cache.store, cache_key, body)
+    if not search_cache.is_changed(cached_meta, body):
+        return [], save
+    return [post for post in posts if post not in seen], save
+
+def _insert_venues(names, city):
+    """Bulk insert generic venues for the given names and return their name -> id map."""
+    rows = [
+        {
+            'name': name,
+            'address': f"{name}, {city}",
+            'latitude': 0.0,  # These would need to be geocoded in a real app
+            'longitude': 0.0,
+            'category': "general"
+        }
+        for name in names
+    ]
+    inserted = db.session.execute(
+        insert(Venue).returning(Venue.id, Venue.name, Venue.latitude, Venue.longitude),
+        rows
+    ).all()
+
+    # Bulk inserts bypass the ORM events that maintain the spatial index and membership
+    venues = [(venue_id, lat, lng) for venue_id, _, lat, lng in inserted]
+    connection = db.session.connection()
+    index_venues(connection, venues)
+    assign_venues(connection, venues)
+    return {name: venue_id for venue_id, name, _, _ in inserted}
+
 def scrape(city, limit=25):
     """Scrape Reddit for posts about a city."""
     reddit = init_reddit_client()
@@ -52,65 +124,59 @@ def scrape(city, limit=25):
     if not reddit:
         # Return empty list if Reddit client initialization failed
         return reviews
-    
+
+    # Subreddits to search
+    subreddits = [f"r/{city.lower()}", "r/travel", "r/TravelTips"]
+
+    # Search all subreddits at once; PRAW clients are not thread-safe, so
+    # every search gets its own
+    clients = [reddit] + [init_reddit_client() for _ in subreddits[1:]]
+    with ThreadPoolExecutor(max_workers=len(subreddits)) as pool:
+        results = list(pool.map(
+            lambda args: _search_subreddit(*args, city, limit),
+            zip(clients, subreddits)
+        ))
+    posts = [post for result, _ in results for post in result]
+
     try:
-        # Subreddits to search
-        subreddits = [f"r/{city.lower()}", "r/travel", "r/TravelTips"]
-        
-        for sub_name in subreddits:
-            try:
-                subreddit = reddit.subreddit(sub_name.replace("r/", ""))
-                
-                # Search posts containing the city name
-                search_query = f"{city} experience OR visit OR review"
-                search_results = subreddit.search(search_query, limit=limit)
-                
-                for post in search_results:
-                    # Skip if post doesn't have text content
-                    if not post.selftext:
-                        continue
-                    
-                    # Extract location from post title/text
-                    location_name = extract_location_from_text(post.title + " " + post.selftext, city)
-                    
-                    # Check if venue exists, otherwise create it
-                    venue = Venue.query.filter_by(name=location_name).first()
-                    if not venue:
-                        # Create a generic venue with approximate coordinates
-                        venue = Venue(
-                            name=location_name,
-                            address=f"{location_name}, {city}",
-                            latitude=0.0,  # These would need to be geocoded in a real app
-                            longitude=0.0,
-                            category="general"
-                        )
-                        db.session.add(venue)
-                        db.session.commit()
-                    
-                    # Create a review from the post
-                    review = Review(
-                        venue_id=venue.id,
-                        source="reddit",
-                        text=post.selftext[:1000],  # Limit text length
-                        reviewer_location="Unknown",
-                        review_date=datetime.fromtimestamp(post.created_utc)
-                    )
-                    
-                    db.session.add(review)
-                    reviews.append(review)
-            
-            except Exception as e:
-                print(f"Error scraping {sub_name}: {str(e)}")
-                continue
-        
-        # Commit all reviews to the database
-        if reviews:
-            db.session.commit()
-        
+        # Resolve venue names in memory instead of querying once per post
+        # (lowest id wins for duplicate names, like the first match of a query)
+        venue_ids = dict(db.session.execute(select(Venue.name, Venue.id).order_by(Venue.id.desc())).all())
+        located = [
+            # Extract location from post title/text
+            (extract_location_from_text(title + " " + selftext, city), selftext, created_utc)
+            for title, selftext, created_utc in posts
+        ]
+
+        new_names = list(dict.fromkeys(name for name, _, _ in located if name not in venue_ids))
+        if new_names:
+            venue_ids.update(_insert_venues(new_names, city))
+
+        for location_name, selftext, created_utc in located:
+            # Create a review from the post
+            reviews.append(Review(
+                venue_id=venue_ids[location_name],
+                source="reddit",
+                text=selftext[:1000],  # Limit text length
+                reviewer_location="Unknown",
+                review_date=datetime.fromtimestamp(created_utc)
+            ))
+
+        # Drop posts already stored and reposts of them, then commit new
+        # venues and all reviews in one transaction; commit even when no
+        # review is left, so the new venues are not left pending
+        reviews = filter_new_reviews(reviews, near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD)
+        db.session.bulk_save_objects(reviews)
+        db.session.commit()
+
+        # Only now mark the posts as seen, so a failed run returns them again
+        for _, save in results:
+            save()
+
         return reviews
-    
+
     except Exception as e:
         # Roll back any changes if an error occurs
         db.session.rollback()
         print(f"Error during Reddit scraping: {str(e)}")
-        return [] 
\ No newline at end of file
+        return []
@@ -1,16 +1,72 @@
+import os
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
 from app import db
 from app.models.models import Venue, Review
+from app.services.scraper.dedup import filter_new_reviews
+from app.services.scraper.http_client import build_session, RateLimiter
+from app.services.scraper.page_cache import PageCache, nothing_to_save
+
+# Number of venue pages to scrape per search
+MAX_VENUES = int(os.getenv('TRIPADVISOR_MAX_VENUES', '10'))
+
+# Venue pages fetched in parallel
+CONCURRENCY = int(os.getenv('TRIPADVISOR_CONCURRENCY', '8'))
+
+# Requests per second allowed against a single host
+RATE_LIMIT = float(os.getenv('TRIPADVISOR_RATE_LIMIT', '5'))
+
+# Seconds to wait for a connection or response
+REQUEST_TIMEOUT = float(os.getenv('SCRAPER_TIMEOUT', '10'))
+
+# Prefer the C-based lxml parser and fall back to the standard library one
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Classes of the h1 and div elements a venue page is scraped for
+VENUE_CLASSES = frozenset({'title', 'review-container'})
+
+def _is_venue_class(value):
+    """
+    Keep classless elements (address and script) and those with a class we
+    read. While parsing, value is the raw class attribute, not yet split.
+    """
+    if value is None:
+        return True
+    classes = value.split() if isinstance(value, str) else value
+    return not VENUE_CLASSES.isdisjoint(classes)
+
+# Build only the parts of a venue page we read instead of the whole tree.
+# Filtering on the class value rather than on the whole tag works the same
+# before and after beautifulsoup4 4.13
+VENUE_STRAINER = SoupStrainer(['h1', 'address', 'script', 'div'], class_=_is_venue_class)
+
+# Review fields by the tag and class of the element holding them
+REVIEW_FIELDS = {
+    ('p', 'review-text'): 'text',
+    ('span', 'reviewer-location'): 'reviewer_location',
+    ('span', 'review-date'): 'date'
+}
+
+def _text(tag):
+    return tag.text.strip() if tag is not None else ''
 
 class TripAdvisorScraper:
-    def __init__(self):
-        self.base_url = "https://www.tripadvisor.com"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    def __init__(self, base_url="https://www.tripadvisor.com", max_venues=MAX_VENUES,
+                 concurrency=CONCURRENCY, rate_limit=RATE_LIMIT, timeout=REQUEST_TIMEOUT, page_cache=None):
+        self.base_url = base_url
+        self.page_cache = page_cache
+        self.max_venues = max_venues
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = build_session(pool_size=concurrency)
+        self.rate_limiter = RateLimiter(rate_limit)
 
     def _build_search_url(self, city, category):
         """Build the search URL for a city and category."""
@@ -34,91 +90,137 @@ class TripAdvisorScraper:
         except ValueError:
             return None
 
-    def _scrape_venue(self, venue_url):
-        """Scrape details and reviews for a specific venue."""
-        response = requests.get(self.base_url + venue_url, headers=self.headers)
+    def _fetch(self, url):
+        """
+        Fetch a page through the shared session.
+
+        Returns (html, changed, save); html is None on failure, changed is
+        False when the page cache already held the same content, and save
+        records the page in the cache once its reviews are committed.
+        """
+        if self.page_cache is not None:
+            # Pages served fresh from the cache skip the rate limiter
+            return self.page_cache.fetch(self.session, url, timeout=self.timeout, wait=self.rate_limiter.wait)
+        self.rate_limiter.wait(url)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {str(e)}")
+            return None, False, nothing_to_save
         if response.status_code != 200:
-            return None
+            return None, False, nothing_to_save
+        return response.text, True, nothing_to_save
+
+    def _fetch_all(self, urls):
+        """Fetch pages concurrently, returning their (html, changed, save) results in the same order."""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(urls))) as pool:
+            return list(pool.map(self._fetch, urls))
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def _parse_venue_page(self, html, features=HTML_PARSER, parse_only=VENUE_STRAINER):
+        """Extract venue details and review fields from a venue page, or None if incomplete."""
+        soup = BeautifulSoup(html, features, parse_only=parse_only)
         
         # Extract venue details
-        name = soup.find('h1', {'class': 'title'}).text.strip() if soup.find('h1', {'class': 'title'}) else ''
-        address = soup.find('address').text.strip() if soup.find('address') else ''
+        name = _text(soup.find('h1', class_='title'))
+        address = _text(soup.find('address'))
         
         # Extract coordinates from script tags
-        scripts = soup.find_all('script')
         lat, lng = None, None
-        for script in scripts:
+        for script in soup.find_all('script'):
             if script.string and 'latitude' in script.string:
                 lat, lng = self._extract_coordinates(script.string)
                 break
         
         if not all([name, address, lat, lng]):
             return None
+        
+        # Extract reviews, reading each container's fields in one pass
+        reviews = []
+        for container in soup.find_all('div', class_='review-container'):
+            fields = {}
+            for element in container.find_all(('p', 'span'), class_=[class_name for _, class_name in REVIEW_FIELDS]):
+                for class_name in element.get('class', ()):
+                    field = REVIEW_FIELDS.get((element.name, class_name))
+                    if field and field not in fields:
+                        fields[field] = element.text.strip()
+            
+            if fields.get('text'):
+                reviews.append(fields)
+        
+        return {'name': name, 'address': address, 'latitude': lat, 'longitude': lng, 'reviews': reviews}
+
+    def _scrape_venue(self, html):
+        """Scrape details and reviews from a venue page."""
+        page = self._parse_venue_page(html)
+        if page is None:
+            return None
             
         # Create or update venue
-        venue = Venue.query.filter_by(name=name, address=address).first()
+        venue = Venue.query.filter_by(name=page['name'], address=page['address']).first()
         if not venue:
             venue = Venue(
-                name=name,
-                address=address,
-                latitude=lat,
-                longitude=lng
+                name=page['name'],
+                address=page['address'],
+                latitude=page['latitude'],
+                longitude=page['longitude']
             )
             db.session.add(venue)
             db.session.commit()
         
-        # Extract reviews
-        reviews = []
-        review_containers = soup.find_all('div', {'class': 'review-container'})
-        
-        for container in review_containers:
-            review_text = container.find('p', {'class': 'review-text'}).text.strip() if container.find('p', {'class': 'review-text'}) else ''
-            reviewer_location = container.find('span', {'class': 'reviewer-location'}).text.strip() if container.find('span', {'class': 'reviewer-location'}) else ''
-            date_text = container.find('span', {'class': 'review-date'}).text.strip() if container.find('span', {'class': 'review-date'}) else ''
-            
-            if review_text:
-                review = Review(
-                    venue_id=venue.id,
-                    source='tripadvisor',
-                    text=review_text,
-                    reviewer_location=reviewer_location,
-                    review_date=self._parse_review_date(date_text)
-                )
-                reviews.append(review)
-        
-        return reviews
+        return [
+            Review(
+                venue_id=venue.id,
+                source='tripadvisor',
+                text=fields['text'],
+                reviewer_location=fields.get('reviewer_location', ''),
+                review_date=self._parse_review_date(fields.get('date', ''))
+            )
+            for fields in page['reviews']
+        ]
 
-    def scrape(self, city, category):
+    def scrape(self, city, category, max_venues=None):
         """Main scraping function for TripAdvisor."""
         search_url = self._build_search_url(city, category)
-        response = requests.get(search_url, headers=self.headers)
+        search_html, _, save_search = self._fetch(search_url)
         
-        if response.status_code != 200:
-            raise Exception(f"Failed to access TripAdvisor search: {response.status_code}")
+        if search_html is None:
+            raise Exception(f"Failed to access TripAdvisor search: {search_url}")
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(search_html, HTML_PARSER, parse_only=SoupStrainer('a', class_='result-title'))
         venue_links = soup.find_all('a', {'class': 'result-title'})
         
+        limit = max_venues or self.max_venues
+        venue_urls = [link.get('href') for link in venue_links[:limit] if link.get('href')]
+        save_search()
+        
+        # Download all venue pages concurrently, then parse and save them in order
+        pages = self._fetch_all([self.base_url + venue_url for venue_url in venue_urls])
+        
         all_reviews = []
-        for link in venue_links[:10]:  # Limit to first 10 venues for demo
-            venue_url = link.get('href')
-            if venue_url:
-                reviews = self._scrape_venue(venue_url)
+        for html, changed, _ in pages:
+            # Pages identical to the cached copy were already saved by an earlier scrape
+            if html and changed:
+                reviews = self._scrape_venue(html)
                 if reviews:
                     all_reviews.extend(reviews)
         
-        # Bulk save reviews
+        # Bulk save reviews we have not stored before
+        all_reviews = filter_new_reviews(all_reviews)
         if all_reviews:
             db.session.bulk_save_objects(all_reviews)
             db.session.commit()
         
+        # Only now mark the pages as processed, so a failed scrape parses them again
+        for _, _, save in pages:
+            save()
+        
         return all_reviews
 
 # Create scraper instance
-scraper = TripAdvisorScraper()
+scraper = TripAdvisorScraper(page_cache=PageCache())
 
-def scrape(city, category):
+def scrape(city, category, max_venues=None):
     """Wrapper function to initiate scraping."""
-    return scraper.scrape(city, category) 
\ No newline at end of file
+    return scraper.scrape(city, category, max_venues=max_venues) 
\ No newline at end of file
@@ -1,21 +1,75 @@
-from transformers import pipeline
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from app import db
-from app.models.models import Review, EmotionScore
+from app.services.geo import heatmap_generator
+from app.services.sentiment.inference_cache import InferenceCache, text_key
+from app.services.sentiment.review_stream import iter_unprocessed_reviews
+from app.services.sentiment.score_store import save_vectors
+
+MODEL_NAME = os.getenv('EMOTION_MODEL', 'j-hartmann/emotion-english-distilroberta-base')
+
+# Number of texts per forward pass; tune for the host's cores and memory
+INFERENCE_BATCH_SIZE = int(os.getenv('EMOTION_BATCH_SIZE', '32'))
+
+# Inference processes for /process; 1 runs inference in the calling thread
+WORKERS = int(os.getenv('EMOTION_WORKERS', '1'))
+
+# Upper bound on tokens per text; RoBERTa-style models accept 512
+MAX_SEQUENCE_LENGTH = 512
 
 class EmotionAnalyzer:
-    def __init__(self):
-        """Initialize the emotion analysis pipeline."""
-        self.emotion_pipeline = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            return_all_scores=True
-        )
+    def __init__(self, model_name=MODEL_NAME, inference_batch_size=INFERENCE_BATCH_SIZE, cache_path=None):
+        """
+        Configure the analyzer; the model itself is loaded on first use.
+
+        Scores are cached by normalized text in the SQLite file at
+        cache_path, by default the app's EMOTION_CACHE_PATH; pass an empty
+        cache_path to always run the model.
+        """
+        self.model_name = model_name
+        self.inference_batch_size = inference_batch_size
+        self.max_length = MAX_SEQUENCE_LENGTH
+        self.cache = InferenceCache(model_name, cache_path) if cache_path != '' else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Load the emotion analysis pipeline if it hasn't been loaded yet."""
+        if self._pipeline is None:
+            with self._load_lock:
+                if self._pipeline is None:
+                    # Importing transformers pulls in torch, so defer it until needed
+                    from transformers import pipeline
+                    emotion_pipeline = pipeline(
+                        "text-classification",
+                        model=self.model_name,
+                        return_all_scores=True
+                    )
+                    self.max_length = min(emotion_pipeline.tokenizer.model_max_length, MAX_SEQUENCE_LENGTH)
+                    self._pipeline = emotion_pipeline
+        return self._pipeline
+
+    @property
+    def is_loaded(self):
+        return self._pipeline is not None
+
+    @property
+    def emotion_pipeline(self):
+        return self.load()
 
     def _analyze_text(self, text):
         """Analyze text and return emotion scores."""
         try:
             # Get emotion scores for the text
-            results = self.emotion_pipeline(text)[0]
+            results = self.emotion_pipeline(
+                text, truncation=True, max_length=self.max_length
+            )[0]
             
             # Convert to dictionary format
             emotion_scores = {
@@ -28,46 +82,208 @@ class EmotionAnalyzer:
             print(f"Error analyzing text: {str(e)}")
             return None
 
-    def analyze_reviews(self, batch_size=100):
-        """Analyze all unprocessed reviews in the database."""
-        # Get reviews that haven't been analyzed yet
-        unprocessed_reviews = Review.query.outerjoin(
-            EmotionScore,
-            Review.id == EmotionScore.review_id
-        ).filter(
-            EmotionScore.id.is_(None)
-        ).all()
+    def _analyze_batch(self, texts):
+        """
+        Analyze several texts with batched forward passes.
+
+        Returns a list of emotion score dicts aligned with texts, with None
+        for texts that could not be analyzed.
+        """
+        if not texts:
+            return []
         
-        results = []
+        # Sort by length so each forward pass pads to a similar length
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        try:
+            outputs = self.emotion_pipeline(
+                [texts[i] for i in order],
+                batch_size=self.inference_batch_size,
+                truncation=True,
+                max_length=self.max_length
+            )
+        except Exception as e:
+            # Fall back to one text at a time so a bad input only loses itself
+            print(f"Error analyzing batch, retrying individually: {str(e)}")
+            return [self._analyze_text(text) for text in texts]
         
-        # Process reviews in batches
-        for i in range(0, len(unprocessed_reviews), batch_size):
-            batch = unprocessed_reviews[i:i + batch_size]
-            
-            for review in batch:
-                emotion_scores = self._analyze_text(review.text)
-                
-                if emotion_scores:
-                    # Create EmotionScore objects for each emotion
-                    for emotion, score in emotion_scores.items():
-                        emotion_score = EmotionScore(
-                            review_id=review.id,
-                            emotion=emotion,
-                            score=score
-                        )
-                        results.append(emotion_score)
-            
-            # Commit batch to database
-            if results:
-                db.session.bulk_save_objects(results)
-                db.session.commit()
-                results = []  # Clear results for next batch
+        results = [None] * len(texts)
+        for index, output in zip(order, outputs):
+            results[index] = {score['label']: score['score'] for score in output}
+        return results
+
+    def analyze_rows(self, rows):
+        """
+        Analyze (review_id, text) rows into a compact score matrix.
+
+        Returns (review_ids, labels, scores) where scores is a float32 array
+        of shape (len(review_ids), len(labels)); rows that could not be
+        analyzed are left out.
+        """
+        batch_scores = self._analyze_batch([text for _, text in rows])
+        
+        labels = next((sorted(scores) for scores in batch_scores if scores), [])
+        review_ids = []
+        vectors = []
+        for (review_id, _), emotion_scores in zip(rows, batch_scores):
+            if emotion_scores:
+                review_ids.append(review_id)
+                vectors.append([emotion_scores[label] for label in labels])
+        
+        scores = np.asarray(vectors, dtype=np.float32).reshape(len(review_ids), len(labels))
+        return review_ids, labels, scores
+
+    def _split_cached(self, batch):
+        """
+        Look a page of (review_id, text) rows up in the inference cache.
+
+        Returns (lookup, rows): what is needed to fill in the cached reviews
+        later, and the rows that still need inference. Repeated texts within
+        the page are only sent to the model once.
+        """
+        if self.cache is None:
+            return None, batch
+        
+        keys = {review_id: text_key(text) for review_id, text in batch}
+        cached = self.cache.get_many(keys.values())
+        seen = set(cached)
+        rows = []
+        for review_id, text in batch:
+            if keys[review_id] not in seen:
+                seen.add(keys[review_id])
+                rows.append((review_id, text))
+        
+        self.cache_hits += len(batch) - len(rows)
+        self.cache_misses += len(rows)
+        return (keys, cached), rows
+
+    def _with_cached(self, lookup, review_ids, labels, scores):
+        """Cache freshly inferred scores and add the page's other reviews from the cache."""
+        if lookup is None:
+            return review_ids, labels, scores
+        
+        keys, cached = lookup
+        fresh = {
+            keys[review_id]: dict(zip(labels, row))
+            for review_id, row in zip(review_ids, scores.tolist())
+        }
+        self.cache.put_many(fresh)
         
-        return len(unprocessed_reviews)
+        known = {**cached, **fresh}
+        analyzed = set(review_ids)
+        extra_ids = [
+            review_id for review_id, key in keys.items()
+            if review_id not in analyzed and key in known
+        ]
+        if not extra_ids:
+            return review_ids, labels, scores
+        
+        labels = labels or sorted(known[keys[extra_ids[0]]])
+        extra_scores = np.asarray(
+            [[known[keys[review_id]][label] for label in labels] for review_id in extra_ids],
+            dtype=np.float32
+        )
+        scores = np.concatenate([scores.reshape(-1, len(labels)), extra_scores])
+        return review_ids + extra_ids, labels, scores
+
+    def cache_stats(self):
+        """Inference cache hits and misses of the current or last analyze_reviews run."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'enabled': self.cache is not None,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+
+    def _save_scores(self, review_ids, labels, scores):
+        """Bulk insert score vectors and fold them into the hotspots, in one transaction."""
+        if review_ids:
+            save_vectors(review_ids, labels, scores)
+            heatmap_generator.apply_new_scores(review_ids)
+        db.session.commit()
+
+    def analyze_reviews(self, batch_size=100, after_id=0, workers=1, progress=None):
+        """
+        Analyze all unprocessed reviews in the database.
+
+        Reviews are streamed in id order and each batch is committed with its
+        hotspot updates, so an interrupted run can resume from
+        last_committed_id. With workers > 1 inference is spread over a pool
+        of processes. Reviews whose normalized text was scored before are
+        served from the inference cache instead of the model; cache_stats()
+        reports the run's hit rate. progress, if given, is called with the
+        running count, last committed id and cache counters after every
+        batch. Returns the number of reviews processed.
+        """
+        self.last_committed_id = after_id
+        self._progress = progress
+        self._processed = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        pages = iter_unprocessed_reviews(page_size=batch_size, after_id=after_id)
+        if workers > 1:
+            self._analyze_in_pool(pages, workers)
+        else:
+            for batch in pages:
+                lookup, rows = self._split_cached(batch)
+                self._save_scores(*self._with_cached(lookup, *self.analyze_rows(rows)))
+                self._batch_committed(batch)
+        
+        return self._processed
+
+    def _analyze_in_pool(self, pages, workers):
+        """Shard review pages across worker processes and write their results here."""
+        # Split the cores between workers so torch threads don't oversubscribe them
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        pending = deque()
+        
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.inference_batch_size, torch_threads)
+        ) as pool:
+            for batch in pages:
+                # Cache lookups stay in this process; workers only see the misses
+                lookup, rows = self._split_cached(batch)
+                pending.append((batch, lookup, pool.submit(_analyze_shard, rows)))
+                # Bound the number of in-flight pages to keep memory flat
+                if len(pending) >= 2 * workers:
+                    self._save_shard(*pending.popleft())
+            while pending:
+                self._save_shard(*pending.popleft())
+
+    def _save_shard(self, batch, lookup, future):
+        # Results are written in submission order so last_committed_id stays monotonic
+        self._save_scores(*self._with_cached(lookup, *future.result()))
+        self._batch_committed(batch)
+
+    def _batch_committed(self, batch):
+        self._processed += len(batch)
+        self.last_committed_id = batch[-1][0]
+        if self._progress:
+            self._progress(
+                self._processed, self.last_committed_id,
+                cache_hits=self.cache_hits, cache_misses=self.cache_misses
+            )
+
+# Per-process analyzer used by the worker pool
+_worker_analyzer = None
+
+def _init_worker(model_name, inference_batch_size, torch_threads):
+    """Load the model once in each worker process."""
+    global _worker_analyzer
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker_analyzer = EmotionAnalyzer(model_name, inference_batch_size, cache_path='')
+    _worker_analyzer.load()
+
+def _analyze_shard(rows):
+    return _worker_analyzer.analyze_rows(rows)
 
 # Create analyzer instance
 analyzer = EmotionAnalyzer()
 
-def analyze_reviews():
+def analyze_reviews(progress=None):
     """Wrapper function to initiate review analysis."""
-    return analyzer.analyze_reviews() 
\ No newline at end of file
+    return analyzer.analyze_reviews(workers=WORKERS, progress=progress)
\ No newline at end of file
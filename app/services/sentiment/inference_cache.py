@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+from flask import current_app
+from app.services.scraper.dedup import fingerprint
+
+# Keys looked up per query, to stay under SQLite's parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+def text_key(text):
+    """Cache key of a review text; texts differing only in case, punctuation or spacing share it."""
+    return fingerprint(text)
+
+class InferenceCache:
+    """
+    Persistent mapping of normalized text hash to emotion scores.
+
+    Entries are keyed by model name as well, so switching EMOTION_MODEL
+    starts from an empty cache instead of serving another model's scores.
+    The store is a standalone SQLite file in WAL mode, shared by every
+    worker process and kept apart from the application database. path
+    defaults to the app's EMOTION_CACHE_PATH, read on first use.
+    """
+
+    def __init__(self, model_name, path=None):
+        self.model_name = model_name
+        self.path = path
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.path is None:
+                self.path = current_app.config['EMOTION_CACHE_PATH']
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        if not self._ready:
+            with self._ready_lock:
+                if not self._ready:
+                    connection.execute('PRAGMA journal_mode=WAL')
+                    connection.execute(
+                        'CREATE TABLE IF NOT EXISTS inference_cache ('
+                        'model TEXT NOT NULL, text_hash TEXT NOT NULL, scores TEXT NOT NULL, '
+                        'PRIMARY KEY (model, text_hash)) WITHOUT ROWID'
+                    )
+                    connection.commit()
+                    self._ready = True
+        return connection
+
+    def get_many(self, keys):
+        """Return {key: {label: score}} for the keys that are cached."""
+        keys = sorted(set(keys))
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            rows = connection.execute(
+                'SELECT text_hash, scores FROM inference_cache '
+                f'WHERE model = ? AND text_hash IN ({",".join("?" * len(chunk))})',
+                [self.model_name, *chunk]
+            )
+            found.update((key, json.loads(scores)) for key, scores in rows)
+        return found
+
+    def put_many(self, entries):
+        """Store {key: {label: score}} entries, replacing any older scores."""
+        if not entries:
+            return
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO inference_cache (model, text_hash, scores) VALUES (?, ?, ?)',
+                [(self.model_name, key, json.dumps(scores)) for key, scores in entries.items()]
+            )
+
+    def clear(self):
+        """Drop the cached scores of this model."""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM inference_cache WHERE model = ?', (self.model_name,))
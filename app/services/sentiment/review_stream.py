@@ -0,0 +1,29 @@
+from sqlalchemy import exists
+from app import db
+from app.models.models import Review, EmotionVector
+
+def iter_unprocessed_reviews(page_size=500, after_id=0):
+    """
+    Stream reviews that have no emotion scores yet, in id order.
+
+    Yields pages of (id, text) rows using keyset pagination, so memory use is
+    bounded by page_size no matter how large the backlog is. Pass the last
+    committed review id as after_id to resume an interrupted run.
+    """
+    last_id = after_id
+    while True:
+        page = db.session.query(
+            Review.id,
+            Review.text
+        ).filter(
+            Review.id > last_id,
+            ~exists().where(EmotionVector.review_id == Review.id)
+        ).order_by(
+            Review.id
+        ).limit(page_size).all()
+        
+        if not page:
+            return
+        
+        yield page
+        last_id = page[-1][0]
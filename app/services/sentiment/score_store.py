@@ -0,0 +1,98 @@
+import json
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.models import SCORE_DTYPE, EmotionLabelSet, EmotionVector, DataState
+
+# DataState rows describing the stored score vectors, updated in the
+# transaction that writes them so reading them never scans the table
+LAST_VECTOR_KEY = 'vector_last_review_id'
+VECTOR_COUNT_KEY = 'vector_count'
+
+def label_set_id(labels):
+    """Return the id of the label dictionary for labels, in order, creating it if needed."""
+    key = json.dumps(list(labels))
+    label_set = EmotionLabelSet.query.filter_by(labels=key).first()
+    if label_set is None:
+        try:
+            with db.session.begin_nested():
+                label_set = EmotionLabelSet(labels=key)
+                db.session.add(label_set)
+        except IntegrityError:
+            # Another writer registered the same labels first
+            label_set = EmotionLabelSet.query.filter_by(labels=key).one()
+    return label_set.id
+
+def vector_mappings(review_ids, labels, scores):
+    """
+    Return bulk insert mappings storing one EmotionVector per review.
+
+    scores is a (len(review_ids), len(labels)) matrix whose columns follow
+    labels.
+    """
+    if not review_ids:
+        return []
+
+    set_id = label_set_id(labels)
+    scores = np.asarray(scores, dtype=SCORE_DTYPE).reshape(len(review_ids), len(labels))
+    return [
+        {'review_id': review_id, 'label_set_id': set_id, 'scores': row.tobytes()}
+        for review_id, row in zip(review_ids, scores)
+    ]
+
+def save_vectors(review_ids, labels, scores):
+    """Bulk insert score vectors in the current transaction."""
+    mappings = vector_mappings(review_ids, labels, scores)
+    if mappings:
+        db.session.bulk_insert_mappings(EmotionVector, mappings)
+        record_vectors(db.session.connection(), review_ids)
+
+def record_vectors(connection, review_ids):
+    """
+    Count the vectors just inserted for review_ids in the DataState rows.
+
+    Runs on connection, so the counts commit or roll back with the vectors.
+    Every writer of EmotionVector rows must call it.
+    """
+    if not review_ids:
+        return
+    state = DataState.__table__
+    last_review_id = max(review_ids)
+    connection.execute(
+        update(state).where(state.c.name == VECTOR_COUNT_KEY).values(value=state.c.value + len(review_ids))
+    )
+    connection.execute(
+        update(state).where(state.c.name == LAST_VECTOR_KEY, state.c.value < last_review_id)
+        .values(value=last_review_id)
+    )
+
+def vector_state():
+    """Return (last scored review id, vector count) from the DataState rows."""
+    rows = dict(db.session.execute(
+        select(DataState.name, DataState.value).where(DataState.name.in_((LAST_VECTOR_KEY, VECTOR_COUNT_KEY)))
+    ).all())
+    return (rows.get(LAST_VECTOR_KEY, 0), rows.get(VECTOR_COUNT_KEY, 0))
+
+def sync_vector_state():
+    """
+    Recount the stored vectors into the DataState rows.
+
+    A repair tool, as it reads the whole table; the caller is responsible
+    for committing.
+    """
+    last_review_id, count = db.session.query(
+        func.max(EmotionVector.review_id), func.count(EmotionVector.review_id)
+    ).one()
+    db.session.merge(DataState(name=LAST_VECTOR_KEY, value=last_review_id or 0))
+    db.session.merge(DataState(name=VECTOR_COUNT_KEY, value=count))
+
+def ensure_vector_state():
+    """
+    Count the stored vectors once for databases created before the counts
+    were kept. Run at startup, after create_all().
+    """
+    if db.session.get(DataState, VECTOR_COUNT_KEY) is not None and db.session.get(DataState, LAST_VECTOR_KEY) is not None:
+        return
+    sync_vector_state()
+    db.session.commit()
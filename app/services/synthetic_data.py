@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta
+import numpy as np
+from app.services import bulk_seed
+
+# Labels of the default emotion model, in vector order
+LABELS = ['anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise']
+
+# Spread of neighborhood centers around the city center, and of venues
+# around their neighborhood, in degrees (roughly 5 km and 400 m)
+CITY_SPREAD = 0.05
+NEIGHBORHOOD_SPREAD = 0.004
+
+CATEGORIES = ['restaurants', 'attractions', 'hotels', 'parks', 'nightlife']
+
+OPENINGS = ['Loved', 'Really enjoyed', 'Did not like', 'Had a quiet time at', 'Was surprised by', 'Got lost around']
+SUBJECTS = ['the market', 'the riverside', 'the old town', 'the gardens', 'the food hall', 'the museum']
+DETAILS = [
+    'the crowds were overwhelming', 'the staff were friendly', 'it was calm in the morning',
+    'prices were high', 'the view at sunset was stunning', 'it felt a bit unsafe at night'
+]
+
+def _review_texts(rng, count):
+    """Compose count review texts from phrase fragments, so some of them repeat."""
+    openings = rng.integers(len(OPENINGS), size=count)
+    subjects = rng.integers(len(SUBJECTS), size=count)
+    details = rng.integers(len(DETAILS), size=(count, 2))
+    return [
+        f"{OPENINGS[o]} {SUBJECTS[s]}, {DETAILS[a]} and {DETAILS[b]}."
+        for o, s, (a, b) in zip(openings.tolist(), subjects.tolist(), details.tolist())
+    ]
+
+def generate_city(neighborhoods=20, venues=2000, reviews=20000, city='Synthetic City',
+                  center=(51.5074, -0.1278), scored_fraction=1.0, seed=0):
+    """
+    Seed a synthetic city for load testing.
+
+    Neighborhood centers are scattered around center. Venues cluster around
+    neighborhoods picked with uneven popularity. Reviews follow a long-tailed
+    venue popularity, as real review counts do. Each neighborhood has its
+    own emotional mood, and the first scored_fraction of the reviews get
+    emotion vectors drawn around it; the rest are left for /process. Rows,
+    membership and hotspots are written in one bulk_seed transaction.
+    Returns the counts of created rows.
+    """
+    rng = np.random.default_rng(seed)
+    center_lat, center_lng = center
+
+    # Neighborhoods, each with a popularity and an emotional mood
+    centers = rng.normal([center_lat, center_lng], CITY_SPREAD, size=(neighborhoods, 2))
+    neighborhood_rows = [
+        {
+            'name': f'{city} District {i + 1}',
+            'city': city,
+            'boundary': json.dumps({'type': 'Point', 'coordinates': [lng, lat]})
+        }
+        for i, (lat, lng) in enumerate(centers.tolist())
+    ]
+    popularity = rng.dirichlet(np.full(neighborhoods, 0.8))
+    moods = rng.dirichlet(np.ones(len(LABELS)), size=neighborhoods)
+
+    # Venues clustered around their neighborhood
+    venue_homes = rng.choice(neighborhoods, size=venues, p=popularity)
+    coordinates = centers[venue_homes] + rng.normal(0.0, NEIGHBORHOOD_SPREAD, size=(venues, 2))
+    categories = rng.choice(CATEGORIES, size=venues).tolist()
+    venue_rows = [
+        {
+            'name': f'{city} Venue {i + 1}',
+            'address': f'{i + 1} Synthetic Street, {city}',
+            'latitude': lat,
+            'longitude': lng,
+            'category': category
+        }
+        for i, ((lat, lng), category) in enumerate(zip(coordinates.tolist(), categories))
+    ]
+
+    # Reviews with long-tailed venue popularity
+    venue_weights = rng.pareto(1.2, size=venues) + 1.0
+    review_venues = rng.choice(venues, size=reviews, p=venue_weights / venue_weights.sum())
+    now = datetime.utcnow()
+    review_rows = [
+        {
+            'source': 'synthetic',
+            'text': text,
+            'reviewer_location': city,
+            'review_date': now - timedelta(days=age)
+        }
+        for text, age in zip(_review_texts(rng, reviews), rng.integers(0, 365, size=reviews).tolist())
+    ]
+
+    # Emotion vectors drawn around each review's neighborhood mood, as
+    # Dirichlet samples from normalized gammas
+    scored = int(reviews * scored_fraction)
+    gammas = rng.standard_gamma(moods[venue_homes[review_venues[:scored]]] * 20 + 0.1)
+    scores = gammas / gammas.sum(axis=1, keepdims=True)
+
+    bulk_seed.seed(neighborhood_rows, venue_rows, review_rows, review_venues, LABELS, scores)
+
+    return {
+        'neighborhoods': neighborhoods,
+        'venues': venues,
+        'reviews': reviews,
+        'scored_reviews': scored
+    }
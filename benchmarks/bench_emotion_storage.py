@@ -0,0 +1,120 @@
+"""
+Storage benchmark: one EmotionScore row per label (the previous layout)
+versus one float32 EmotionVector per review, comparing table size and the
+per-neighborhood aggregate used to build the heatmap hotspots.
+
+Run from the repository root:
+    python -m benchmarks.bench_emotion_storage
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from sqlalchemy import insert, select, text
+from app import create_app, db
+from app.models.models import Venue, Review
+from app.services.geo.heatmap_generator import generator
+from app.services.sentiment.score_store import save_vectors
+
+LABELS = ['anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise']
+
+LEGACY_TABLE = '''
+CREATE TABLE emotion_score (
+    id INTEGER NOT NULL PRIMARY KEY,
+    review_id INTEGER NOT NULL REFERENCES review (id),
+    emotion VARCHAR(50) NOT NULL,
+    score FLOAT NOT NULL,
+    created_at DATETIME
+)
+'''
+
+LEGACY_AGGREGATE = '''
+SELECT neighborhood_venue.neighborhood_id, emotion_score.emotion,
+       SUM(emotion_score.score), COUNT(emotion_score.id)
+FROM neighborhood_venue
+JOIN review ON review.venue_id = neighborhood_venue.venue_id
+JOIN emotion_score ON emotion_score.review_id = review.id
+GROUP BY neighborhood_venue.neighborhood_id, emotion_score.emotion
+'''
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _table_bytes(database, table, workdir):
+    """On-disk size of a table, from dbstat or else by copying it into its own file."""
+    connection = sqlite3.connect(database, isolation_level=None)
+    try:
+        return connection.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = ?', (table,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite built without the dbstat virtual table
+        path = os.path.join(workdir, f'{table}.db')
+        connection.execute('ATTACH DATABASE ? AS copy', (path,))
+        connection.execute(f'CREATE TABLE copy.{table} AS SELECT * FROM main.{table}')
+        connection.execute('DETACH DATABASE copy')
+        return os.path.getsize(path)
+    finally:
+        connection.close()
+
+def _populate(reviews, seed):
+    rng = random.Random(seed)
+    venue_ids = db.session.scalars(select(Venue.id)).all()
+    db.session.execute(text(LEGACY_TABLE))
+
+    for start in range(0, reviews, 10000):
+        count = min(10000, reviews - start)
+        first_id = (db.session.scalar(select(db.func.max(Review.id))) or 0) + 1
+        db.session.execute(insert(Review), [
+            {'id': first_id + i, 'venue_id': rng.choice(venue_ids), 'source': 'bench', 'text': f'Review {start + i}'}
+            for i in range(count)
+        ])
+        review_ids = list(range(first_id, first_id + count))
+        scores = [[rng.random() for _ in LABELS] for _ in review_ids]
+        save_vectors(review_ids, LABELS, scores)
+        db.session.execute(
+            text('INSERT INTO emotion_score (review_id, emotion, score, created_at) '
+                 'VALUES (:review_id, :emotion, :score, CURRENT_TIMESTAMP)'),
+            [
+                {'review_id': review_id, 'emotion': label, 'score': score}
+                for review_id, row in zip(review_ids, scores)
+                for label, score in zip(LABELS, row)
+            ]
+        )
+        db.session.commit()
+
+def run(reviews, repeat, seed=42):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+        with app.app_context():
+            _populate(reviews, seed)
+            results = {
+                'reviews': db.session.scalar(select(db.func.count(Review.id))),
+                'legacy_bytes': _table_bytes(database, 'emotion_score', workdir),
+                'vector_bytes': _table_bytes(database, 'emotion_vector', workdir),
+                'legacy_s': _best_of(lambda: db.session.execute(text(LEGACY_AGGREGATE)).all(), repeat),
+                'vector_s': _best_of(generator._aggregate_scores, repeat),
+            }
+            db.session.remove()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'reviews':>8} {'rows MB':>9} {'vectors MB':>11} {'rows agg (s)':>13} {'vectors agg (s)':>16}")
+    for count in args.reviews:
+        row = run(count, args.repeat)
+        print(f"{row['reviews']:>8} {row['legacy_bytes'] / 2**20:>9.2f} {row['vector_bytes'] / 2**20:>11.2f} "
+              f"{row['legacy_s']:>13.4f} {row['vector_s']:>16.4f}")
+
+if __name__ == '__main__':
+    main()
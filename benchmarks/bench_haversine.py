@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: scalar haversine_distance loop vs the vectorized
+haversine_matrix for a neighborhood x venue distance matrix.
+
+Run from the repository root:
+    python -m benchmarks.bench_haversine
+"""
+import argparse
+import random
+import time
+from app.services.geo.distance import haversine_distance, haversine_matrix
+
+def _random_points(count, rng):
+    # Scatter points over a London-sized area
+    lats = [rng.gauss(51.5074, 0.08) for _ in range(count)]
+    lngs = [rng.gauss(-0.1278, 0.12) for _ in range(count)]
+    return lats, lngs
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(venue_counts, neighborhoods, repeat, seed=42):
+    rng = random.Random(seed)
+    n_lats, n_lngs = _random_points(neighborhoods, rng)
+    results = []
+
+    for venues in venue_counts:
+        v_lats, v_lngs = _random_points(venues, rng)
+
+        def scalar():
+            return [
+                [haversine_distance(n_lat, n_lng, v_lat, v_lng) for v_lat, v_lng in zip(v_lats, v_lngs)]
+                for n_lat, n_lng in zip(n_lats, n_lngs)
+            ]
+
+        def vectorized():
+            return haversine_matrix(n_lats, n_lngs, v_lats, v_lngs)
+
+        scalar_time = _best_of(scalar, repeat)
+        vector_time = _best_of(vectorized, repeat)
+        results.append({
+            'venues': venues,
+            'neighborhoods': neighborhoods,
+            'scalar_s': scalar_time,
+            'vectorized_s': vector_time,
+            'speedup': scalar_time / vector_time if vector_time else float('inf')
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--venues', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--neighborhoods', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'venues':>8} {'pairs':>10} {'scalar (s)':>12} {'numpy (s)':>12} {'speedup':>9}")
+    for row in run(args.venues, args.neighborhoods, args.repeat):
+        pairs = row['venues'] * row['neighborhoods']
+        print(f"{row['venues']:>8} {pairs:>10} {row['scalar_s']:>12.4f} "
+              f"{row['vectorized_s']:>12.4f} {row['speedup']:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
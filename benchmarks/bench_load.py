@@ -0,0 +1,234 @@
+"""
+Load benchmark: seed a synthetic city at several scales and drive the
+heatmap, heatmap tile, process, reviews, recommendation and itinerary
+endpoints through the Flask test client, reporting p50/p95 latency,
+throughput and peak memory as JSON.
+
+The emotion model is replaced by a stub unless --real-model is given, so
+/process timings measure the pipeline around inference.
+
+Run from the repository root:
+    python -m benchmarks.bench_load --scales small medium
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from app import create_app, db
+from app.models.models import Neighborhood
+from app.services.sentiment import emotion_analyzer
+from app.services.sentiment.inference_cache import InferenceCache
+from app.services.synthetic_data import LABELS, generate_city
+
+# name: (neighborhoods, venues, reviews)
+SCALES = {
+    'small': (10, 500, 5000),
+    'medium': (50, 5000, 100000),
+    'large': (200, 20000, 1000000),
+}
+
+EMOTIONS = ['joy', 'fear', 'sadness', 'surprise']
+
+# Zoom of the heatmap tiles requested, and how many tiles around the city
+# center, per side
+TILE_ZOOM = 13
+TILE_SPAN = 4
+
+# Share of the synthetic reviews left unscored for /process
+UNSCORED_FRACTION = 0.1
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+class StubPipeline:
+    """Returns fixed scores instantly in place of the transformer pipeline."""
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def __call__(self, texts, **kwargs):
+        share = 1.0 / len(self.labels)
+        return [[{'label': label, 'score': share} for label in self.labels] for _ in texts]
+
+def _tiles_around(lat, lng, zoom):
+    """(x, y) of the TILE_SPAN x TILE_SPAN tiles centered on a point."""
+    n = 2 ** zoom
+    center_x = int((lng + 180) / 360 * n)
+    center_y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    offsets = range(-(TILE_SPAN // 2), TILE_SPAN - TILE_SPAN // 2)
+    return [(center_x + dx, center_y + dy) for dx in offsets for dy in offsets]
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _measure(call, requests):
+    """Time requests calls and summarize their latencies."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        request_start = time.perf_counter()
+        response = call(i)
+        latencies.append(time.perf_counter() - request_start)
+        assert response.status_code < 400, f'{response.status_code}: {response.get_data(as_text=True)[:200]}'
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': requests,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'throughput_rps': requests / elapsed if elapsed else float('inf'),
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def _run_process(client, timeout):
+    """Queue /process, wait for the job and report its duration and throughput."""
+    start = time.perf_counter()
+    response = client.post('/api/process')
+    status_url = response.get_json()['status_url']
+    while True:
+        job = client.get(status_url).get_json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f'/process did not finish within {timeout}s')
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    processed = (job['result'] or {}).get('processed_count', 0)
+    return {
+        'status': job['status'],
+        'processed_count': processed,
+        'duration_s': elapsed,
+        'throughput_reviews_per_s': processed / elapsed if elapsed else float('inf'),
+        'inference_cache': (job['result'] or {}).get('inference_cache'),
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def run_scale(name, requests, real_model, timeout, seed=0):
+    neighborhoods, venues, reviews = SCALES[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}"})
+        analyzer = emotion_analyzer.analyzer
+        analyzer.cache = InferenceCache(analyzer.model_name, os.path.join(workdir, 'inference_cache.sqlite3'))
+        if not real_model:
+            analyzer._pipeline = StubPipeline(LABELS)
+
+        with app.app_context():
+            seed_start = time.perf_counter()
+            generate_city(neighborhoods, venues, reviews, scored_fraction=1 - UNSCORED_FRACTION, seed=seed)
+            seed_seconds = time.perf_counter() - seed_start
+            locations = [location for (location,) in Neighborhood.query.with_entities(Neighborhood.name)]
+
+        client = app.test_client()
+        client.post('/api/auth/register', json={
+            'username': 'bench', 'email': 'bench@example.com', 'password': 'bench-password'
+        })
+        client.post('/api/auth/login', json={'username': 'bench', 'password': 'bench-password'})
+        hotspots = [{'name': location} for location in locations[:5]]
+
+        endpoints = {}
+        endpoints['heatmap'] = _measure(
+            lambda i: client.get('/api/heatmap', query_string={'emotion': EMOTIONS[i % len(EMOTIONS)]}),
+            requests
+        )
+        etags = {emotion: client.get('/api/heatmap', query_string={'emotion': emotion}).headers['ETag']
+                 for emotion in EMOTIONS}
+        endpoints['heatmap_conditional'] = _measure(
+            lambda i: client.get(
+                '/api/heatmap',
+                query_string={'emotion': EMOTIONS[i % len(EMOTIONS)]},
+                headers={'If-None-Match': etags[EMOTIONS[i % len(EMOTIONS)]]}
+            ),
+            requests
+        )
+        tiles = _tiles_around(51.5074, -0.1278, TILE_ZOOM)
+        endpoints['heatmap_tiles'] = _measure(
+            lambda i: client.get(
+                f'/api/heatmap/tiles/{TILE_ZOOM}/%d/%d' % tiles[i % len(tiles)],
+                query_string={'emotion': EMOTIONS[i % len(EMOTIONS)]}
+            ),
+            requests
+        )
+        endpoints['reviews'] = _measure(
+            lambda i: client.get('/api/reviews', query_string={'location': locations[i % len(locations)]}),
+            requests
+        )
+        endpoints['itinerary'] = _measure(
+            lambda i: client.post('/api/itinerary', json={'hotspots': hotspots}),
+            requests
+        )
+        endpoints['recommendations'] = _measure(
+            lambda i: client.get('/api/recommendations', query_string={
+                'emotions': f'{EMOTIONS[i % len(EMOTIONS)]}:0.6,neutral:0.4', 'lat': 51.5074, 'lng': -0.1278
+            }),
+            requests
+        )
+        endpoints['save_itinerary'] = _measure(
+            lambda i: client.post('/api/auth/itineraries', json={'name': f'Trip {i}', 'hotspots': hotspots}),
+            requests
+        )
+        endpoints['list_itineraries'] = _measure(lambda i: client.get('/api/auth/itineraries'), requests)
+        endpoints['process'] = _run_process(client, timeout)
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    return {
+        'scale': name,
+        'neighborhoods': neighborhoods,
+        'venues': venues,
+        'reviews': reviews,
+        'seed_seconds': seed_seconds,
+        'endpoints': endpoints
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['small', 'medium'])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--real-model', action='store_true', help='run /process with the transformer model')
+    parser.add_argument('--timeout', type=float, default=3600, help='seconds to wait for /process')
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/load-<timestamp>.json)')
+    args = parser.parse_args()
+
+    started_at = datetime.utcnow()
+    results = {
+        'started_at': started_at.isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'real_model': args.real_model,
+        'runs': []
+    }
+
+    print(f"{'scale':>7} {'endpoint':>20} {'p50 (ms)':>10} {'p95 (ms)':>10} {'req/s':>9} {'RSS (MB)':>9}")
+    for scale in args.scales:
+        run = run_scale(scale, args.requests, args.real_model, args.timeout)
+        results['runs'].append(run)
+        for endpoint, stats in run['endpoints'].items():
+            if endpoint == 'process':
+                print(f"{scale:>7} {endpoint:>20} {stats['processed_count']:>10} reviews in "
+                      f"{stats['duration_s']:.2f}s ({stats['throughput_reviews_per_s']:.0f}/s)")
+            else:
+                print(f"{scale:>7} {endpoint:>20} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+                      f"{stats['throughput_rps']:>9.1f} {stats['peak_rss_mb']:>9.1f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{started_at:%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Parsing benchmark: TripAdvisor venue page extraction with each parser
+backend, with and without the SoupStrainer partial parse.
+
+Run from the repository root:
+    python -m benchmarks.bench_parsing
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+import warnings
+from app.services.scraper.tripadvisor import HTML_PARSER, VENUE_STRAINER, TripAdvisorScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tripadvisor_*.html')
+
+MODES = [
+    ('html.parser, full tree', 'html.parser', None),
+    ('html.parser, strainer', 'html.parser', VENUE_STRAINER),
+    (f'{HTML_PARSER}, full tree', HTML_PARSER, None),
+    (f'{HTML_PARSER}, strainer', HTML_PARSER, VENUE_STRAINER),
+]
+
+def _load_pages():
+    pages = []
+    for path in sorted(glob.glob(FIXTURES)):
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+def run(pages, repeat):
+    scraper = TripAdvisorScraper()
+    results = []
+    seen = set()
+
+    for label, features, parse_only in MODES:
+        if (features, parse_only) in seen:
+            continue
+        seen.add((features, parse_only))
+
+        def parse_all():
+            for html in pages:
+                scraper._parse_venue_page(html, features, parse_only)
+
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse_all()
+            best = min(best, time.perf_counter() - start)
+
+        # Measure allocations separately so tracing does not skew the timing
+        tracemalloc.start()
+        parse_all()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results.append({
+            'mode': label,
+            'pages_per_s': len(pages) / best,
+            'peak_kb': peak / 1024
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--copies', type=int, default=20, help='times each fixture page is parsed per run')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = _load_pages() * args.copies
+    if not pages:
+        raise SystemExit(f"No fixture pages found matching {FIXTURES}")
+
+    # bs4's lxml builder passes an option newer lxml releases warn about
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KB average")
+    print(f"{'mode':<26} {'pages/s':>10} {'peak KB':>10}")
+    for row in run(pages, args.repeat):
+        print(f"{row['mode']:<26} {row['pages_per_s']:>10.1f} {row['peak_kb']:>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Route benchmark: itinerary ordering time and route length across stop
+counts, nearest-neighbor alone versus the 2-opt/Or-opt optimized route.
+
+Run from the repository root:
+    python -m benchmarks.bench_route
+"""
+import argparse
+import random
+import time
+import numpy as np
+from app.services.geo.route_optimizer import TIME_BUDGET_SECONDS, _nearest_neighbor, optimize_route, path_length
+
+# Interactive target for ordering 50 stops
+TARGET_MS = 50
+
+def _random_points(count, rng):
+    # Scatter points over a London-sized area
+    lats = [rng.gauss(51.5074, 0.08) for _ in range(count)]
+    lngs = [rng.gauss(-0.1278, 0.12) for _ in range(count)]
+    return lats, lngs
+
+def run(stop_counts, trials, time_budget, seed=42):
+    rng = random.Random(seed)
+    results = []
+
+    for stops in stop_counts:
+        times = []
+        ratios = []
+        for _ in range(trials):
+            lats, lngs = _random_points(stops, rng)
+            start = time.perf_counter()
+            order, distances = optimize_route(lats, lngs, time_budget=time_budget)
+            times.append(time.perf_counter() - start)
+            greedy = path_length(_nearest_neighbor(distances, [0]), distances)
+            ratios.append(path_length(order, distances) / greedy if greedy else 1.0)
+        times_ms = np.array(times) * 1000
+        results.append({
+            'stops': stops,
+            'p50_ms': float(np.percentile(times_ms, 50)),
+            'max_ms': float(times_ms.max()),
+            'length_vs_greedy': float(np.mean(ratios))
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, nargs='+', default=[5, 10, 25, 50, 100, 200])
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--time-budget', type=float, default=TIME_BUDGET_SECONDS,
+                        help='seconds allowed for improving a route')
+    args = parser.parse_args()
+
+    print(f"{'stops':>6} {'p50 (ms)':>10} {'max (ms)':>10} {'vs greedy':>10}")
+    for row in run(args.stops, args.trials, args.time_budget):
+        flag = ' over target' if row['stops'] <= 50 and row['max_ms'] > TARGET_MS else ''
+        print(f"{row['stops']:>6} {row['p50_ms']:>10.2f} {row['max_ms']:>10.2f} "
+              f"{row['length_vs_greedy']:>10.3f}{flag}")
+
+if __name__ == '__main__':
+    main()
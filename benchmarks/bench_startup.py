@@ -0,0 +1,60 @@
+"""
+Startup benchmark: time-to-first-request and peak RSS of a fresh worker
+with lazy model loading versus preloading the emotion model at startup
+(the previous import-time behaviour).
+
+Each mode runs in its own interpreter, like a new gunicorn worker:
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Executed in a child interpreter; prints one JSON line with its measurements
+CHILD = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+client = app.test_client()
+client.get('/api/auth/me')
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'time_to_first_request_s': elapsed,
+    'peak_rss_mb': rss_kb / 1024,
+    'torch_imported': 'torch' in sys.modules
+}))
+'''
+
+def measure(preload, repeat):
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ)
+            env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            env['EMOTION_PRELOAD'] = 'true' if preload else 'false'
+            output = subprocess.run(
+                [sys.executable, '-c', CHILD],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['time_to_first_request_s'])
+    return dict(best, mode='preload' if preload else 'lazy')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'first request (s)':>18} {'peak RSS (MB)':>14} {'torch':>6}")
+    for preload in (True, False):
+        row = measure(preload, args.repeat)
+        print(f"{row['mode']:>8} {row['time_to_first_request_s']:>18.2f} "
+              f"{row['peak_rss_mb']:>14.1f} {str(row['torch_imported']):>6}")
+
+if __name__ == '__main__':
+    main()
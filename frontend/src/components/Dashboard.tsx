@@ -4,10 +4,31 @@ import ReviewSidebar from './ReviewSidebar';
 import ItineraryBuilder from './ItineraryBuilder';
 import api from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
-import { Hotspot, Review, HeatmapResponse } from '../types';
+import { Hotspot, Review, HeatmapResponse, HeatmapVectors } from '../types';
 
 const EMOTIONS = ['joy', 'excitement', 'calm', 'trust', 'anticipation'];
 
+// Build one emotion's GeoJSON from the scores of every emotion
+const toFeatureCollection = (vectors: HeatmapVectors, emotion: string): HeatmapResponse => {
+  const column = vectors.emotions.indexOf(emotion);
+  return {
+    type: 'FeatureCollection',
+    features: vectors.neighborhoods
+      .filter(n => column >= 0 && n.scores[column] !== null)
+      .map(n => ({
+        type: 'Feature',
+        geometry: n.geometry,
+        properties: {
+          neighborhood: n.neighborhood,
+          emotion,
+          score: n.scores[column] as number,
+          weight: (n.scores[column] as number) * 10,
+          review_count: n.review_count
+        }
+      }))
+  };
+};
+
 const Dashboard: React.FC = () => {
   const { user } = useAuth();
   const [city, setCity] = useState('');
@@ -15,22 +36,31 @@ const Dashboard: React.FC = () => {
   const [selectedEmotion, setSelectedEmotion] = useState<string>('joy');
   const [isLoading, setIsLoading] = useState(false);
   const [heatmapData, setHeatmapData] = useState<HeatmapResponse | null>(null);
+  const [heatmapVectors, setHeatmapVectors] = useState<HeatmapVectors | null>(null);
   const [reviews, setReviews] = useState<Review[]>([]);
   const [selectedHotspots, setSelectedHotspots] = useState<Hotspot[]>([]);
   const [currentLocation, setCurrentLocation] = useState<{ lat: number, lng: number, name: string } | null>(null);
 
+  // Every emotion tab is served from one request
+  const loadHeatmaps = async () => {
+    setHeatmapVectors(await api.getHeatmapEmotions(EMOTIONS));
+  };
+
   useEffect(() => {
-    const fetchHeatmap = async () => {
-      try {
-        const data = await api.getHeatmap(selectedEmotion);
-        setHeatmapData(data);
-      } catch (error) {
-        console.error('Failed to fetch heatmap:', error);
-      }
-    };
+    loadHeatmaps().catch(error => console.error('Failed to fetch heatmap:', error));
+  }, []);
 
-    fetchHeatmap();
-  }, [selectedEmotion]);
+  useEffect(() => {
+    if (!heatmapVectors) return;
+    if (heatmapVectors.neighborhoods.length > 0) {
+      setHeatmapData(toFeatureCollection(heatmapVectors, selectedEmotion));
+    } else {
+      // Nothing scored yet: the single-emotion endpoint serves demo data
+      api.getHeatmap(selectedEmotion)
+        .then(setHeatmapData)
+        .catch(error => console.error('Failed to fetch heatmap:', error));
+    }
+  }, [heatmapVectors, selectedEmotion]);
 
   const handleSearch = async () => {
     if (!city) return;
@@ -39,8 +69,7 @@ const Dashboard: React.FC = () => {
     try {
       await api.scrape({ city, category });
       await api.processReviews();
-      const heatmap = await api.getHeatmap(selectedEmotion);
-      setHeatmapData(heatmap);
+      await loadHeatmaps();
     } catch (error) {
       console.error('Error:', error);
     } finally {
@@ -61,14 +90,8 @@ const Dashboard: React.FC = () => {
     }
   };
 
-  const handleEmotionChange = async (emotion: string) => {
+  const handleEmotionChange = (emotion: string) => {
     setSelectedEmotion(emotion);
-    try {
-      const heatmap = await api.getHeatmap(emotion);
-      setHeatmapData(heatmap);
-    } catch (error) {
-      console.error('Error updating heatmap:', error);
-    }
   };
 
   const handleAddToItinerary = () => {
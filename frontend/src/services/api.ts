@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { User, Review, HeatmapResponse } from '../types';
+import type { User, Review, HeatmapResponse, HeatmapVectors, HeatmapTile } from '../types';
 
 // Configure axios to include credentials
 axios.defaults.withCredentials = true;
@@ -47,17 +47,49 @@ const auth = {
   }
 };
 
+export interface Job {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: { [key: string]: number };
+  result: any;
+  error: string | null;
+}
+
+const getJob = async (jobId: string): Promise<Job> => {
+  const response = await api.get(`/jobs/${jobId}`);
+  return response.data;
+};
+
+// Scrape and process run as background jobs; poll until they finish
+const waitForJob = async (jobId: string, intervalMs = 1000): Promise<Job> => {
+  for (;;) {
+    const job = await getJob(jobId);
+    if (job.status === 'succeeded') {
+      return job;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Job failed');
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
+
 const apiService = {
   auth,
 
+  getJob,
+
   scrape: async ({ city, category }: ScrapeRequest) => {
     const response = await api.post('/scrape', { city, category });
-    return response.data;
+    const job = await waitForJob(response.data.job_id);
+    return job.result;
   },
 
   processReviews: async () => {
     const response = await api.post('/process');
-    return response.data;
+    const job = await waitForJob(response.data.job_id);
+    return job.result;
   },
 
   getHeatmap: async (emotion: string): Promise<HeatmapResponse> => {
@@ -67,7 +99,21 @@ const apiService = {
     return response.data;
   },
 
-  getReviews: async (location: string): Promise<{ reviews: Review[] }> => {
+  getHeatmapEmotions: async (emotions: string[]): Promise<HeatmapVectors> => {
+    const response = await api.get('/heatmap', {
+      params: { emotions: emotions.join(',') },
+    });
+    return response.data;
+  },
+
+  getHeatmapTile: async (emotion: string, z: number, x: number, y: number): Promise<HeatmapTile> => {
+    const response = await api.get(`/heatmap/tiles/${z}/${x}/${y}`, {
+      params: { emotion },
+    });
+    return response.data;
+  },
+
+  getReviews: async (location: string): Promise<{ reviews: Review[]; next_cursor: number | null }> => {
     const response = await api.get('/reviews', {
       params: { location },
     });
@@ -62,4 +62,29 @@ export interface HeatmapResponse {
 export interface AuthResponse {
   user: User;
   token: string;
-} 
\ No newline at end of file
+} 
+
+export interface HeatmapVectors {
+  emotions: string[];
+  neighborhoods: {
+    neighborhood: string;
+    geometry: {
+      type: string;
+      coordinates: number[];
+    };
+    review_count: number;
+    scores: (number | null)[];
+  }[];
+}
+
+export interface HeatmapTile {
+  z: number;
+  x: number;
+  y: number;
+  emotion: string;
+  grid: number;
+  cells: number[];
+  weights: number[];
+  review_counts: number[];
+  max_weight: number;
+}
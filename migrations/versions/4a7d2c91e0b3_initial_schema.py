@@ -0,0 +1,119 @@
+"""initial schema
+
+Revision ID: 4a7d2c91e0b3
+Revises: 
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7d2c91e0b3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so tables may already exist
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('user'):
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+    if not _has_table('itinerary'):
+        op.create_table('itinerary',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('hotspots', sa.JSON(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('venue'):
+        op.create_table('venue',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('address', sa.String(length=500), nullable=True),
+            sa.Column('latitude', sa.Float(), nullable=False),
+            sa.Column('longitude', sa.Float(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('neighborhood'):
+        op.create_table('neighborhood',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('city', sa.String(length=200), nullable=False),
+            sa.Column('boundary', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('review'):
+        op.create_table('review',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('venue_id', sa.Integer(), nullable=False),
+            sa.Column('source', sa.String(length=50), nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.Column('reviewer_location', sa.String(length=200), nullable=True),
+            sa.Column('review_date', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('emotion_score'):
+        op.create_table('emotion_score',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('review_id', sa.Integer(), nullable=False),
+            sa.Column('emotion', sa.String(length=50), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['review_id'], ['review.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('emotional_hotspot'):
+        op.create_table('emotional_hotspot',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('neighborhood_id', sa.Integer(), nullable=False),
+            sa.Column('emotion', sa.String(length=50), nullable=False),
+            sa.Column('average_score', sa.Float(), nullable=False),
+            sa.Column('review_count', sa.Integer(), nullable=True),
+            sa.Column('last_updated', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['neighborhood_id'], ['neighborhood.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('neighborhood_venue'):
+        op.create_table('neighborhood_venue',
+            sa.Column('neighborhood_id', sa.Integer(), nullable=False),
+            sa.Column('venue_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['neighborhood_id'], ['neighborhood.id'], ),
+            sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
+            sa.PrimaryKeyConstraint('neighborhood_id', 'venue_id')
+        )
+        op.create_index(op.f('ix_neighborhood_venue_venue_id'), 'neighborhood_venue', ['venue_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_neighborhood_venue_venue_id'), table_name='neighborhood_venue')
+    op.drop_table('neighborhood_venue')
+    op.drop_table('emotional_hotspot')
+    op.drop_table('emotion_score')
+    op.drop_table('review')
+    op.drop_table('neighborhood')
+    op.drop_table('venue')
+    op.drop_table('itinerary')
+    op.drop_table('user')
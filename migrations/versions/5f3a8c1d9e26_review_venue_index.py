@@ -0,0 +1,30 @@
+"""index reviews by venue in id order for the review feed
+
+Revision ID: 5f3a8c1d9e26
+Revises: d82f6b3c1e47
+Create Date: 2026-10-17 20:41:37.582914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3a8c1d9e26'
+down_revision = 'd82f6b3c1e47'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the index may already exist
+    if 'ix_review_venue_id' not in _indexes('review'):
+        op.create_index('ix_review_venue_id', 'review', ['venue_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_review_venue_id', table_name='review')
@@ -0,0 +1,130 @@
+"""add review fingerprints for deduplicating scraped reviews
+
+Revision ID: 6e1a93c5d7f2
+Revises: 2b8f04d6c3e9
+Create Date: 2026-10-17 15:41:52.318406
+
+"""
+import hashlib
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1a93c5d7f2'
+down_revision = '2b8f04d6c3e9'
+branch_labels = None
+depends_on = None
+
+# Parameters per statement, to stay under SQL parameter limits
+CHUNK_SIZE = 500
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _fingerprint(text):
+    """The fingerprint of a review as of this revision: SHA-1 of the case-folded text without punctuation."""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', text)).strip()
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _chunks(values):
+    values = sorted(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def _delete_reviews(bind, review_ids):
+    """Delete reviews along with the rows of every table that references them."""
+    inspector = sa.inspect(bind)
+    referencing = [
+        (table, foreign_key['constrained_columns'][0])
+        for table in inspector.get_table_names()
+        for foreign_key in inspector.get_foreign_keys(table)
+        if foreign_key['referred_table'] == 'review'
+    ]
+    for chunk in _chunks(review_ids):
+        params = {f'id_{i}': review_id for i, review_id in enumerate(chunk)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        for table, column in referencing:
+            bind.execute(sa.text(f'DELETE FROM {table} WHERE {column} IN ({placeholders})'), params)
+        bind.execute(sa.text(f'DELETE FROM review WHERE id IN ({placeholders})'), params)
+
+
+def _rebuild_hotspots(bind, venue_ids):
+    """Recompute the hotspots of the neighborhoods around the given venues from the stored scores."""
+    neighborhood_ids = set()
+    for chunk in _chunks(venue_ids):
+        params = {f'id_{i}': venue_id for i, venue_id in enumerate(chunk)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        neighborhood_ids.update(bind.execute(sa.text(
+            f'SELECT DISTINCT neighborhood_id FROM neighborhood_venue WHERE venue_id IN ({placeholders})'
+        ), params).scalars())
+
+    for chunk in _chunks(neighborhood_ids):
+        params = {f'id_{i}': neighborhood_id for i, neighborhood_id in enumerate(chunk)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        bind.execute(sa.text(f'DELETE FROM emotional_hotspot WHERE neighborhood_id IN ({placeholders})'), params)
+        bind.execute(sa.text(
+            'INSERT INTO emotional_hotspot '
+            '(neighborhood_id, emotion, average_score, score_sum, review_count, last_updated) '
+            'SELECT nv.neighborhood_id, es.emotion, AVG(es.score), SUM(es.score), COUNT(*), CURRENT_TIMESTAMP '
+            'FROM neighborhood_venue nv '
+            'JOIN review r ON r.venue_id = nv.venue_id '
+            'JOIN emotion_score es ON es.review_id = r.id '
+            f'WHERE nv.neighborhood_id IN ({placeholders}) '
+            'GROUP BY nv.neighborhood_id, es.emotion'
+        ), params)
+
+
+def upgrade():
+    if 'fingerprint' not in _columns('review'):
+        with op.batch_alter_table('review', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('fingerprint', sa.String(length=40), nullable=True))
+
+    if 'ix_review_venue_source_fingerprint' not in _indexes('review'):
+        # Fingerprint scraped reviews and merge duplicates into their earliest
+        # copy, so repeated scrapes stop counting twice towards the hotspots
+        bind = op.get_bind()
+        rows = bind.execute(sa.text(
+            "SELECT id, venue_id, source, text FROM review "
+            "WHERE source IN ('tripadvisor', 'reddit') AND fingerprint IS NULL ORDER BY id"
+        ))
+        seen = set()
+        updates = []
+        duplicate_ids = []
+        affected_venue_ids = set()
+        for review_id, venue_id, source, text in rows:
+            key = (venue_id, source, _fingerprint(text))
+            if key in seen:
+                duplicate_ids.append(review_id)
+                affected_venue_ids.add(venue_id)
+            else:
+                seen.add(key)
+                updates.append({'id': review_id, 'fingerprint': key[2]})
+        if updates:
+            bind.execute(sa.text('UPDATE review SET fingerprint = :fingerprint WHERE id = :id'), updates)
+        if duplicate_ids:
+            _delete_reviews(bind, duplicate_ids)
+            _rebuild_hotspots(bind, affected_venue_ids)
+
+        op.create_index('ix_review_venue_source_fingerprint', 'review',
+                        ['venue_id', 'source', 'fingerprint'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_review_venue_source_fingerprint', table_name='review')
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_column('fingerprint')
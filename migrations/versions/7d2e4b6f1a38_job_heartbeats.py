@@ -0,0 +1,32 @@
+"""record a heartbeat on background jobs
+
+Revision ID: 7d2e4b6f1a38
+Revises: 5f3a8c1d9e26
+Create Date: 2026-10-17 22:14:52.107356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e4b6f1a38'
+down_revision = '5f3a8c1d9e26'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # create_app() runs db.create_all(), but that never adds columns to existing tables
+    if 'heartbeat_at' not in _columns('job'):
+        with op.batch_alter_table('job', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,100 @@
+"""keep running score sums on emotional hotspots
+
+Revision ID: 9c3e5f27b8a1
+Revises: 4a7d2c91e0b3
+Create Date: 2026-10-17 11:02:17.554910
+
+"""
+import json
+import math
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5f27b8a1'
+down_revision = '4a7d2c91e0b3'
+branch_labels = None
+depends_on = None
+
+# Venues within this distance of a neighborhood count towards its scores
+NEARBY_RADIUS_KM = 2.0
+EARTH_RADIUS_KM = 6371
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _distance_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(min(a, 1.0))) * EARTH_RADIUS_KM
+
+
+def _backfill_membership(bind):
+    """Fill neighborhood_venue if it is empty, with the app's 2 km rule."""
+    if bind.execute(sa.text('SELECT 1 FROM neighborhood_venue LIMIT 1')).first() is not None:
+        return
+    venues = bind.execute(sa.text('SELECT id, latitude, longitude FROM venue')).all()
+    pairs = []
+    for neighborhood_id, boundary in bind.execute(sa.text('SELECT id, boundary FROM neighborhood')):
+        try:
+            lng, lat = (float(value) for value in json.loads(boundary)['coordinates'][:2])
+        except (TypeError, ValueError, KeyError, IndexError):
+            continue
+        pairs.extend(
+            {'neighborhood_id': neighborhood_id, 'venue_id': venue_id}
+            for venue_id, venue_lat, venue_lng in venues
+            if _distance_km(lat, lng, venue_lat, venue_lng) <= NEARBY_RADIUS_KM
+        )
+    if pairs:
+        bind.execute(
+            sa.text('INSERT INTO neighborhood_venue (neighborhood_id, venue_id) VALUES (:neighborhood_id, :venue_id)'),
+            pairs
+        )
+
+
+def _rebuild_hotspots(bind):
+    """Replace every hotspot, including seeded demo values, with sums of the stored scores."""
+    _backfill_membership(bind)
+    op.execute('DELETE FROM emotional_hotspot')
+    op.execute(
+        'INSERT INTO emotional_hotspot '
+        '(neighborhood_id, emotion, average_score, score_sum, review_count, last_updated) '
+        'SELECT nv.neighborhood_id, es.emotion, AVG(es.score), SUM(es.score), COUNT(*), CURRENT_TIMESTAMP '
+        'FROM neighborhood_venue nv '
+        'JOIN review r ON r.venue_id = nv.venue_id '
+        'JOIN emotion_score es ON es.review_id = r.id '
+        'GROUP BY nv.neighborhood_id, es.emotion'
+    )
+
+
+def upgrade():
+    if 'score_sum' not in _columns('emotional_hotspot'):
+        with op.batch_alter_table('emotional_hotspot', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('score_sum', sa.Float(), server_default='0', nullable=False))
+        bind = op.get_bind()
+        if sa.inspect(bind).has_table('emotion_score'):
+            _rebuild_hotspots(bind)
+        else:
+            op.execute('UPDATE emotional_hotspot SET score_sum = average_score * COALESCE(review_count, 0)')
+
+    if 'ix_emotional_hotspot_neighborhood_emotion' not in _indexes('emotional_hotspot'):
+        # Older code could race and create duplicate rows; keep the newest one
+        op.execute(
+            'DELETE FROM emotional_hotspot WHERE id NOT IN ('
+            'SELECT MAX(id) FROM emotional_hotspot GROUP BY neighborhood_id, emotion)'
+        )
+        op.create_index('ix_emotional_hotspot_neighborhood_emotion', 'emotional_hotspot',
+                        ['neighborhood_id', 'emotion'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_emotional_hotspot_neighborhood_emotion', table_name='emotional_hotspot')
+    with op.batch_alter_table('emotional_hotspot', schema=None) as batch_op:
+        batch_op.drop_column('score_sum')
@@ -0,0 +1,35 @@
+"""record one-time data tasks in a data_state table
+
+Revision ID: a3c9f1e27d54
+Revises: e5b2a8d47c19
+Create Date: 2026-10-19 10:24:51.093117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9f1e27d54'
+down_revision = 'e5b2a8d47c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist
+    if not sa.inspect(op.get_bind()).has_table('data_state'):
+        op.create_table('data_state',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+    # 9c3e5f27b8a1 already backfilled venue membership
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT 1 FROM data_state WHERE name = 'membership_backfilled'")).first() is None:
+        op.execute("INSERT INTO data_state (name, value) VALUES ('membership_backfilled', 1)")
+
+
+def downgrade():
+    op.drop_table('data_state')
@@ -0,0 +1,151 @@
+"""store emotion scores as one float32 vector per review
+
+Revision ID: b4d17e9a2c60
+Revises: 6e1a93c5d7f2
+Create Date: 2026-10-17 17:08:33.671925
+
+"""
+from collections import defaultdict
+import json
+import struct
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d17e9a2c60'
+down_revision = '6e1a93c5d7f2'
+branch_labels = None
+depends_on = None
+
+# Reviews converted per batch
+BATCH_SIZE = 5000
+
+
+def _has_table(name):
+    # create_app() runs db.create_all(), so tables may already exist
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _pack(scores):
+    return struct.pack(f'<{len(scores)}f', *scores)
+
+
+def _unpack(blob):
+    return struct.unpack(f'<{len(blob) // 4}f', blob)
+
+
+def _label_set_id(bind, labels, known):
+    key = json.dumps(labels)
+    if key not in known:
+        label_set_id = bind.execute(
+            sa.text('SELECT id FROM emotion_label_set WHERE labels = :labels'), {'labels': key}
+        ).scalar()
+        if label_set_id is None:
+            bind.execute(
+                sa.text('INSERT INTO emotion_label_set (labels, created_at) VALUES (:labels, CURRENT_TIMESTAMP)'),
+                {'labels': key}
+            )
+            label_set_id = bind.execute(
+                sa.text('SELECT id FROM emotion_label_set WHERE labels = :labels'), {'labels': key}
+            ).scalar()
+        known[key] = label_set_id
+    return known[key]
+
+
+def upgrade():
+    if not _has_table('emotion_label_set'):
+        op.create_table('emotion_label_set',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('labels', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('labels')
+        )
+    if not _has_table('emotion_vector'):
+        op.create_table('emotion_vector',
+            sa.Column('review_id', sa.Integer(), nullable=False),
+            sa.Column('label_set_id', sa.Integer(), nullable=False),
+            sa.Column('scores', sa.LargeBinary(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['label_set_id'], ['emotion_label_set.id'], ),
+            sa.ForeignKeyConstraint(['review_id'], ['review.id'], ),
+            sa.PrimaryKeyConstraint('review_id')
+        )
+
+    if not _has_table('emotion_score'):
+        return
+
+    # Fold each review's label rows into one vector, in sorted label order
+    bind = op.get_bind()
+    label_sets = {}
+    last_id = 0
+    while True:
+        review_ids = bind.execute(sa.text(
+            'SELECT DISTINCT review_id FROM emotion_score WHERE review_id > :last_id '
+            'AND review_id NOT IN (SELECT review_id FROM emotion_vector) '
+            'ORDER BY review_id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).scalars().all()
+        if not review_ids:
+            break
+        last_id = review_ids[-1]
+
+        scores = defaultdict(dict)
+        created = {}
+        rows = bind.execute(sa.text(
+            'SELECT review_id, emotion, score, created_at FROM emotion_score '
+            'WHERE review_id >= :first AND review_id <= :last'
+        ), {'first': review_ids[0], 'last': last_id})
+        for review_id, emotion, score, created_at in rows:
+            scores[review_id][emotion] = score
+            created.setdefault(review_id, created_at)
+
+        vectors = []
+        for review_id in review_ids:
+            labels = sorted(scores[review_id])
+            vectors.append({
+                'review_id': review_id,
+                'label_set_id': _label_set_id(bind, labels, label_sets),
+                'scores': _pack([scores[review_id][label] for label in labels]),
+                'created_at': created[review_id]
+            })
+        bind.execute(sa.text(
+            'INSERT INTO emotion_vector (review_id, label_set_id, scores, created_at) '
+            'VALUES (:review_id, :label_set_id, :scores, :created_at)'
+        ), vectors)
+
+    op.drop_table('emotion_score')
+
+
+def downgrade():
+    op.create_table('emotion_score',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('review_id', sa.Integer(), nullable=False),
+        sa.Column('emotion', sa.String(length=50), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['review_id'], ['review.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    bind = op.get_bind()
+    label_sets = {
+        label_set_id: json.loads(labels)
+        for label_set_id, labels in bind.execute(sa.text('SELECT id, labels FROM emotion_label_set'))
+    }
+    rows = bind.execute(sa.text(
+        'SELECT review_id, label_set_id, scores, created_at FROM emotion_vector ORDER BY review_id'
+    )).all()
+    scores = [
+        {'review_id': review_id, 'emotion': label, 'score': score, 'created_at': created_at}
+        for review_id, label_set_id, blob, created_at in rows
+        for label, score in zip(label_sets[label_set_id], _unpack(blob))
+    ]
+    if scores:
+        bind.execute(sa.text(
+            'INSERT INTO emotion_score (review_id, emotion, score, created_at) '
+            'VALUES (:review_id, :emotion, :score, :created_at)'
+        ), scores)
+
+    op.drop_table('emotion_vector')
+    op.drop_table('emotion_label_set')
@@ -0,0 +1,32 @@
+"""count stored score vectors in data_state
+
+Revision ID: c61f0a8b3d95
+Revises: a3c9f1e27d54
+Create Date: 2026-10-20 09:12:37.504418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61f0a8b3d95'
+down_revision = 'a3c9f1e27d54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() may already have counted the vectors at startup
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT 1 FROM data_state WHERE name = 'vector_count'")).first() is None:
+        op.execute("INSERT INTO data_state (name, value) SELECT 'vector_count', count(*) FROM emotion_vector")
+    if bind.execute(sa.text("SELECT 1 FROM data_state WHERE name = 'vector_last_review_id'")).first() is None:
+        op.execute(
+            "INSERT INTO data_state (name, value) "
+            "SELECT 'vector_last_review_id', coalesce(max(review_id), 0) FROM emotion_vector"
+        )
+
+
+def downgrade():
+    op.execute("DELETE FROM data_state WHERE name IN ('vector_count', 'vector_last_review_id')")
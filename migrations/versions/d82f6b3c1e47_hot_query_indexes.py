@@ -0,0 +1,43 @@
+"""add indexes for the hot heatmap, dedup and venue lookup queries
+
+Revision ID: d82f6b3c1e47
+Revises: b4d17e9a2c60
+Create Date: 2026-10-17 18:24:06.109532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd82f6b3c1e47'
+down_revision = 'b4d17e9a2c60'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_venue_name_address', 'venue', ['name', 'address']),
+    ('ix_review_fingerprint', 'review', ['fingerprint']),
+    ('ix_emotional_hotspot_emotion_covering', 'emotional_hotspot',
+     ['emotion', 'neighborhood_id', 'review_count', 'average_score']),
+    ('ix_emotional_hotspot_last_updated', 'emotional_hotspot', ['last_updated']),
+]
+
+
+def _indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        # create_app() runs db.create_all(), so the index may already exist
+        if name not in _indexes(table):
+            op.create_index(name, table, columns, unique=False)
+    # Refresh the planner statistics so the new indexes are picked up
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,82 @@
+"""keep running emotion score sums per venue
+
+Revision ID: e5b2a8d47c19
+Revises: 7d2e4b6f1a38
+Create Date: 2026-10-18 09:12:40.281733
+
+"""
+from collections import defaultdict
+import json
+import struct
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2a8d47c19'
+down_revision = '7d2e4b6f1a38'
+branch_labels = None
+depends_on = None
+
+# Score vectors read per batch
+BATCH_SIZE = 5000
+
+
+def _unpack(blob):
+    return struct.unpack(f'<{len(blob) // 4}f', blob)
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist
+    if not sa.inspect(op.get_bind()).has_table('venue_emotion'):
+        op.create_table('venue_emotion',
+            sa.Column('venue_id', sa.Integer(), nullable=False),
+            sa.Column('emotion', sa.String(length=50), nullable=False),
+            sa.Column('score_sum', sa.Float(), nullable=False),
+            sa.Column('review_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
+            sa.PrimaryKeyConstraint('venue_id', 'emotion')
+        )
+
+    bind = op.get_bind()
+    if bind.execute(sa.text('SELECT 1 FROM venue_emotion LIMIT 1')).first() is not None:
+        return
+
+    # Sum every stored vector per venue and emotion
+    label_sets = {
+        label_set_id: json.loads(labels)
+        for label_set_id, labels in bind.execute(sa.text('SELECT id, labels FROM emotion_label_set'))
+    }
+    sums = defaultdict(float)
+    counts = defaultdict(int)
+    last_review_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT ev.review_id, r.venue_id, ev.label_set_id, ev.scores '
+            'FROM emotion_vector ev JOIN review r ON r.id = ev.review_id '
+            'WHERE ev.review_id > :after ORDER BY ev.review_id LIMIT :limit'
+        ), {'after': last_review_id, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+        for _, venue_id, label_set_id, blob in rows:
+            for emotion, score in zip(label_sets[label_set_id], _unpack(blob)):
+                sums[(venue_id, emotion)] += score
+                counts[(venue_id, emotion)] += 1
+        last_review_id = rows[-1][0]
+
+    if sums:
+        bind.execute(
+            sa.text(
+                'INSERT INTO venue_emotion (venue_id, emotion, score_sum, review_count) '
+                'VALUES (:venue_id, :emotion, :score_sum, :review_count)'
+            ),
+            [
+                {'venue_id': venue_id, 'emotion': emotion, 'score_sum': score_sum,
+                 'review_count': counts[(venue_id, emotion)]}
+                for (venue_id, emotion), score_sum in sums.items()
+            ]
+        )
+
+
+def downgrade():
+    op.drop_table('venue_emotion')
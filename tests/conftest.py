@@ -1,11 +1,12 @@
 import pytest
 from app import create_app, db
 from app.models.user import User, Itinerary
+from app.services.geo.heatmap_tiles import tiler
+from app.services.recommender import recommender
 
 @pytest.fixture
 def app():
-    app = create_app()
-    app.config.update({
+    app = create_app({
         'TESTING': True,
         'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
     })
@@ -15,6 +16,9 @@ def app():
         yield app
         db.session.remove()
         db.drop_all()
+        # Score vector versions start over in every test database
+        recommender.clear()
+        tiler.clear()
 
 @pytest.fixture
 def client(app):
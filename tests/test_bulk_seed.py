@@ -0,0 +1,68 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models.models import Venue, Review, Neighborhood, NeighborhoodVenue, VenueEmotion, EmotionalHotspot
+from app.services.data_loader import get_sample_data_status
+from app.services.geo.heatmap_generator import generator
+from app.services.synthetic_data import generate_city
+
+def _hotspots():
+    return {
+        (hotspot.neighborhood_id, hotspot.emotion): (hotspot.score_sum, hotspot.review_count)
+        for hotspot in EmotionalHotspot.query
+    }
+
+def _venue_sums():
+    return {(row.venue_id, row.emotion): (row.score_sum, row.review_count) for row in VenueEmotion.query}
+
+def test_sample_data_is_seeded_with_hotspots(app):
+    status = get_sample_data_status()
+
+    assert status['neighborhoods'] == 5
+    assert status['venues'] == 5
+    assert status['emotion_vectors'] == status['reviews']
+    assert status['hotspots'] > 0
+
+def test_in_memory_hotspots_match_a_full_rebuild(app):
+    # Far from the sample data, so the in-memory sums are used
+    generate_city(neighborhoods=5, venues=80, reviews=2000, center=(10.0, 10.0), city='Testopolis')
+    assert Neighborhood.query.filter_by(city='Testopolis').count() == 5
+    seeded = _hotspots()
+
+    generator.refresh_hotspots()
+    rebuilt = _hotspots()
+
+    assert seeded.keys() == rebuilt.keys()
+    for key, (score_sum, review_count) in rebuilt.items():
+        assert seeded[key] == (pytest.approx(score_sum), review_count)
+
+def test_new_neighborhoods_over_scored_venues_match_a_full_rebuild(app):
+    # Around the sample data, so the new neighborhoods take in scored venues
+    sample_venues = [venue.id for venue in Venue.query]
+    generate_city(neighborhoods=5, venues=80, reviews=2000, city='Overlap City')
+    assert NeighborhoodVenue.query.join(Neighborhood).filter(
+        Neighborhood.city == 'Overlap City', NeighborhoodVenue.venue_id.in_(sample_venues)
+    ).count() > 0
+    seeded = _hotspots()
+    venue_sums = _venue_sums()
+
+    generator.rebuild_venue_sums()
+    generator.refresh_hotspots()
+    rebuilt = _hotspots()
+
+    assert _venue_sums() == {key: (pytest.approx(score_sum), count) for key, (score_sum, count) in venue_sums.items()}
+    assert seeded.keys() == rebuilt.keys()
+    for key, (score_sum, review_count) in rebuilt.items():
+        assert seeded[key] == (pytest.approx(score_sum), review_count)
+
+def test_seeded_rows_read_back_like_orm_rows(app):
+    generate_city(neighborhoods=1, venues=2, reviews=3, center=(10.0, 10.0), city='Readback')
+    db.session.add(Review(venue_id=1, source='orm', text='Written by the ORM', review_date=datetime(2024, 5, 1)))
+    db.session.commit()
+
+    stored = dict(db.session.execute(text(
+        "SELECT source, typeof(created_at) || ':' || length(created_at) FROM review WHERE source IN ('orm', 'synthetic')"
+    )).all())
+    assert stored['synthetic'] == stored['orm']
+    assert all(isinstance(review.created_at, datetime) for review in Review.query.filter_by(source='synthetic'))
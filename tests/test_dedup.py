@@ -0,0 +1,69 @@
+from app import db
+from app.models.models import Venue, Review
+from app.services.scraper import dedup
+from app.services.scraper.dedup import MinHasher, filter_new_reviews, fingerprint
+
+def _venue():
+    venue = Venue(name='Dedup Venue', address='1 Test Road', latitude=10.0, longitude=10.0)
+    db.session.add(venue)
+    db.session.commit()
+    return venue
+
+def test_fingerprint_ignores_case_punctuation_and_spacing():
+    assert fingerprint('Great place!  Loved it.') == fingerprint('great place loved it')
+    assert fingerprint('Great place') != fingerprint('Bad place')
+
+def test_filter_new_reviews_drops_stored_and_repeated_reviews(app):
+    venue = _venue()
+    stored = filter_new_reviews([Review(venue_id=venue.id, source='reddit', text='Lovely river walk')])
+    db.session.add_all(stored)
+    db.session.commit()
+
+    reviews = [
+        Review(venue_id=venue.id, source='reddit', text='Lovely river walk!'),
+        Review(venue_id=venue.id, source='reddit', text='Too crowded at noon'),
+        Review(venue_id=venue.id, source='reddit', text='too crowded at noon'),
+        Review(venue_id=venue.id, source='tripadvisor', text='Lovely river walk'),
+    ]
+    new_reviews = filter_new_reviews(reviews)
+
+    assert [(r.source, r.text) for r in new_reviews] == [
+        ('reddit', 'Too crowded at noon'),
+        ('tripadvisor', 'Lovely river walk'),
+    ]
+
+def test_near_duplicate_reposts_are_dropped(app):
+    venue = _venue()
+    text = ('We spent the whole afternoon at the market tasting cheese and bread, '
+            'then walked along the river to watch the sunset from the old bridge')
+    db.session.add_all(filter_new_reviews([Review(venue_id=venue.id, source='reddit', text=text)]))
+    db.session.commit()
+
+    repost = Review(venue_id=venue.id, source='reddit', text=text + ' - highly recommended')
+    different = Review(venue_id=venue.id, source='reddit', text='The museum queue took two hours, skip it on weekends')
+
+    assert filter_new_reviews([repost, different], near_duplicate_threshold=0.8) == [different]
+
+def test_minhash_estimates_similarity():
+    hasher = MinHasher()
+    a = hasher.signature('one two three four five six seven eight nine ten')
+    b = hasher.signature('one two three four five six seven eight nine ten eleven')
+    c = hasher.signature('completely unrelated words about a noisy train station')
+
+    assert MinHasher.similarity(a, b[None, :])[0] > 0.6
+    assert MinHasher.similarity(a, c[None, :])[0] < 0.2
+
+def test_near_duplicates_are_only_looked_for_among_recent_reviews(app, monkeypatch):
+    venue = _venue()
+    text = 'Sunset over the harbour with fish and chips on the sea wall, the gulls were relentless'
+    db.session.add(Review(venue_id=venue.id, source='reddit', text=text))
+    db.session.add_all(
+        Review(venue_id=venue.id, source='reddit', text=f'Unrelated visit number {i} to the pier') for i in range(3)
+    )
+    db.session.commit()
+    repost = Review(venue_id=venue.id, source='reddit', text=text + ' today')
+
+    monkeypatch.setattr(dedup, 'NEAR_DUPLICATE_WINDOW', 3)
+    assert filter_new_reviews([repost], near_duplicate_threshold=0.8) == [repost]
+    monkeypatch.setattr(dedup, 'NEAR_DUPLICATE_WINDOW', 4)
+    assert filter_new_reviews([repost], near_duplicate_threshold=0.8) == []
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from app import db
+from app.models.models import Venue, Review, EmotionVector
+from app.services.sentiment import emotion_analyzer
+from app.services.sentiment.emotion_analyzer import EmotionAnalyzer
+
+# Run in a fresh interpreter, as other tests may have imported anything
+APP_WITHOUT_MODEL = '''
+import sys
+from app import create_app
+from app.services.sentiment import emotion_analyzer
+create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'EMOTION_PRELOAD': False})
+assert not emotion_analyzer.analyzer.is_loaded
+assert not {'torch', 'transformers'} & set(sys.modules), 'model libraries imported'
+'''
+
+class LengthPipeline:
+    """Stands in for the transformers pipeline, scoring texts by their length and recording each call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [
+            [{'label': 'joy', 'score': len(text) / 100}, {'label': 'sadness', 'score': 1 - len(text) / 100}]
+            for text in texts
+        ]
+
+def _stub_analyzer():
+    analyzer = EmotionAnalyzer(model_name='stub-model', cache_path='')
+    analyzer._pipeline = LengthPipeline()
+    return analyzer
+
+def _init_stub_worker(model_name, inference_batch_size, torch_threads):
+    # Spawned workers import this module by name to run it instead of loading the model
+    emotion_analyzer._worker_analyzer = EmotionAnalyzer(model_name, inference_batch_size, cache_path='')
+    emotion_analyzer._worker_analyzer._pipeline = LengthPipeline()
+
+def _add_reviews(texts):
+    venue = Venue(name='Analyzer Venue', address='1 Test Road', latitude=10.0, longitude=10.0)
+    db.session.add(venue)
+    db.session.commit()
+    reviews = [Review(venue_id=venue.id, source='sample', text=text) for text in texts]
+    db.session.add_all(reviews)
+    db.session.commit()
+    return [review.id for review in reviews]
+
+def test_batched_scores_follow_the_input_order():
+    texts = ['A long and rambling review of the park', 'Short', 'Middling review']
+    analyzer = _stub_analyzer()
+
+    review_ids, labels, scores = analyzer.analyze_rows(list(zip([7, 8, 9], texts)))
+
+    # One forward pass over the texts sorted by length, mapped back to their rows
+    assert analyzer._pipeline.calls == [sorted(texts, key=len)]
+    assert review_ids == [7, 8, 9]
+    assert labels == ['joy', 'sadness']
+    assert np.allclose(scores[:, 0], [len(text) / 100 for text in texts])
+
+def test_interrupted_run_resumes_after_the_last_committed_review(app):
+    texts = [f'Review number {i}' for i in range(6)]
+    review_ids = _add_reviews(texts)
+    committed = []
+
+    def interrupt(processed_count, last_review_id, **cache_counts):
+        committed.append(last_review_id)
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        _stub_analyzer().analyze_reviews(batch_size=2, progress=interrupt)
+    assert committed == [review_ids[1]]
+
+    analyzer = _stub_analyzer()
+    assert analyzer.analyze_reviews(batch_size=2, after_id=committed[-1]) == 4
+    assert analyzer._pipeline.calls == [texts[2:4], texts[4:]]
+    assert EmotionVector.query.filter(EmotionVector.review_id.in_(review_ids)).count() == 6
+
+def test_creating_the_app_does_not_load_the_model():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', APP_WITHOUT_MODEL], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_worker_pool_scores_match_the_in_process_path(app, monkeypatch):
+    texts = ['Lovely', 'A long walk along the river', 'Too crowded at noon', 'Calm', 'Green and quiet', 'Noisy']
+    review_ids = _add_reviews(texts)
+    monkeypatch.setattr(emotion_analyzer, '_init_worker', _init_stub_worker)
+
+    assert _stub_analyzer().analyze_reviews(batch_size=2, workers=2) == 6
+
+    in_process_ids, labels, scores = _stub_analyzer().analyze_rows(list(zip(review_ids, texts)))
+    expected = {review_id: dict(zip(labels, row)) for review_id, row in zip(in_process_ids, scores.tolist())}
+    pooled = EmotionVector.query.filter(EmotionVector.review_id.in_(review_ids))
+    assert {vector.review_id: vector.as_dict() for vector in pooled} == expected
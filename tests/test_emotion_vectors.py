@@ -0,0 +1,62 @@
+import json
+import pytest
+from app import db
+from app.models.models import Venue, Review, Neighborhood, EmotionLabelSet, EmotionVector, VenueEmotion, EmotionalHotspot
+from app.services.geo.heatmap_generator import generator
+from app.services.sentiment.score_store import label_set_id, save_vectors
+
+def _reviews(count):
+    neighborhood = Neighborhood(
+        name='Vector Town', city='Test City',
+        boundary=json.dumps({'type': 'Point', 'coordinates': [10.0, 10.0]})
+    )
+    venue = Venue(name='Vector Venue', address='1 Test Road', latitude=10.0, longitude=10.0)
+    db.session.add_all([neighborhood, venue])
+    db.session.commit()
+    reviews = [Review(venue_id=venue.id, source='sample', text=f'Review {i}') for i in range(count)]
+    db.session.add_all(reviews)
+    db.session.commit()
+    return neighborhood, [review.id for review in reviews]
+
+def test_vector_round_trip(app):
+    _, review_ids = _reviews(1)
+    save_vectors(review_ids, ['calm', 'joy'], [[0.25, 0.5]])
+    db.session.commit()
+
+    vector = db.session.get(EmotionVector, review_ids[0])
+    assert len(vector.scores) == 8
+    assert vector.as_dict() == {'calm': 0.25, 'joy': 0.5}
+
+def test_label_sets_are_shared(app):
+    existing = EmotionLabelSet.query.count()
+
+    assert label_set_id(['calm', 'joy']) == label_set_id(['calm', 'joy'])
+    assert label_set_id(['calm', 'joy']) != label_set_id(['joy', 'calm'])
+    assert EmotionLabelSet.query.count() == existing + 2
+
+def test_aggregate_sums_vectors_per_neighborhood_and_emotion(app):
+    neighborhood, review_ids = _reviews(3)
+    save_vectors(review_ids[:2], ['calm', 'joy'], [[0.25, 0.5], [0.75, 0.5]])
+    # A review scored by another model with a different label order
+    save_vectors(review_ids[2:], ['joy', 'sadness'], [[1.0, 0.5]])
+    generator.apply_new_scores(review_ids)
+    db.session.commit()
+
+    expected = {
+        ('calm', 2): pytest.approx(1.0),
+        ('joy', 3): pytest.approx(2.0),
+        ('sadness', 1): pytest.approx(0.5),
+    }
+    venue_id = db.session.get(Review, review_ids[0]).venue_id
+    assert {
+        (row.emotion, row.review_count): row.score_sum for row in VenueEmotion.query.filter_by(venue_id=venue_id)
+    } == expected
+    # The grouped rebuild from the venue sums matches the incremental hotspots
+    assert {
+        (emotion, review_count): score_sum
+        for _, emotion, score_sum, review_count in generator._aggregate_scores([neighborhood.id])
+    } == expected
+    assert {
+        (hotspot.emotion, hotspot.review_count): hotspot.score_sum
+        for hotspot in EmotionalHotspot.query.filter_by(neighborhood_id=neighborhood.id)
+    } == expected
@@ -0,0 +1,148 @@
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models.models import Venue, Neighborhood, EmotionalHotspot
+from app.services.geo.heatmap_generator import refresh_hotspots
+
+def _single_emotion_scores(client, emotion):
+    features = client.get('/api/heatmap', query_string={'emotion': emotion}).get_json()['features']
+    return {feature['properties']['neighborhood']: feature['properties']['score'] for feature in features}
+
+def test_all_emotions_match_the_single_emotion_heatmaps(client):
+    response = client.get('/api/heatmap/all')
+    assert response.status_code == 200
+    payload = response.get_json()
+
+    assert payload['emotions'] == ['anticipation', 'calm', 'excitement', 'joy', 'trust']
+    assert len(payload['neighborhoods']) > 0
+    for k, emotion in enumerate(payload['emotions']):
+        expected = _single_emotion_scores(client, emotion)
+        assert {n['neighborhood']: n['scores'][k] for n in payload['neighborhoods']} == expected
+
+def test_emotions_parameter_selects_columns(client):
+    payload = client.get('/api/heatmap', query_string={'emotions': 'joy,fear,joy'}).get_json()
+
+    assert payload['emotions'] == ['joy', 'fear']
+    assert all(n['scores'][0] is not None and n['scores'][1] is None for n in payload['neighborhoods'])
+    assert client.get('/api/heatmap', query_string={'emotions': ','}).status_code == 400
+
+def test_all_emotions_are_read_in_one_query(client):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.get('/api/heatmap/all')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert sum('emotional_hotspot.average_score' in statement for statement in statements) == 1
+
+def test_all_emotions_revalidate_with_etag(client):
+    etag = client.get('/api/heatmap/all').headers['ETag']
+    response = client.get('/api/heatmap/all', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+def _hotspot_totals():
+    return {
+        (hotspot.neighborhood_id, hotspot.emotion): (round(hotspot.score_sum, 6), hotspot.review_count)
+        for hotspot in EmotionalHotspot.query
+    }
+
+def _rebuilt_totals():
+    refresh_hotspots()
+    return _hotspot_totals()
+
+def test_new_neighborhoods_appear_on_the_heatmap_at_once(client):
+    camden = Neighborhood.query.filter_by(name='Camden').one()
+    db.session.add(Neighborhood(name='Camden Lock', city='London', boundary=camden.boundary))
+    db.session.commit()
+
+    features = client.get('/api/heatmap', query_string={'emotion': 'joy'}).get_json()['features']
+    scores = {feature['properties']['neighborhood']: feature['properties'] for feature in features}
+    assert scores['Camden Lock'] == dict(scores['Camden'], neighborhood='Camden Lock')
+
+    totals = _hotspot_totals()
+    assert totals == _rebuilt_totals()
+
+def test_moving_or_deleting_a_venue_updates_its_hotspots(app):
+    venue = Venue.query.filter_by(name='Camden Market').one()
+    venue.latitude, venue.longitude = 51.5081, -0.0759
+    db.session.commit()
+    assert _hotspot_totals() == _rebuilt_totals()
+
+    neighborhood = Neighborhood.query.filter_by(name='Camden').one()
+    db.session.delete(neighborhood)
+    db.session.commit()
+    assert EmotionalHotspot.query.filter_by(neighborhood_id=neighborhood.id).count() == 0
+
+def test_venue_moved_in_another_session_refreshes_hotspots_there(app):
+    with Session(db.engine) as session:
+        venue = session.query(Venue).filter_by(name='Camden Market').one()
+        venue.latitude, venue.longitude = 51.5081, -0.0759
+        session.commit()
+
+    # Nothing was left pending in the app's own session
+    assert not (db.session.new or db.session.dirty or db.session.deleted)
+    assert _hotspot_totals() == _rebuilt_totals()
+
+def test_rebuild_hotspots_command(app, runner):
+    EmotionalHotspot.query.delete()
+    db.session.commit()
+
+    result = runner.invoke(args=['rebuild-hotspots'])
+    assert result.exit_code == 0
+    assert EmotionalHotspot.query.filter(EmotionalHotspot.review_count > 0).count() > 0
+    assert 'hotspots' in result.output
+
+def _hotspot_reads(client, **params):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/heatmap', query_string=params)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, sum('emotional_hotspot.average_score' in statement for statement in statements)
+
+def test_heatmap_is_cached_until_the_hotspots_change(client):
+    first, reads = _hotspot_reads(client, emotion='calm')
+    assert reads == 1
+    second, reads = _hotspot_reads(client, emotion='calm')
+    assert reads == 0
+    assert second.data == first.data
+
+    hotspot = EmotionalHotspot.query.filter_by(emotion='calm').first()
+    hotspot.score_sum += hotspot.review_count * 0.01
+    hotspot.average_score = hotspot.score_sum / hotspot.review_count
+    hotspot.last_updated = datetime.utcnow()
+    db.session.commit()
+
+    third, reads = _hotspot_reads(client, emotion='calm')
+    assert reads == 1
+    assert third.headers['ETag'] != first.headers['ETag']
+
+def test_heatmap_revalidates_with_etag(client):
+    response = client.get('/api/heatmap', query_string={'emotion': 'joy'})
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get('/api/heatmap', query_string={'emotion': 'joy'}, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    other = client.get('/api/heatmap', query_string={'emotion': 'calm'}, headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+def test_demo_fallback_is_not_cached(client):
+    EmotionalHotspot.query.delete()
+    db.session.commit()
+
+    _, reads = _hotspot_reads(client, emotion='joy')
+    assert reads == 1
+    _, reads = _hotspot_reads(client, emotion='joy')
+    assert reads == 1
@@ -0,0 +1,65 @@
+import math
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models.models import EmotionVector
+from app.services.geo.heatmap_tiles import GRID_SIZE, tiler
+from app.services.synthetic_data import generate_city
+
+def _tile_of(lat, lng, zoom):
+    """Slippy map tile and cell of a point, from the usual tile formula."""
+    n = 2 ** zoom
+    x = (lng + 180) / 360 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    cell = int((y - int(y)) * GRID_SIZE) * GRID_SIZE + int((x - int(x)) * GRID_SIZE)
+    return int(x), int(y), cell
+
+def test_world_tile_holds_every_score(app):
+    generate_city(neighborhoods=3, venues=100, reviews=1000, center=(10.0, 10.0), city='Testopolis')
+    tile = tiler.generate('joy', 0, 0, 0)
+    expected = sum(vector.as_dict()['joy'] for vector in EmotionVector.query)
+
+    assert sum(tile['weights']) == pytest.approx(expected, rel=1e-5)
+    assert sum(tile['review_counts']) == EmotionVector.query.count()
+
+def test_child_tiles_split_their_parent(app):
+    generate_city(neighborhoods=4, venues=300, reviews=3000, center=(10.0, 10.0), city='Testopolis')
+    zoom = 10
+    x, y, _ = _tile_of(10.0, 10.0, zoom)
+    parent = tiler.generate('joy', zoom, x, y)
+    children = [tiler.generate('joy', zoom + 1, 2 * x + dx, 2 * y + dy) for dx in (0, 1) for dy in (0, 1)]
+
+    assert len(parent['cells']) <= GRID_SIZE ** 2
+    assert all(0 <= cell < GRID_SIZE ** 2 for cell in parent['cells'])
+    assert sum(sum(child['weights']) for child in children) == pytest.approx(sum(parent['weights']), rel=1e-4)
+    assert sum(sum(child['review_counts']) for child in children) == sum(parent['review_counts'])
+
+def test_cached_tiles_only_read_the_vector_version(app):
+    generate_city(neighborhoods=3, venues=100, reviews=1000, center=(10.0, 10.0), city='Testopolis')
+    entry = tiler.render('joy', 0, 0, 0)
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert tiler.render('joy', 0, 0, 0) is entry
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert statements and all('FROM data_state' in statement for statement in statements)
+
+def test_venue_lands_in_its_tile_and_cell(client):
+    # The British Museum from the sample data
+    x, y, cell = _tile_of(51.5194, -0.1270, 14)
+    tile = client.get(f'/api/heatmap/tiles/14/{x}/{y}', query_string={'emotion': 'calm'}).get_json()
+    assert cell in tile['cells']
+    assert client.get(f'/api/heatmap/tiles/14/{x + 1}/{y}', query_string={'emotion': 'calm'}).get_json()['cells'] == []
+
+def test_tile_errors_and_revalidation(client):
+    assert client.get('/api/heatmap/tiles/2/4/0').status_code == 404
+    assert client.get('/api/heatmap/tiles/30/0/0').status_code == 404
+
+    response = client.get('/api/heatmap/tiles/0/0/0')
+    assert response.status_code == 200
+    cached = client.get('/api/heatmap/tiles/0/0/0', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
@@ -0,0 +1,58 @@
+from app import db
+from app.models.models import Venue, Review, EmotionVector
+from app.services.sentiment.emotion_analyzer import EmotionAnalyzer
+from app.services.sentiment.inference_cache import InferenceCache, text_key
+
+class StubPipeline:
+    """Stands in for the transformers pipeline and records the texts it scores."""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return [[{'label': 'joy', 'score': 0.75}, {'label': 'sadness', 'score': 0.25}] for _ in texts]
+
+def _stub_analyzer(cache_path):
+    analyzer = EmotionAnalyzer(model_name='stub-model', cache_path=str(cache_path))
+    analyzer._pipeline = StubPipeline()
+    return analyzer
+
+def _add_reviews(texts):
+    venue = Venue(name='Cache Venue', address='1 Test Road', latitude=10.0, longitude=10.0)
+    db.session.add(venue)
+    db.session.commit()
+    db.session.add_all(Review(venue_id=venue.id, source='sample', text=text) for text in texts)
+    db.session.commit()
+
+def test_cache_entries_are_scoped_to_the_model(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    InferenceCache('model-a', path).put_many({'abc': {'joy': 0.5}})
+
+    assert InferenceCache('model-a', path).get_many(['abc', 'missing']) == {'abc': {'joy': 0.5}}
+    assert InferenceCache('model-b', path).get_many(['abc']) == {}
+
+def test_text_key_ignores_case_and_punctuation():
+    assert text_key('Loved it!') == text_key('loved  it')
+
+def test_repeated_texts_are_scored_once(app, tmp_path):
+    _add_reviews(['Loved it!', 'loved it', 'Too crowded', 'Loved it'])
+    analyzer = _stub_analyzer(tmp_path / 'cache.sqlite3')
+
+    assert analyzer.analyze_reviews() == 4
+    assert analyzer._pipeline.texts == ['Loved it!', 'Too crowded']
+    assert EmotionVector.query.join(Review).filter(Review.venue.has(name='Cache Venue')).count() == 4
+    assert analyzer.cache_stats()['hits'] == 2
+
+def test_cache_persists_across_runs(app, tmp_path):
+    _add_reviews(['Loved it!', 'Too crowded'])
+    _stub_analyzer(tmp_path / 'cache.sqlite3').analyze_reviews()
+
+    _add_reviews(['Too crowded.', 'Quiet and green'])
+    analyzer = _stub_analyzer(tmp_path / 'cache.sqlite3')
+    analyzer.analyze_reviews()
+
+    assert analyzer._pipeline.texts == ['Quiet and green']
+    assert analyzer.cache_stats() == {'enabled': True, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    vector = EmotionVector.query.join(Review).filter(Review.text == 'Too crowded.').one()
+    assert vector.as_dict() == {'joy': 0.75, 'sadness': 0.25}
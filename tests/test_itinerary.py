@@ -0,0 +1,87 @@
+import itertools
+import random
+import pytest
+from app.services.geo import route_optimizer
+from app.services.geo.route_optimizer import optimize_route, path_length
+
+def _random_stops(count, seed):
+    rng = random.Random(seed)
+    return [rng.gauss(51.5074, 0.03) for _ in range(count)], [rng.gauss(-0.1278, 0.05) for _ in range(count)]
+
+@pytest.mark.parametrize('fixed_start', [False, True])
+def test_small_routes_match_brute_force(fixed_start):
+    for seed in range(10):
+        lats, lngs = _random_stops(7, seed)
+        order, distances = optimize_route(lats, lngs, fixed_start=fixed_start, time_budget=1.0)
+
+        assert sorted(order) == list(range(7))
+        if fixed_start:
+            assert order[0] == 0
+        best = min(
+            path_length(list(permutation), distances)
+            for permutation in itertools.permutations(range(7))
+            if not fixed_start or permutation[0] == 0
+        )
+        assert path_length(order, distances) == pytest.approx(best)
+
+def test_large_routes_visit_every_stop_once():
+    lats, lngs = _random_stops(200, 0)
+    order, _ = optimize_route(lats, lngs)
+    assert sorted(order) == list(range(200))
+
+def test_routes_do_not_depend_on_timing():
+    lats, lngs = _random_stops(40, 1)
+    routes = {tuple(optimize_route(lats, lngs)[0]) for _ in range(3)}
+    assert len(routes) == 1
+
+def test_starts_stop_once_they_bring_no_gain(monkeypatch):
+    # Stops on a line: every start converges to the same path
+    starts = []
+    nearest_neighbor = route_optimizer._nearest_neighbor
+
+    def counted(distances, prefix):
+        starts.append(prefix)
+        return nearest_neighbor(distances, prefix)
+
+    monkeypatch.setattr(route_optimizer, '_nearest_neighbor', counted)
+    order, _ = optimize_route([51.5] * 30, [-0.1 + 0.001 * i for i in range(30)], time_budget=10)
+
+    assert order in (list(range(30)), list(range(29, -1, -1)))
+    assert len(starts) == 1 + route_optimizer.STALL_STARTS
+
+def test_itinerary_orders_hotspots(client):
+    # A detour along a line of stops
+    hotspots = [{'name': f'Stop {i}', 'location': {'lat': 51.5, 'lng': -0.1 + 0.01 * i}} for i in (0, 3, 1, 4, 2)]
+    response = client.post('/api/itinerary', json={'hotspots': hotspots})
+    assert response.status_code == 200
+    itinerary = response.get_json()
+
+    names = [spot['name'] for spot in itinerary['spots']]
+    assert names in (['Stop 0', 'Stop 1', 'Stop 2', 'Stop 3', 'Stop 4'], ['Stop 4', 'Stop 3', 'Stop 2', 'Stop 1', 'Stop 0'])
+    assert [spot['order'] for spot in itinerary['spots']] == [1, 2, 3, 4, 5]
+    assert len(itinerary['route']) == 4
+    assert sum(leg['distance_km'] for leg in itinerary['route']) == pytest.approx(itinerary['total_distance_km'], abs=1e-2)
+    assert itinerary['estimated_minutes'] > itinerary['travel_minutes']
+
+def test_itinerary_from_a_start_point(client):
+    hotspots = [{'name': name} for name in ('Camden', 'Shoreditch', 'Westminster')]
+    response = client.post('/api/itinerary', json={
+        'hotspots': hotspots, 'start': {'name': 'Hotel', 'lat': 51.5010, 'lng': -0.1420}
+    })
+    assert response.status_code == 200
+    itinerary = response.get_json()
+
+    assert itinerary['route'][0]['from'] == 'Hotel'
+    assert itinerary['spots'][0]['name'] == 'Westminster'
+    assert len(itinerary['route']) == 3
+
+def test_itinerary_rejects_unknown_hotspots(client):
+    response = client.post('/api/itinerary', json={'hotspots': [{'name': 'Camden'}, {'name': 'Atlantis'}]})
+    assert response.status_code == 400
+    assert 'Atlantis' in response.get_json()['error']
+
+def test_itinerary_rejects_too_many_hotspots(client):
+    hotspots = [{'name': f'Stop {i}', 'location': {'lat': 51.5, 'lng': -0.1 + 0.001 * i}} for i in range(51)]
+    response = client.post('/api/itinerary', json={'hotspots': hotspots})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'At most 50 hotspots per itinerary'
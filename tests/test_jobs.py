@@ -0,0 +1,82 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.models import Job
+from app.services import jobs
+
+def _wait(job_id, statuses=('succeeded', 'failed'), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = jobs.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'Job {job_id} did not reach {statuses}')
+
+def _count(progress, n):
+    for i in range(1, n + 1):
+        progress.update(done=i)
+    return {'total': n}
+
+def _fail(progress):
+    progress.update(step='starting')
+    raise RuntimeError('boom')
+
+def test_job_reports_progress_and_result(client):
+    job = jobs.submit('scrape', _count, n=3)
+    assert job.status == 'queued'
+    assert job.params == {'n': 3}
+
+    job = _wait(job.id)
+    assert job.status == 'succeeded'
+    assert job.progress == {'done': 3}
+    assert job.result == {'total': 3}
+
+    payload = client.get(f'/api/jobs/{job.id}').get_json()
+    assert payload['status'] == 'succeeded'
+    assert payload['duration_seconds'] >= 0
+    assert client.get('/api/jobs/missing').status_code == 404
+
+def test_failed_job_keeps_its_error_and_progress(app):
+    job = _wait(jobs.submit('scrape', _fail).id)
+    assert job.status == 'failed'
+    assert job.error == 'boom'
+    assert job.progress == {'step': 'starting'}
+    assert job.finished_at is not None
+
+def test_limit_counts_active_jobs_in_the_table(client):
+    release = threading.Event()
+    running = jobs.submit('process', lambda progress: release.wait(5))
+    try:
+        _wait(running.id, statuses=('running',))
+        with pytest.raises(jobs.JobLimitReached) as error:
+            jobs.submit('process', lambda progress: None)
+        assert error.value.active_ids == [running.id]
+
+        response = client.post('/api/process')
+        assert response.status_code == 429
+        assert response.get_json()['active_jobs'] == [running.id]
+    finally:
+        release.set()
+    assert _wait(running.id).status == 'succeeded'
+    assert _wait(jobs.submit('process', lambda progress: None).id).status == 'succeeded'
+
+def test_jobs_of_exited_workers_are_failed(app):
+    stale = datetime.utcnow() - timedelta(seconds=jobs.STALE_SECONDS + 1)
+    db.session.add_all([
+        Job(id='orphan', kind='process', status='running', heartbeat_at=stale),
+        Job(id='legacy', kind='scrape', status='queued'),
+        Job(id='alive', kind='scrape', status='running', heartbeat_at=datetime.utcnow())
+    ])
+    db.session.commit()
+
+    # Looking up a stale job fails it, along with any other orphans
+    assert jobs.get('orphan').status == 'failed'
+    assert jobs.fail_orphaned() == 0
+    db.session.expire_all()
+    assert {job.id: job.status for job in Job.query} == {'orphan': 'failed', 'legacy': 'failed', 'alive': 'running'}
+    # The freed slot can be taken again
+    assert _wait(jobs.submit('process', lambda progress: None).id).status == 'succeeded'
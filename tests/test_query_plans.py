@@ -0,0 +1,98 @@
+import re
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event, select
+from app import db
+from app.models.models import Review
+from app.services import review_feed
+from app.services.geo.heatmap_generator import generator
+from app.services.recommender import _vector_totals, recommender
+from app.services.scraper.dedup import _drop_near_duplicates, _existing_fingerprints
+from app.services.scraper.tripadvisor import TripAdvisorScraper
+from app.services.sentiment.review_stream import iter_unprocessed_reviews
+
+VENUE_PAGE = '''
+<h1 class="title">Stub Venue</h1>
+<address>1 Stub Street</address>
+<script>{"latitude": "51.51", "longitude": "-0.12"}</script>
+<div class="review-container"><p class="review-text">Lovely place</p></div>
+'''
+
+# "SCAN t" without "USING ... INDEX" reads every row of t
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!TABLE\b)(\w+)\b(?! USING)')
+
+@contextmanager
+def _captured_selects():
+    """Record the SELECT statements and parameters sent to the database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def _full_scans(run, marker):
+    """Run a hot path and return the tables its query containing marker scans in full."""
+    with _captured_selects() as statements:
+        run()
+    matching = [(sql, params) for sql, params in statements if marker in sql]
+    assert matching, f'no query containing {marker!r} was run'
+
+    scans = set()
+    for sql, params in matching:
+        plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', params).all()
+        for row in plan:
+            match = _FULL_SCAN.match(row[-1])
+            if match:
+                scans.add(match.group(1))
+    return scans
+
+def _some_review_ids():
+    return db.session.scalars(select(Review.id).limit(3)).all()
+
+def _new_review():
+    return Review(venue_id=1, source='reddit', text='A walk along the river at sunset')
+
+HOT_QUERIES = [
+    ('incremental venue sums',
+     lambda: generator._venue_sums(_some_review_ids()), 'emotion_vector.scores'),
+    ('unprocessed review anti-join',
+     lambda: next(iter_unprocessed_reviews(page_size=10), None), 'EXISTS'),
+    ('heatmap hotspot read',
+     lambda: generator._load_hotspots('joy'), 'emotional_hotspot.average_score'),
+    ('multi-emotion heatmap read',
+     lambda: generator._load_all_hotspots(['joy', 'calm']), 'emotional_hotspot.emotion IN'),
+    ('heatmap data version',
+     generator.data_version, 'max(emotional_hotspot.last_updated)'),
+    ('score vector version',
+     recommender.vector_version, 'data_state.name IN'),
+    ('vectors added since a venue matrix',
+     lambda: _vector_totals(10, 20), 'emotion_vector.scores'),
+    ('existing fingerprint lookup',
+     lambda: _existing_fingerprints([(1, 'reddit', 'f' * 40)]), 'review.fingerprint IN'),
+    ('near-duplicate candidates',
+     lambda: _drop_near_duplicates([_new_review()], 0.8), 'SELECT review.text'),
+    ('venue lookup by name and address',
+     lambda: TripAdvisorScraper()._scrape_venue(VENUE_PAGE), 'venue.address ='),
+    ('review page by venue',
+     lambda: review_feed.find_reviews(venue_id=1, cursor=10**6), 'ORDER BY review.id DESC'),
+    ('review page by neighborhood',
+     lambda: review_feed.find_reviews(neighborhood_id=1, cursor=10**6), 'ORDER BY review.id DESC'),
+    ('review page scores',
+     lambda: review_feed.find_reviews(venue_id=1), 'emotion_vector.scores'),
+]
+
+@pytest.mark.parametrize('run, marker', [case[1:] for case in HOT_QUERIES], ids=[case[0] for case in HOT_QUERIES])
+def test_hot_query_uses_indexes(app, run, marker):
+    assert _full_scans(run, marker) == set()
+
+def test_full_hotspot_rebuild_only_scans_membership(app):
+    # A full rebuild reads every membership row once by design; venue sums
+    # must still be reached through their primary key
+    assert _full_scans(generator._aggregate_scores, 'sum(venue_emotion.score_sum)') <= {'neighborhood_venue'}
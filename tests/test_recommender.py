@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+from app import db
+from sqlalchemy import func
+from app.models.models import Venue, Review, EmotionVector
+from app.services.geo.distance import haversine_distance
+from app.services.geo.heatmap_generator import apply_new_scores
+from app.services.recommender import VenueEmotions, recommender
+from app.services.sentiment.score_store import save_vectors
+from app.services.synthetic_data import generate_city
+
+START = (10.0, 10.0)
+
+def _testopolis():
+    generate_city(neighborhoods=3, venues=60, reviews=1500, center=START, city='Testopolis')
+
+def _score_review(venue_id, labels, scores):
+    review = Review(venue_id=venue_id, source='reddit', text='Calm and lovely')
+    db.session.add(review)
+    db.session.flush()
+    save_vectors([review.id], labels, [scores])
+    apply_new_scores([review.id])
+    db.session.commit()
+
+def _brute_force(emotions, radius_km):
+    """Score every venue from its stored vectors, without the matrix or the spatial index."""
+    scored = {}
+    for venue in Venue.query.filter(Venue.address.like('%Testopolis')):
+        distance = haversine_distance(START[0], START[1], venue.latitude, venue.longitude)
+        vectors = [review.emotion_vector.as_dict() for review in venue.reviews if review.emotion_vector]
+        if distance > radius_km or not vectors:
+            continue
+        labels = sorted(vectors[0])
+        means = np.mean([[vector[label] for label in labels] for vector in vectors], axis=0)
+        target = np.array([emotions.get(label, 0.0) for label in labels])
+        similarity = means @ target / np.linalg.norm(means) / np.linalg.norm(target)
+        scored[venue.id] = 0.7 * similarity + 0.3 * (1 - distance / radius_km)
+    return scored
+
+def test_top_k_matches_brute_force(app):
+    _testopolis()
+    emotions = {'joy': 0.6, 'surprise': 0.4}
+
+    venues = recommender.recommend(emotions, *START, radius_km=3.0, k=5)
+    expected = _brute_force(emotions, 3.0)
+
+    assert len(venues) == 5
+    assert [venue['venue_id'] for venue in venues] == sorted(expected, key=expected.get, reverse=True)[:5]
+    for venue in venues:
+        assert venue['score'] == pytest.approx(expected[venue['venue_id']], abs=1e-5)
+        assert venue['distance_km'] <= 3.0
+
+def test_matrix_is_rebuilt_when_scores_change(app):
+    _testopolis()
+    before = recommender.venue_emotions()
+    assert recommender.venue_emotions() is before
+
+    venue = Venue.query.filter(Venue.address.like('%Testopolis')).first()
+    _score_review(venue.id, ['joy', 'calm'], [0.1, 0.9])
+
+    after = recommender.venue_emotions()
+    assert after is not before
+    assert 'calm' in after.labels
+
+def test_venues_outside_every_neighborhood_are_recommended_once_scored(app):
+    # Reddit venues are not geocoded and sit at (0, 0), far from any neighborhood
+    recommender.venue_emotions()
+    venue = Venue(name='Somewhere General', address='Somewhere', latitude=0.0, longitude=0.0, category='general')
+    db.session.add(venue)
+    db.session.commit()
+    _score_review(venue.id, ['joy', 'calm'], [0.2, 0.8])
+
+    venues = recommender.recommend({'calm': 1.0}, 0.0, 0.0, radius_km=1.0)
+    assert [found['venue_id'] for found in venues] == [venue.id]
+
+def test_new_scores_are_added_to_the_previous_matrix(app):
+    _testopolis()
+    before = recommender.venue_emotions()
+    venues = Venue.query.filter(Venue.address.like('%Testopolis')).limit(2).all()
+    _score_review(venues[0].id, ['joy', 'calm'], [0.1, 0.9])
+    _score_review(venues[1].id, ['joy', 'surprise'], [0.5, 0.5])
+
+    after = recommender.venue_emotions()
+    rebuilt = VenueEmotions.empty().updated(after.version)
+    assert after.version != before.version
+    assert after.labels == rebuilt.labels
+    assert np.array_equal(after.venue_ids, rebuilt.venue_ids)
+    assert np.allclose(after.sums, rebuilt.sums)
+    assert np.array_equal(after.counts, rebuilt.counts)
+    assert np.allclose(after.means, rebuilt.means)
+
+def test_vector_version_is_kept_by_the_writers(app):
+    _testopolis()
+    stored = (db.session.query(func.max(EmotionVector.review_id)).scalar(), EmotionVector.query.count())
+    assert recommender.vector_version() == stored
+
+    venue = Venue.query.filter(Venue.address.like('%Testopolis')).first()
+    review = Review(venue_id=venue.id, source='reddit', text='Rolled back')
+    db.session.add(review)
+    db.session.flush()
+    save_vectors([review.id], ['joy'], [[0.5]])
+    db.session.rollback()
+    assert recommender.vector_version() == stored
+
+    _score_review(venue.id, ['joy', 'calm'], [0.1, 0.9])
+    assert recommender.vector_version() == (stored[0] + 1, stored[1] + 1)
+
+def test_recommendations_endpoint(client):
+    response = client.get('/api/recommendations', query_string={
+        'emotions': 'calm:0.6,joy:0.4', 'lat': 51.5074, 'lng': -0.1278, 'radius_km': 5, 'k': 3
+    })
+    assert response.status_code == 200
+    venues = response.get_json()['venues']
+    assert 0 < len(venues) <= 3
+    assert [venue['score'] for venue in venues] == sorted((venue['score'] for venue in venues), reverse=True)
+
+    assert client.get('/api/recommendations', query_string={'emotions': 'calm:0.6'}).status_code == 400
+    assert client.get('/api/recommendations', query_string={
+        'emotions': 'dread:1', 'lat': 51.5074, 'lng': -0.1278
+    }).status_code == 400
+
+def test_recommended_itinerary_starts_at_the_start_point(client):
+    _testopolis()
+    response = client.post('/api/itinerary', json={
+        'start': {'lat': START[0], 'lng': START[1]},
+        'recommend': {'emotions': {'joy': 1.0}, 'radius_km': 3, 'k': 6}
+    })
+    assert response.status_code == 200
+    itinerary = response.get_json()
+
+    assert len(itinerary['spots']) == 6
+    assert itinerary['route'][0]['from'] == 'Start'
+    assert {spot['venue_id'] for spot in itinerary['spots']} == {
+        venue['venue_id'] for venue in recommender.recommend({'joy': 1.0}, *START, radius_km=3, k=6)
+    }
@@ -0,0 +1,96 @@
+import time
+from types import SimpleNamespace
+from app import db
+from app.models.models import Venue, Review
+from app.services.geo.spatial_index import get_venue_index
+from app.services.scraper import reddit
+from app.services.scraper.page_cache import PageCache
+
+SEARCH_DELAY = 0.2
+
+POSTS = {
+    'london': [
+        ('Sunday at Hyde Park', 'We rented deckchairs by the Serpentine and stayed all day', 1690000000),
+        ('Borough Market food', 'So many stalls, the bao at Borough Market were the best', 1690000100),
+    ],
+    'travel': [
+        ('London tips', 'Hyde Park is huge, bring comfortable shoes for the walk', 1690000200),
+        ('Rainy day', 'Museums everywhere and nothing else worth mentioning', 1690000300),
+    ],
+    'TravelTips': [
+        ('Quiet spots', 'Regent Park early in the morning is wonderfully calm', 1690000400),
+    ],
+}
+
+class FakeReddit:
+    """Stands in for a PRAW client; every search takes SEARCH_DELAY seconds."""
+
+    def __init__(self, clients):
+        clients.append(self)
+
+    def subreddit(self, name):
+        def search(query, limit):
+            time.sleep(SEARCH_DELAY)
+            return [SimpleNamespace(title=t, selftext=text, created_utc=c) for t, text, c in POSTS.get(name, [])]
+        return SimpleNamespace(search=search)
+
+def _stub_reddit(monkeypatch, tmp_path):
+    clients = []
+    monkeypatch.setattr(reddit, 'init_reddit_client', lambda: FakeReddit(clients))
+    monkeypatch.setattr(reddit, 'search_cache', PageCache(str(tmp_path), ttl=0))
+    return clients
+
+def test_subreddits_are_searched_concurrently_with_own_clients(app, monkeypatch, tmp_path):
+    clients = _stub_reddit(monkeypatch, tmp_path)
+
+    start = time.perf_counter()
+    reviews = reddit.scrape('London')
+    elapsed = time.perf_counter() - start
+
+    assert len(reviews) == 5
+    assert len({id(client) for client in clients}) == 3
+    # Searching one after another would take 3 * SEARCH_DELAY
+    assert elapsed < 2 * SEARCH_DELAY
+
+def test_new_venues_are_inserted_once_and_indexed_after_commit(app, monkeypatch, tmp_path):
+    _stub_reddit(monkeypatch, tmp_path)
+    db.session.add(Venue(name='Regent Park', address='Earlier', latitude=51.52, longitude=-0.15))
+    db.session.commit()
+    existing = Venue.query.filter_by(name='Regent Park').one()
+
+    reddit.scrape('London')
+
+    venues = {venue.name: venue for venue in Venue.query.filter(Venue.address.like('%London'))}
+    assert set(venues) == {'Hyde Park', 'Borough Market', 'London General'}
+    reviews = Review.query.filter_by(source='reddit').all()
+    by_venue = {}
+    for review in reviews:
+        by_venue.setdefault(review.venue_id, []).append(review.text)
+    assert len(by_venue[venues['Hyde Park'].id]) == 2
+    assert len(by_venue[existing.id]) == 1
+    assert venues['Hyde Park'].id in get_venue_index().query_radius(0.0, 0.0, 0.1)
+
+def test_new_venues_are_committed_when_every_post_is_a_duplicate(app, monkeypatch, tmp_path):
+    _stub_reddit(monkeypatch, tmp_path)
+    monkeypatch.setattr(reddit, 'filter_new_reviews', lambda reviews, **kwargs: [])
+
+    assert reddit.scrape('London') == []
+    db.session.rollback()
+
+    names = {venue.name for venue in Venue.query.filter(Venue.address.like('%London'))}
+    assert names == {'Hyde Park', 'Borough Market', 'London General', 'Regent Park'}
+    assert len(get_venue_index().query_radius(0.0, 0.0, 0.1)) == len(names)
+
+def test_posts_are_only_marked_seen_after_their_reviews_are_committed(app, monkeypatch, tmp_path):
+    _stub_reddit(monkeypatch, tmp_path)
+    filter_new_reviews = reddit.filter_new_reviews
+
+    def fail(reviews, **kwargs):
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(reddit, 'filter_new_reviews', fail)
+    assert reddit.scrape('London') == []
+
+    # The failed run left the posts unseen, so the next one saves them
+    monkeypatch.setattr(reddit, 'filter_new_reviews', filter_new_reviews)
+    assert len(reddit.scrape('London')) == 5
+    assert reddit.scrape('London') == []
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models.models import Review, Venue, Neighborhood, NeighborhoodVenue
+from app.services import review_feed
+from app.services.synthetic_data import generate_city
+
+def _testopolis(reviews=300):
+    """Seed a one-neighborhood city away from the sample data and return its id."""
+    generate_city(neighborhoods=1, venues=20, reviews=reviews, center=(10.0, 10.0), city='Testopolis')
+    return Neighborhood.query.filter_by(city='Testopolis').one().id
+
+def _neighborhood_review_ids(neighborhood_id):
+    venue_ids = [
+        venue_id for (venue_id,) in db.session.query(NeighborhoodVenue.venue_id).filter_by(neighborhood_id=neighborhood_id)
+    ]
+    return {review.id for review in Review.query.filter(Review.venue_id.in_(venue_ids))}
+
+def _all_pages(client, **params):
+    ids = []
+    cursor = None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        page = client.get('/api/reviews', query_string=query).get_json()
+        ids.extend(review['id'] for review in page['reviews'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+def test_reviews_come_from_the_neighborhood(client):
+    response = client.get('/api/reviews', query_string={'location': 'Camden'})
+    assert response.status_code == 200
+    reviews = response.get_json()['reviews']
+
+    camden = Neighborhood.query.filter_by(name='Camden').one()
+    assert reviews
+    assert {review['id'] for review in reviews} <= _neighborhood_review_ids(camden.id)
+    assert [review['id'] for review in reviews] == sorted((review['id'] for review in reviews), reverse=True)
+    assert all(review['emotion_scores'] for review in reviews)
+
+def test_location_errors(client):
+    assert client.get('/api/reviews').status_code == 400
+    assert client.get('/api/reviews', query_string={'location': 'Atlantis'}).status_code == 404
+    assert client.get('/api/reviews', query_string={'location': 'Camden', 'cursor': 'x'}).status_code == 400
+
+def test_location_by_venue_and_point(client):
+    venue = Venue.query.filter_by(name='Camden Market').one()
+    by_name = client.get('/api/reviews', query_string={'location': 'Camden Market'}).get_json()
+    by_id = client.get('/api/reviews', query_string={'venue_id': venue.id}).get_json()
+    assert by_name == by_id
+    assert {review['venue']['id'] for review in by_id['reviews']} == {venue.id}
+
+    by_point = client.get('/api/reviews', query_string={'location': '51.5391,-0.1426'}).get_json()
+    by_neighborhood = client.get('/api/reviews', query_string={'location': 'Camden'}).get_json()
+    assert by_point == by_neighborhood
+
+@pytest.mark.parametrize('dense', [True, False])
+def test_cursor_pages_cover_the_neighborhood_once(client, monkeypatch, dense):
+    neighborhood_id = _testopolis()
+    monkeypatch.setattr(review_feed, '_is_dense', lambda *args: dense)
+
+    ids = _all_pages(client, neighborhood_id=neighborhood_id, limit=50)
+
+    assert ids == sorted(ids, reverse=True)
+    assert set(ids) == _neighborhood_review_ids(neighborhood_id)
+    assert len(ids) == len(set(ids))
+
+def test_large_neighborhoods_walk_the_id_index(app):
+    neighborhood_id = _testopolis()
+    assert review_feed._is_dense(neighborhood_id, review_feed.DEFAULT_PAGE_SIZE + 1)
+
+def test_emotion_and_date_filters(client):
+    neighborhood_id = _testopolis()
+    page = client.get('/api/reviews', query_string={
+        'neighborhood_id': neighborhood_id, 'emotion': 'joy', 'min_score': 0.2, 'limit': 100
+    }).get_json()
+    assert all(
+        {s['emotion']: s['score'] for s in review['emotion_scores']}['joy'] >= 0.2
+        for review in page['reviews']
+    )
+
+    ids = _all_pages(client, neighborhood_id=neighborhood_id, since='2000-01-01', until='2000-02-01')
+    assert ids == []
+
+def test_scores_are_loaded_in_one_query_per_page(client):
+    neighborhood_id = _testopolis()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for limit in (5, 50):
+            statements.clear()
+            page = client.get('/api/reviews', query_string={'neighborhood_id': neighborhood_id, 'limit': limit}).get_json()
+            assert len(page['reviews']) == limit
+            assert sum('emotion_vector' in statement for statement in statements) == 1
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
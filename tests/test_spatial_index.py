@@ -0,0 +1,95 @@
+import json
+import random
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models.models import Venue, Neighborhood, NeighborhoodVenue, DataState
+from app.services.geo import membership
+from app.services.geo.distance import haversine_distance
+from app.services.geo.spatial_index import SpatialIndex, get_venue_index
+
+def _linear_scan(points, lat, lng, radius_km):
+    """The per-venue haversine scan the index replaced."""
+    return sorted(
+        item_id for item_id, (point_lat, point_lng) in points.items()
+        if haversine_distance(lat, lng, point_lat, point_lng) <= radius_km
+    )
+
+def test_radius_queries_match_a_linear_scan():
+    rng = random.Random(7)
+    points = {}
+    # A dense city, plus points spread over the globe including the poles and the antimeridian
+    for item_id in range(2000):
+        points[item_id] = (51.5 + rng.uniform(-0.2, 0.2), -0.1 + rng.uniform(-0.3, 0.3))
+    for item_id in range(2000, 3000):
+        points[item_id] = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+    for item_id, lng in enumerate((179.99, -179.99, 180.0, -180.0), 3000):
+        points[item_id] = (0.0, lng)
+    index = SpatialIndex()
+    for item_id, (lat, lng) in points.items():
+        index.add(item_id, lat, lng)
+
+    queries = [(51.5, -0.1, radius) for radius in (0.1, 0.5, 2.0, 10.0)]
+    queries += [(0.0, 180.0, 5.0), (0.0, -179.995, 2.0), (89.9, 0.0, 50.0), (-89.9, 45.0, 500.0)]
+    queries += [(rng.uniform(-90, 90), rng.uniform(-180, 180), rng.choice([2.0, 200.0, 3000.0])) for _ in range(50)]
+    for lat, lng, radius in queries:
+        assert index.query_radius(lat, lng, radius) == _linear_scan(points, lat, lng, radius)
+
+def test_rolled_back_venues_never_reach_the_index(app):
+    index = get_venue_index()
+    size = len(index)
+
+    db.session.add(Venue(name='Phantom', address='Nowhere', latitude=20.0, longitude=20.0))
+    db.session.flush()
+    db.session.rollback()
+
+    db.session.add(Neighborhood(
+        name='Phantom Town', city='Nowhere',
+        boundary=json.dumps({'type': 'Point', 'coordinates': [20.0, 20.0]})
+    ))
+    db.session.commit()
+
+    assert len(get_venue_index()) == size
+    neighborhood = Neighborhood.query.filter_by(name='Phantom Town').one()
+    assert NeighborhoodVenue.query.filter_by(neighborhood_id=neighborhood.id).count() == 0
+
+def test_uncommitted_venues_count_for_neighborhoods_in_the_same_transaction(app):
+    venue = Venue(name='Fresh', address='Somewhere', latitude=30.0, longitude=30.0)
+    db.session.add(venue)
+    db.session.flush()
+    db.session.add(Neighborhood(
+        name='Fresh Town', city='Somewhere',
+        boundary=json.dumps({'type': 'Point', 'coordinates': [30.0, 30.0]})
+    ))
+    db.session.commit()
+
+    neighborhood = Neighborhood.query.filter_by(name='Fresh Town').one()
+    assert [row.venue_id for row in NeighborhoodVenue.query.filter_by(neighborhood_id=neighborhood.id)] == [venue.id]
+    assert venue.id in get_venue_index().query_radius(30.0, 30.0, 1.0)
+
+def test_membership_is_backfilled_only_once(app, monkeypatch):
+    # A database from before membership existed: create_all() added an empty table
+    db.session.execute(NeighborhoodVenue.__table__.delete())
+    db.session.delete(db.session.get(DataState, membership.BACKFILLED_KEY))
+    db.session.commit()
+
+    membership.ensure_membership()
+    assert NeighborhoodVenue.query.count() > 0
+
+    # Membership may legitimately be empty; that must not rebuild it again
+    db.session.execute(NeighborhoodVenue.__table__.delete())
+    db.session.commit()
+    monkeypatch.setattr(membership, '_recompute_membership', lambda: pytest.fail('membership rebuilt again'))
+    membership.ensure_membership()
+    assert NeighborhoodVenue.query.count() == 0
+
+def test_venues_added_by_another_process_are_picked_up(app):
+    get_venue_index()
+    # Raw SQL skips the ORM events, like a write from another worker
+    db.session.execute(text(
+        "INSERT INTO venue (name, address, latitude, longitude) VALUES ('Elsewhere', 'Other Worker', 40.0, 40.0)"
+    ))
+    db.session.commit()
+
+    venue = Venue.query.filter_by(name='Elsewhere').one()
+    assert get_venue_index().query_radius(40.0, 40.0, 1.0) == [venue.id]
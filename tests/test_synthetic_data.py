@@ -0,0 +1,34 @@
+import json
+from app.models.models import Venue, Review, Neighborhood, NeighborhoodVenue, EmotionVector, EmotionalHotspot
+from app.services.geo.distance import haversine_matrix
+from app.services.sentiment.review_stream import iter_unprocessed_reviews
+from app.services.synthetic_data import generate_city
+
+def test_generate_city_seeds_clustered_data(app):
+    counts = generate_city(neighborhoods=4, venues=60, reviews=500, scored_fraction=0.8, city='Testopolis')
+
+    assert counts == {'neighborhoods': 4, 'venues': 60, 'reviews': 500, 'scored_reviews': 400}
+    assert Neighborhood.query.filter_by(city='Testopolis').count() == 4
+    assert Review.query.filter_by(source='synthetic').count() == 500
+    assert sum(len(page) for page in iter_unprocessed_reviews()) == 100
+
+    # Every venue sits close to one of the neighborhoods
+    centers = [
+        json.loads(n.boundary)['coordinates'][::-1]
+        for n in Neighborhood.query.filter_by(city='Testopolis')
+    ]
+    venues = Venue.query.filter(Venue.address.like('%Testopolis')).all()
+    distances = haversine_matrix(
+        [lat for lat, _ in centers], [lng for _, lng in centers],
+        [v.latitude for v in venues], [v.longitude for v in venues]
+    )
+    assert distances.min(axis=0).max() < 3.0
+
+def test_generate_city_builds_membership_and_hotspots(app):
+    generate_city(neighborhoods=3, venues=30, reviews=200, city='Testopolis')
+
+    neighborhood_ids = [n.id for n in Neighborhood.query.filter_by(city='Testopolis')]
+    assert NeighborhoodVenue.query.filter(NeighborhoodVenue.neighborhood_id.in_(neighborhood_ids)).count() > 0
+    assert EmotionVector.query.count() >= 200
+    hotspots = EmotionalHotspot.query.filter(EmotionalHotspot.neighborhood_id.in_(neighborhood_ids)).all()
+    assert {hotspot.emotion for hotspot in hotspots} >= {'joy', 'fear'}
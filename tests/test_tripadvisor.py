@@ -0,0 +1,186 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from bs4 import BeautifulSoup
+from app.models.models import Venue, Review
+from app.services.scraper.page_cache import PageCache
+from app.services.scraper import tripadvisor
+from app.services.scraper.tripadvisor import TripAdvisorScraper
+
+VENUE_COUNT = 12
+PAGE_DELAY = 0.2
+
+SEARCH_PAGE = ''.join(
+    f'<a class="result-title" href="/Venue-{i}">Venue {i}</a>' for i in range(VENUE_COUNT)
+)
+
+VENUE_PAGE = '''
+<h1 class="title">Stub Venue {i}</h1>
+<address>{i} Stub Street</address>
+<script>{{"latitude": "40.7{i:02d}", "longitude": "-73.9{i:02d}"}}</script>
+<div class="review-container">
+  <p class="review-text">Lovely place number {i}</p>
+  <span class="reviewer-location">Testville</span>
+  <span class="review-date">March 2023</span>
+</div>
+'''
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Status codes sent for venue pages, in order
+    venue_statuses = []
+
+    def do_GET(self):
+        etag = None
+        if self.path.startswith('/Search'):
+            body = SEARCH_PAGE
+        elif self.path.startswith('/Venue-'):
+            time.sleep(PAGE_DELAY)
+            i = int(self.path.split('-')[1])
+            body = VENUE_PAGE.format(i=i)
+            etag = f'"venue-{i}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.venue_statuses.append(304)
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.venue_statuses.append(200)
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    StubHandler.venue_statuses = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def test_scrape_fetches_venue_pages_concurrently(app, stub_server):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=VENUE_COUNT,
+                                 concurrency=VENUE_COUNT, rate_limit=0, timeout=5)
+
+    start = time.perf_counter()
+    reviews = scraper.scrape('Test City', 'restaurants')
+    elapsed = time.perf_counter() - start
+
+    assert len(reviews) == VENUE_COUNT
+    assert Venue.query.filter(Venue.name.like('Stub Venue %')).count() == VENUE_COUNT
+    assert Review.query.filter_by(source='tripadvisor').count() == VENUE_COUNT
+    # Sequential fetching would take VENUE_COUNT * PAGE_DELAY
+    assert elapsed < VENUE_COUNT * PAGE_DELAY / 2
+
+def test_scrape_respects_page_limit(app, stub_server):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=3, rate_limit=0, timeout=5)
+
+    reviews = scraper.scrape('Test City', 'restaurants')
+
+    assert len(reviews) == 3
+    # Reviews of the first three venues are already stored
+    assert len(scraper.scrape('Test City', 'restaurants', max_venues=5)) == 2
+    assert Review.query.filter_by(source='tripadvisor').count() == 5
+
+def test_rate_limit_spaces_requests_to_one_host(app, stub_server):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=4, concurrency=4, rate_limit=10, timeout=5)
+
+    start = time.perf_counter()
+    scraper.scrape('Test City', 'restaurants')
+
+    # Search page plus four venue pages at 10 requests per second
+    assert time.perf_counter() - start >= 0.4
+
+def test_rescrape_revalidates_cached_pages(app, stub_server, tmp_path):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=4, rate_limit=0, timeout=5,
+                                 page_cache=PageCache(str(tmp_path), ttl=0))
+
+    assert len(scraper.scrape('Test City', 'restaurants')) == 4
+    review_count = Review.query.count()
+
+    # Expired entries are revalidated; unchanged pages are neither parsed nor saved again
+    assert scraper.scrape('Test City', 'restaurants') == []
+    assert StubHandler.venue_statuses == [200] * 4 + [304] * 4
+    assert Review.query.count() == review_count
+
+def test_fresh_cached_pages_are_not_requested(app, stub_server, tmp_path):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=4, rate_limit=0, timeout=5,
+                                 page_cache=PageCache(str(tmp_path), ttl=3600))
+
+    scraper.scrape('Test City', 'restaurants')
+    scraper.scrape('Test City', 'restaurants')
+
+    assert StubHandler.venue_statuses == [200] * 4
+    assert scraper.page_cache.stats()['fresh'] == 5
+
+def test_fresh_cached_pages_skip_the_rate_limit(app, stub_server, tmp_path):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=4, concurrency=4, rate_limit=10, timeout=5,
+                                 page_cache=PageCache(str(tmp_path), ttl=3600))
+    scraper.scrape('Test City', 'restaurants')
+
+    start = time.perf_counter()
+    scraper.scrape('Test City', 'restaurants')
+    # Five fresh pages at 10 requests per second would take 0.4 s
+    assert time.perf_counter() - start < 0.2
+
+def test_venue_page_fields_are_read_from_their_tags():
+    html = '''
+    <div class="page"><div class="header"><h1 class="subtitle">Not this</h1><h1 class="title">Nested Venue</h1></div>
+    <address>1 Nested Street</address>
+    <script>{"latitude": "40.1", "longitude": "-73.1"}</script>
+    <div class="review-container">
+      <span class="review-text">Teaser, not the review</span>
+      <p class="review-text">The full review</p>
+      <p class="review-date">Not a date</p>
+      <span class="review-date">April 2023</span>
+    </div>
+    <div class="review-container"><span class="review-text">No review here</span></div></div>
+    '''
+    scraper = TripAdvisorScraper()
+    expected = {
+        'name': 'Nested Venue', 'address': '1 Nested Street', 'latitude': 40.1, 'longitude': -73.1,
+        'reviews': [{'text': 'The full review', 'date': 'April 2023'}]
+    }
+    assert scraper._parse_venue_page(html) == expected
+    assert scraper._parse_venue_page(html, parse_only=None) == expected
+    assert scraper._parse_venue_page(html, features='html.parser') == expected
+
+def test_strainer_builds_only_the_elements_read():
+    html = '''
+    <div class="nav"><a href="/">Home</a></div>
+    <h1 class="title">Stub Venue</h1>
+    <div class="review-container highlighted"><p class="review-text">Kept</p></div>
+    <div class="nearby-item"><p class="review-text">Not a review of this venue</p></div>
+    '''
+    soup = BeautifulSoup(html, tripadvisor.HTML_PARSER, parse_only=tripadvisor.VENUE_STRAINER)
+    assert [tag.name for tag in soup.find_all(True)] == ['h1', 'div', 'p']
+    assert soup.find('p').text == 'Kept'
+
+def test_pages_of_a_failed_scrape_are_parsed_again(app, stub_server, tmp_path, monkeypatch):
+    scraper = TripAdvisorScraper(base_url=stub_server, max_venues=4, rate_limit=0, timeout=5,
+                                 page_cache=PageCache(str(tmp_path), ttl=3600))
+
+    def fail(reviews):
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(tripadvisor, 'filter_new_reviews', fail)
+    with pytest.raises(RuntimeError):
+        scraper.scrape('Test City', 'restaurants')
+    monkeypatch.undo()
+
+    # Nothing was cached for the unsaved pages, so they are downloaded and saved now
+    assert len(scraper.scrape('Test City', 'restaurants')) == 4
+    assert StubHandler.venue_statuses == [200] * 8